@@ -2,7 +2,41 @@
 # -*- coding: utf-8 -*-
 
 
-from .interval import Token, Interval, Sentence
-from .document import Document
-from .parser import AmazonReviewParser
-from .vectorizer import Vectorizer
+from importlib import import_module
+
+
+# Public names and the submodule defining them, a submodule is only imported on first access to one of its names
+_EXPORTS = {
+    'Token': '.interval',
+    'Interval': '.interval',
+    'Sentence': '.interval',
+    'Document': '.document',
+    'TokenizationCache': '.cache',
+    'AmazonReviewParser': '.parser',
+    'Vectorizer': '.vectorizer',
+    'FeatureStore': '.feature_store'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> object:
+    """
+    Import the submodule defining a public name on first access
+    :param name: The name to get
+    :return: The class or function of that name
+    """
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    """
+    List the names of the package, including the ones not imported yet
+    :return: The sorted list of names
+    """
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package for caching the tokenization of documents on disk.
+Entries are keyed by a hash of the text and of the tokenizer version, so that a change of
+nltk or of `Document.create_from_text` never returns stale tokens
+"""
+
+
+import hashlib
+from importlib.metadata import version
+import json
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from config import DATA_DIR
+from .document import Document, TOKENIZER_VERSION
+from .interval import Sentence
+
+
+class TokenizationCache:
+    """
+    SQLite backed cache of the tokens and sentences of documents, once the cache holds more than `max_entries`
+    documents the least recently used ones are evicted down to `EVICTION_RATIO` of `max_entries`.
+    The accesses of the hits are written by `flush`, in a single transaction.
+    The number of documents is kept up to date by triggers of the database, so that it is shared by all processes.
+    The cache can be sent to worker processes, each one opens its own connection to the database
+    """
+
+    # Fraction of `max_entries` the cache is evicted down to once it is full
+    EVICTION_RATIO = 0.9
+
+    def __init__(self, filename: str = 'tokenization_cache.sqlite', max_entries: int = 1000000) -> None:
+        """
+        Constructor of the TokenizationCache class
+        :param filename: The database file path, relative to DATA_DIR
+        :param max_entries: The maximum number of documents kept in the cache
+        """
+        self.filepath = os.path.join(DATA_DIR, filename)
+        self.max_entries = max_entries
+        # The installed version is read from the package metadata, importing nltk takes about a second
+        self.version = f'{TOKENIZER_VERSION}:{version("nltk")}'
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        # Last access time of the keys hit since the last `flush`
+        self._accesses = {}
+
+    def __getstate__(self) -> dict:
+        """
+        Get the state to pickle, the connection is not picklable and is reopened on first use.
+        The counters of the copy start from zero, so that a worker process only counts its own lookups
+        :return: The state of the cache
+        """
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_accesses'] = {}
+        state['hits'] = 0
+        state['misses'] = 0
+        return state
+
+    def __len__(self) -> int:
+        """
+        Get the number of documents in the cache, counted by the triggers of the database
+        :return: The number of documents in the cache
+        """
+        return self.connection.execute('SELECT size FROM documents_size').fetchone()[0]
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The connection to the database, created along with the table on first use
+        :return: The connection to the database
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.filepath, timeout=60, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS documents '
+                                     '(key TEXT PRIMARY KEY, tokens TEXT, sentences TEXT, last_access REAL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS documents_last_access ON documents (last_access)')
+            # The count and its triggers are created at once, the count of a database written before them included
+            with self._connection:
+                self._connection.execute('BEGIN IMMEDIATE')
+                self._connection.execute('CREATE TABLE IF NOT EXISTS documents_size '
+                                         '(id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER)')
+                self._connection.execute('INSERT OR IGNORE INTO documents_size SELECT 0, COUNT(*) FROM documents')
+                self._connection.execute('CREATE TRIGGER IF NOT EXISTS documents_insert AFTER INSERT ON documents '
+                                         'BEGIN UPDATE documents_size SET size = size + 1; END')
+                self._connection.execute('CREATE TRIGGER IF NOT EXISTS documents_delete AFTER DELETE ON documents '
+                                         'BEGIN UPDATE documents_size SET size = size - 1; END')
+        return self._connection
+
+    def key(self, text: str) -> str:
+        """
+        Compute the key of a text in the cache
+        :param text: The document text
+        :return: The hexadecimal hash of the text and the tokenizer version
+        """
+        return hashlib.sha1(f'{self.version}\0{text}'.encode('utf-8')).hexdigest()
+
+    def get(self, text: str) -> Optional[Document]:
+        """
+        Get the Document of a text from the cache
+        :param text: The document text
+        :return: The Document if the text is in the cache else None
+        """
+        key = self.key(text)
+        row = self.connection.execute('SELECT tokens, sentences FROM documents WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._accesses[key] = time.time()
+        doc = Document()
+        doc.text = text
+        tokens = json.loads(row[0])
+        doc.set_tokens(*(zip(*tokens) if tokens else ([], [], [], [], [])))
+        doc.sentences = [Sentence(doc, start, end) for start, end in json.loads(row[1])]
+        return doc
+
+    def put(self, doc: Document) -> None:
+        """
+        Store the tokens and sentences of a Document in the cache
+        :param doc: The Document to store
+        """
+        tokens = json.dumps(list(zip(doc.token_starts.tolist(), doc.token_ends.tolist(), doc.pos_tags(),
+                                     doc.shape_tags(), doc.token_texts())), ensure_ascii=False)
+        sentences = json.dumps([(s.start, s.end) for s in doc.sentences])
+        row = (self.key(doc.text), tokens, sentences, time.time())
+        # A document of the same text may have been stored by another process meanwhile, it is then updated
+        # instead of replaced, so that only new documents are counted
+        cursor = self.connection.execute('INSERT OR IGNORE INTO documents VALUES (?, ?, ?, ?)', row)
+        if not cursor.rowcount:
+            self.connection.execute('UPDATE documents SET tokens = ?, sentences = ?, last_access = ? WHERE key = ?',
+                                    row[1:] + row[:1])
+        elif len(self) > self.max_entries:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used documents until the cache holds at most `EVICTION_RATIO` of `max_entries`
+        documents, so that the following inserts do not evict one document each
+        """
+        self.flush()
+        self.connection.execute('DELETE FROM documents WHERE key IN '
+                                '(SELECT key FROM documents ORDER BY last_access LIMIT MAX(0, '
+                                '(SELECT size FROM documents_size) - ?))',
+                                (int(self.max_entries * self.EVICTION_RATIO),))
+
+    def flush(self) -> None:
+        """
+        Write the last access time of the documents hit since the last flush, in a single transaction
+        """
+        if not self._accesses:
+            return
+        accesses = [(last_access, key) for key, last_access in self._accesses.items()]
+        self._accesses = {}
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany('UPDATE documents SET last_access = ? WHERE key = ?', accesses)
+
+    def clear(self) -> None:
+        """
+        Remove all the documents of the cache and reset the counters
+        """
+        self.connection.execute('DELETE FROM documents')
+        self._accesses = {}
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        """
+        Write the pending accesses and close the connection to the database
+        """
+        if self._connection is not None:
+            self.flush()
+            self._connection.close()
+            self._connection = None
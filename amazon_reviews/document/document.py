@@ -7,16 +7,93 @@ Package for handling a text document
 """
 
 
-from typing import List
+from collections.abc import Sequence
+from functools import lru_cache
+from itertools import islice
+import re
+from typing import Iterable, List, Optional, Tuple
 
-import nltk
+import numpy as np
 
-from .interval import get_shape_category, Sentence, Token
+from amazon_reviews.metrics import METRICS
+from .interval import get_shape_categories, Sentence, Token
+from .tagset import INDEX2POS, INDEX2SHAPE, POS2INDEX, SHAPE2INDEX, UNKNOWN
+
+
+# Version of the tokenization done by `Document.create_from_text`, bump it when its output changes
+TOKENIZER_VERSION = 4
+
+# The word tokenizer replaces the double quotes by `` (opening) or '' (closing)
+QUOTE_FORMS = {'``': ('``', '"', "''"), "''": ("''", '"', '``')}
+_LINE_BREAKS = re.compile('\n+')
+
+
+@lru_cache(maxsize=None)
+def get_tagger() -> 'nltk.tag.PerceptronTagger':
+    """
+    Load the part of speech tagger once per process, `nltk.pos_tag` loads its model on every call
+    :return: The tagger used by `Document.create_many`
+    """
+    from nltk.tag import PerceptronTagger
+    return PerceptronTagger()
+
+
+class TokenList(Sequence):
+    """
+    Read only sequence of the tokens of a document, the `Token` objects are created on demand
+    from the columns of the document
+    """
+
+    __slots__ = ('_doc', '_start', '_stop')
+
+    def __init__(self, document: 'Document', start: int = 0, stop: Optional[int] = None) -> None:
+        """
+        Constructor of the TokenList class
+        :param document: The document containing the tokens
+        :param start: The index of the first token of the sequence
+        :param stop: The index after the last token of the sequence, None for the last token of the document
+        """
+        self._doc = document
+        self._start = start
+        self._stop = len(document.token_starts) if stop is None else stop
+
+    def __len__(self) -> int:
+        """
+        Compute the number of tokens
+        :return: The number of tokens
+        """
+        return self._stop - self._start
+
+    def __getitem__(self, index: (int, slice)) -> (Token, 'TokenList'):
+        """
+        Get a token, or a sub sequence of tokens for a slice
+        :param index: The index of the token or the slice of tokens
+        :return: The Token object or the TokenList of the slice
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return TokenList(self._doc, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('TokenList index out of range')
+        return self._doc.token(self._start + index)
+
+    def __repr__(self) -> str:
+        """
+        The representation of the TokenList
+        :return: The representation of the TokenList as str
+        """
+        return repr(list(self))
 
 
 class Document:
     """
     A document is a combination of text and the positions of the tags and elements in that text.
+    The tokens are stored in columns: start and end offsets, POS and shape codes of the tag sets,
+    and the text of all tokens concatenated in a single string
     """
 
     def __init__(self) -> None:
@@ -24,9 +101,161 @@ class Document:
         Constructor of the Document class
         """
         self.text = None
-        self.tokens = None
-        self.sentences = None
         self._rating = None
+        self.token_starts = None
+        self.token_ends = None
+        self.pos_codes = None
+        self.shape_codes = None
+        self._token_text = None
+        self._token_text_offsets = None
+        self._unknown_tags = {}
+        self._tokens_sorted = True
+        self._sentences = None
+        self.token_sentence_ids = None
+
+    @property
+    def sentences(self) -> Optional[List[Sentence]]:
+        """
+        Sentences of the document
+        :return: The list of sentences, None if the document has not been tokenized
+        """
+        return self._sentences
+
+    @sentences.setter
+    def sentences(self, sentences: Optional[Iterable[Sentence]]) -> None:
+        """
+        Set up the sentences of the document and map them to their tokens
+        :param sentences: The sentences of the document
+        """
+        self._sentences = None if sentences is None else list(sentences)
+        self._index_sentences()
+
+    def _index_sentences(self) -> None:
+        """
+        Compute once the range of tokens of each sentence and the sentence id of each token (-1 if none)
+        """
+        self.token_sentence_ids = None
+        if self._sentences is None:
+            return
+        if self.token_starts is None or not self._tokens_sorted:
+            # The ranges of a previous indexing would slice the new tokens, the sentences scan them instead
+            for sentence in self._sentences:
+                sentence._token_range = None
+            return
+        starts = np.searchsorted(self.token_ends, [s.start for s in self._sentences], side='right')
+        stops = np.searchsorted(self.token_starts, [s.end for s in self._sentences], side='left')
+        self.token_sentence_ids = np.full(len(self.token_starts), -1, dtype=np.int32)
+        for sentence_id, (sentence, start, stop) in enumerate(zip(self._sentences, starts.tolist(), stops.tolist())):
+            sentence._token_range = (start, max(start, stop))
+            self.token_sentence_ids[start:stop] = sentence_id
+
+    def token_range(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """
+        Find by bisection the tokens overlapping a span of the text
+        :param start: The start of the span in the document text
+        :param end: The end of the span in the document text
+        :return: The index of the first token and the index after the last token,
+                 None if the tokens are not in the text order
+        """
+        if not self._tokens_sorted:
+            return None
+        first = int(np.searchsorted(self.token_ends, start, side='right'))
+        return first, max(first, int(np.searchsorted(self.token_starts, end, side='left')))
+
+    @property
+    def tokens(self) -> Optional[TokenList]:
+        """
+        Tokens of the document
+        :return: The sequence of tokens, None if the document has not been tokenized
+        """
+        if self.token_starts is None:
+            return None
+        return TokenList(self)
+
+    @tokens.setter
+    def tokens(self, tokens: Iterable[Token]) -> None:
+        """
+        Set up the tokens of the document
+        :param tokens: The tokens of the document
+        """
+        tokens = list(tokens)
+        self.set_tokens([t.start for t in tokens], [t.end for t in tokens], [t.pos for t in tokens],
+                        [t.shape for t in tokens], [t.text for t in tokens])
+
+    def set_tokens(self, starts: List[int], ends: List[int], pos_tags: List[str], shapes: List[str],
+                   texts: List[str]) -> None:
+        """
+        Set up the columns of the tokens of the document
+        :param starts: The start of each token in the document text
+        :param ends: The end of each token in the document text
+        :param pos_tags: The part of speech of each token
+        :param shapes: The shape category of each token
+        :param texts: The text representation of each token
+        """
+        self.token_starts = np.asarray(starts, dtype=np.int32)
+        self.token_ends = np.asarray(ends, dtype=np.int32)
+        self._unknown_tags = {}
+        self.pos_codes = self._encode_tags('pos', pos_tags, POS2INDEX)
+        self.shape_codes = self._encode_tags('shape', shapes, SHAPE2INDEX)
+        self._token_text = ''.join(texts)
+        self._token_text_offsets = np.zeros(len(texts) + 1, dtype=np.int32)
+        np.cumsum([len(text) for text in texts], out=self._token_text_offsets[1:])
+        # Spans are looked up by bisection, which requires the tokens to be in the text order
+        self._tokens_sorted = bool(np.all(np.diff(self.token_starts) >= 0) and np.all(np.diff(self.token_ends) >= 0))
+        self._index_sentences()
+
+    def _encode_tags(self, column: str, tags: List[str], tag2index: dict) -> 'np.ndarray':
+        """
+        Encode tags to their code, tags missing from the tag set are coded UNKNOWN and kept aside
+        :param column: The name of the column of tags
+        :param tags: The tags to encode
+        :param tag2index: The code of each tag of the tag set
+        :return: The array of codes
+        """
+        codes = np.empty(len(tags), dtype=np.uint8)
+        for i, tag in enumerate(tags):
+            code = tag2index.get(tag, UNKNOWN)
+            if code == UNKNOWN:
+                self._unknown_tags[column, i] = tag
+            codes[i] = code
+        return codes
+
+    def token(self, index: int) -> Token:
+        """
+        Create the Token object of a token
+        :param index: The index of the token in the document
+        :return: The Token object
+        """
+        pos = self.pos_codes[index]
+        shape = self.shape_codes[index]
+        return Token(self, self.token_starts[index], self.token_ends[index],
+                     INDEX2POS[pos] if pos != UNKNOWN else self._unknown_tags['pos', index],
+                     INDEX2SHAPE[shape] if shape != UNKNOWN else self._unknown_tags['shape', index],
+                     self._token_text[self._token_text_offsets[index]:self._token_text_offsets[index + 1]])
+
+    def token_texts(self) -> List[str]:
+        """
+        Text representation of all tokens
+        :return: The list of the text representation of each token
+        """
+        offsets = self._token_text_offsets.tolist()
+        return [self._token_text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    def pos_tags(self) -> List[str]:
+        """
+        Part of speech of all tokens
+        :return: The list of the part of speech of each token
+        """
+        return [INDEX2POS[code] if code != UNKNOWN else self._unknown_tags['pos', i]
+                for i, code in enumerate(self.pos_codes.tolist())]
+
+    def shape_tags(self) -> List[str]:
+        """
+        Shape category of all tokens
+        :return: The list of the shape category of each token
+        """
+        return [INDEX2SHAPE[code] if code != UNKNOWN else self._unknown_tags['shape', i]
+                for i, code in enumerate(self.shape_codes.tolist())]
 
     @property
     def rating(self):
@@ -45,81 +274,153 @@ class Document:
         self._rating = float(r)
 
     @classmethod
-    def create_from_text(cls, text: str = None) -> 'Document':
+    def create_from_text(cls, text: str = None,
+                         cache: Optional['amazon_reviews.document.cache.TokenizationCache'] = None) -> 'Document':
         """
         Initialize a Document object from a text
-        1. Tokenize text (tokens & sentences)
-        2. Find tokens intervals
-        3. Find sentences intervals
+        1. Split the text into sentences and each sentence into tokens
+        2. Tag the tokens
+        3. Find the tokens and sentences intervals, with a token for each run of line breaks
         :param text: document text as a string
+        :param cache: The tokenization cache to look the text up in and to store the new document into
         :return: The document text as Document object
         """
-        doc = Document()
-        doc.text = text
-        words, pos_tags = zip(*nltk.pos_tag(nltk.word_tokenize(text)))
-        sentences = nltk.sent_tokenize(text.replace('\n', ' '))
-        doc.tokens = Document._find_tokens(doc, words, pos_tags, text)
-        doc.sentences = Document._find_sentences(doc, sentences, text)
-        return doc
+        return cls.create_many([text], cache=cache)[0]
+
+    @classmethod
+    def create_many(cls, texts: List[str],
+                    cache: Optional['amazon_reviews.document.cache.TokenizationCache'] = None) -> List['Document']:
+        """
+        Initialize the Document objects of a batch of texts, as `create_from_text` does for a single text.
+        The sentences of all the texts are tagged at once by the tagger shared by the process
+        :param texts: The document texts
+        :param cache: The tokenization cache to look the texts up in and to store the new documents into
+        :return: The Document of each text, in the same order
+        """
+        docs = [None] * len(texts) if cache is None else [cache.get(text) for text in texts]
+        missing = [i for i, doc in enumerate(docs) if doc is None]
+        for i, doc in zip(missing, cls._tokenize_many([texts[i] for i in missing])):
+            docs[i] = doc
+            if cache is not None:
+                cache.put(doc)
+        if METRICS.enabled:
+            METRICS.add('documents', len(docs))
+            METRICS.add('tokens', sum(len(doc.token_starts) for doc in docs))
+        return docs
 
     @staticmethod
-    def _find_tokens(doc: 'Document', word_tokens: List[str], pos_tags: List[str], text: str) -> List[Token]:
+    def _tokenize_many(texts: List[str]) -> List['Document']:
+        """
+        Tokenize, tag and align a batch of texts
+        :param texts: The document texts
+        :return: The Document of each text
         """
-        Calculate the span of each token, find which element it belongs to and create a new Token instance
-        :param doc: Reference to documents instance
-        :param word_tokens: list of strings(tokens) coming out of nltk.word_tokenize
-        :param pos_tags: list of strings(pos tag) coming out of nltk.pos_tag
+        if not texts:
+            return []
+        # nltk takes about a second to import, it is only loaded when a text is actually tokenized
+        import nltk
+        with METRICS.stage('tokenize'):
+            sentences = [nltk.sent_tokenize(text) for text in texts]
+            sentence_words = [[nltk.word_tokenize(sentence, preserve_line=True) for sentence in doc_sentences]
+                              for doc_sentences in sentences]
+        with METRICS.stage('tag'):
+            tagged = iter(get_tagger().tag_sents([words for doc_words in sentence_words for words in doc_words]))
+        docs = []
+        with METRICS.stage('align'):
+            for text, doc_sentences, doc_words in zip(texts, sentences, sentence_words):
+                pos_tags = [tag for sentence_tags in islice(tagged, len(doc_words)) for _, tag in sentence_tags]
+                doc = Document()
+                doc.text = text
+                starts, ends, tags, token_texts, spans = Document._align(text, doc_sentences, doc_words, pos_tags)
+                doc.set_tokens(starts, ends, tags, get_shape_categories(token_texts), token_texts)
+                doc.sentences = [Sentence(doc, start, end) for start, end in spans]
+                docs.append(doc)
+        return docs
+
+    @staticmethod
+    def _align(text: str, sentences: List[str], sentence_words: List[List[str]], pos_tags: List[str])\
+            -> Tuple[List[int], List[int], List[str], List[str], List[Tuple[int, int]]]:
+        """
+        Find the span of each sentence and of each token in the text, in a single left to right pass.
+        A line break token is inserted for each run of line breaks between two tokens.
+        Tokens not at the expected position are looked up further in their sentence and counted as misaligned,
+        tokens not found at all are dropped and counted as such
         :param text: Document text as a string
-        :return: list of tokens as Token class
-        """
-        offset = 0
-        tokens = []
-        missing = None
-        for token, pos_tag in zip(word_tokens, pos_tags):
-            # TODO: Handle linebreak '\n' with 'NL'
-            pos = text.find(token, offset, offset + max(50, len(token)))
-            if pos > -1:
-                if missing:
-                    # TODO: Handle linebreak '\n' with 'NL'
-                    t = Token(doc, pos - 1 if missing['token'] == '``' else len(missing['token']), pos - 1,
-                              missing['pos_tag'], get_shape_category(missing['token']), missing['token'])
-                    tokens.append(t)
-                    # offset += len(missing['token'])
-                    missing = None
-                t = Token(doc, pos, pos+len(token), pos_tag, get_shape_category(token), token)
-                tokens.append(t)
-                offset += len(token)
-            else:
-                missing = {
-                    'token': token,
-                    'pos_tag': pos_tag
-                }
-        return tokens
+        :param sentences: list of strings(sentences) coming out of nltk.sent_tokenize
+        :param sentence_words: list of strings(tokens) of each sentence coming out of nltk.word_tokenize
+        :param pos_tags: list of strings(pos tag) of all the tokens coming out of nltk.pos_tag
+        :return: The start, end, pos tag and text of each token, and the (start, end) of each sentence
+        """
+        starts, ends, tags, texts, spans = [], [], [], [], []
+        misaligned = dropped = 0
+        position = 0
+        pos_tags = iter(pos_tags)
+        for sentence, words in zip(sentences, sentence_words):
+            sentence_start = text.find(sentence, position)
+            if sentence_start < 0:
+                # Sentences are slices of the text, this only happens with a tokenizer normalizing the text
+                dropped += len(words)
+                for _ in words:
+                    next(pos_tags)
+                continue
+            sentence_end = sentence_start + len(sentence)
+            spans.append((sentence_start, sentence_end))
+            for word, pos_tag in zip(words, pos_tags):
+                start, end = Document._find_token(text, word, position, sentence_end)
+                if start < 0:
+                    dropped += 1
+                    continue
+                misaligned += Document._add_line_breaks(text, position, start, starts, ends, tags, texts)
+                starts.append(start)
+                ends.append(end)
+                tags.append(pos_tag)
+                texts.append(word)
+                position = end
+        Document._add_line_breaks(text, position, len(text), starts, ends, tags, texts)
+        if METRICS.enabled:
+            METRICS.add('misaligned_tokens', misaligned)
+            METRICS.add('dropped_tokens', dropped)
+        return starts, ends, tags, texts, spans
+
+    @staticmethod
+    def _find_token(text: str, word: str, start: int, end: int) -> Tuple[int, int]:
+        """
+        Find the first occurrence of a token in a part of the text, the word tokenizer replaces
+        the double quotes by `` or '' so both forms are looked for
+        :param text: Document text as a string
+        :param word: The token coming out of nltk.word_tokenize
+        :param start: The position to search from
+        :param end: The position to search up to
+        :return: The start and end of the token, (-1, -1) if it is not found
+        """
+        best = (-1, -1)
+        for form in QUOTE_FORMS.get(word, (word,)):
+            found = text.find(form, start, end)
+            if found > -1 and (best[0] < 0 or found < best[0]):
+                best = (found, found + len(form))
+        return best
 
     @staticmethod
-    def _find_sentences(doc: 'Document', sentences_tokens: List[str], text: str) -> List[Sentence]:
+    def _add_line_breaks(text: str, start: int, end: int, starts: List[int], ends: List[int], tags: List[str],
+                         texts: List[str]) -> bool:
         """
-        List Sentence objects each time a sentence is found in the text
-        :param doc: reference to documents instance
-        :param sentences_tokens: list of strings(sentences) coming out of nltk.sent_tokenize
+        Add a line break token for each run of line breaks between two tokens
         :param text: Document text as a string
+        :param start: The end of the previous token
+        :param end: The start of the next token
+        :param starts: The start of each token, line breaks are appended to it
+        :param ends: The end of each token, line breaks are appended to it
+        :param tags: The pos tag of each token, line breaks are appended to it
+        :param texts: The text of each token, line breaks are appended to it
+        :return: If the gap contains something else than whitespaces, i.e. the next token is misaligned
         """
-        offset = 0
-        sentences = []
-        missing = None
-        for sentence in sentences_tokens:
-            # TODO: Handle linebreak '\n' with 'NL'
-            pos = text.find(sentence, offset, offset + max(500, len(sentence)))
-            if pos > -1:
-                if missing:
-                    # TODO: Handle linebreak '\n' with 'NL'
-                    s = Sentence(doc, pos-len(missing), pos-1)
-                    sentences.append(s)
-                    # offset += len(missing)
-                    missing = None
-                s = Sentence(doc, pos, pos+len(sentence))
-                sentences.append(s)
-                offset += len(sentence)
-            else:
-                missing = sentence
-        return sentences
+        if start == end:
+            return False
+        gap = text[start:end]
+        if '\n' in gap:
+            for match in _LINE_BREAKS.finditer(text, start, end):
+                starts.append(match.start())
+                ends.append(match.end())
+                tags.append('NL')
+                texts.append(match.group())
+        return not gap.isspace()
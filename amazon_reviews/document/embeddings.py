@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package for loading and storing word embeddings.
+The text format (e.g. GloVe) is slow to parse, it can be converted once into a binary store:
+a `.vocab` file (one word per line) and a `.npy` matrix which is memory-mapped when loaded.
+The matrix can be stored in reduced precision: float16, or int8 with one scale per row in a `.scales.npy` file,
+rows are then converted back to float32 on lookup
+"""
+
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+# Storage precisions of a matrix of vectors
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+def quantize_rows(matrix: 'np.ndarray', precision: str) -> Tuple['np.ndarray', Optional['np.ndarray']]:
+    """
+    Convert a matrix of vectors to a storage precision
+    :param matrix: The float matrix
+    :param precision: 'float32', 'float16' or 'int8' (symmetric, with one scale per row)
+    :return: The converted matrix and the float32 scale of each row, None if the precision is not int8
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Precision '{precision}' must be one of {PRECISIONS}")
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if precision != 'int8':
+        return matrix.astype(precision), None
+    scales = np.abs(matrix).max(axis=1) / 127 if matrix.size else np.zeros(len(matrix), dtype=np.float32)
+    scales[scales == 0] = 1.
+    return np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8), scales.astype(np.float32)
+
+
+def dequantize_rows(matrix: 'np.ndarray', scales: Optional['np.ndarray'], rows: object = slice(None)) -> 'np.ndarray':
+    """
+    Look rows of a matrix stored in any precision up, as float32
+    :param matrix: The stored matrix
+    :param scales: The scale of each row of an int8 matrix, None for a float matrix
+    :param rows: The rows to look up (an index, an array of indices or a slice), all of them by default
+    :return: The float32 rows
+    """
+    values = np.asarray(matrix[rows], dtype=np.float32)
+    if scales is None:
+        return values
+    return values * np.asarray(scales[rows], dtype=np.float32)[..., None]
+
+
+class WordEmbeddings:
+    """
+    A vocabulary and its matrix of word vectors, the i-th row of `vectors` is the vector of the i-th word
+    """
+
+    def __init__(self, index2word: List[str], vectors: 'np.ndarray', scales: Optional['np.ndarray'] = None) -> None:
+        """
+        Constructor of the WordEmbeddings class
+        :param index2word: The list of words of the vocabulary
+        :param vectors: The matrix of word vectors of shape (len(index2word), vector_size), float or int8
+        :param scales: The scale of each row of an int8 matrix, None for a float matrix
+        """
+        if len(index2word) != vectors.shape[0]:
+            raise ValueError(f"Vocabulary size '{len(index2word)}' does not match vectors count '{vectors.shape[0]}'")
+        if (scales is None) != (vectors.dtype != np.int8):
+            raise ValueError('Scales must be given for int8 vectors only')
+        self.index2word = index2word
+        self.vectors = vectors
+        self.scales = scales
+
+    def __len__(self) -> int:
+        """
+        Compute the size of the vocabulary
+        :return: The number of words
+        """
+        return len(self.index2word)
+
+    @property
+    def syn0(self) -> 'np.ndarray':
+        """
+        Alias of `vectors` matching the gensim `KeyedVectors` attribute, converted to float32 if needed
+        :return: The matrix of word vectors
+        """
+        if self.vectors.dtype == np.float32:
+            return self.vectors
+        return self.lookup(slice(None))
+
+    @property
+    def precision(self) -> str:
+        """
+        Storage precision of the word vectors
+        :return: 'float32', 'float16' or 'int8'
+        """
+        return self.vectors.dtype.name
+
+    def lookup(self, rows: object) -> 'np.ndarray':
+        """
+        Get word vectors as float32, whatever their storage precision
+        :param rows: The indices of the words (an index, an array of indices or a slice)
+        :return: The float32 vectors
+        """
+        return dequantize_rows(self.vectors, self.scales, rows)
+
+    def subset(self, rows: 'np.ndarray') -> 'WordEmbeddings':
+        """
+        Keep some words of the vocabulary, in the storage precision
+        :param rows: The indices of the words to keep
+        :return: A new `WordEmbeddings` object
+        """
+        return WordEmbeddings([self.index2word[row] for row in rows.tolist()], np.asarray(self.vectors[rows]),
+                              None if self.scales is None else np.asarray(self.scales[rows]))
+
+    def to_precision(self, precision: str) -> 'WordEmbeddings':
+        """
+        Convert the word vectors to another storage precision
+        :param precision: 'float32', 'float16' or 'int8'
+        :return: A new `WordEmbeddings` object
+        """
+        return WordEmbeddings(self.index2word, *quantize_rows(self.syn0, precision))
+
+    @property
+    def vector_size(self) -> int:
+        """
+        Dimension of the word vectors
+        :return: The dimension of the word vectors
+        """
+        return self.vectors.shape[1]
+
+    @staticmethod
+    def binary_paths(filepath: str) -> Tuple[str, str]:
+        """
+        Get the paths of the binary store of an embedding file
+        :param filepath: The path of the embedding file, with or without extension
+        :return: The path of the vocabulary file and the path of the matrix file
+        """
+        base, _ = os.path.splitext(filepath)
+        return base + '.vocab', base + '.npy'
+
+    @staticmethod
+    def scales_path(filepath: str) -> str:
+        """
+        Get the path of the row scales of the binary store of an embedding file, which only exists for int8 stores
+        :param filepath: The path of the embedding file, with or without extension
+        :return: The path of the scales file
+        """
+        return os.path.splitext(filepath)[0] + '.scales.npy'
+
+    @classmethod
+    def has_binary(cls, filepath: str) -> bool:
+        """
+        Check if the binary store of an embedding file exists
+        :param filepath: The path of the embedding file
+        :return: If both the vocabulary and the matrix files exist
+        """
+        return all(os.path.isfile(path) for path in cls.binary_paths(filepath))
+
+    @classmethod
+    def load_word2vec_format(cls, filepath: str) -> 'WordEmbeddings':
+        """
+        Parse an embedding file in the word2vec text format with gensim
+        :param filepath: The path of the embedding file
+        :return: An initialized `WordEmbeddings` object
+        """
+        from gensim.models import KeyedVectors
+        keyed_vectors = KeyedVectors.load_word2vec_format(filepath, binary=False)
+        return cls(list(keyed_vectors.index2word), keyed_vectors.syn0)
+
+    @classmethod
+    def load_binary(cls, filepath: str, mmap_mode: str = 'r') -> 'WordEmbeddings':
+        """
+        Load the binary store of an embedding file, by default the matrix is memory-mapped read only
+        so that several processes share the same physical pages
+        :param filepath: The path of the embedding file
+        :param mmap_mode: The `numpy.load` memory-map mode, None to read the matrix in memory
+        :return: An initialized `WordEmbeddings` object
+        """
+        vocab_path, matrix_path = cls.binary_paths(filepath)
+        with open(vocab_path, 'r', encoding='utf-8') as fp:
+            index2word = fp.read().split('\n')[:-1]
+        scales_path = cls.scales_path(filepath)
+        scales = np.load(scales_path) if os.path.isfile(scales_path) else None
+        return cls(index2word, np.load(matrix_path, mmap_mode=mmap_mode), scales)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'WordEmbeddings':
+        """
+        Load an embedding file, from its binary store if it has been converted
+        :param filepath: The path of the embedding file
+        :return: An initialized `WordEmbeddings` object
+        """
+        if cls.has_binary(filepath):
+            return cls.load_binary(filepath)
+        return cls.load_word2vec_format(filepath)
+
+    def save_binary(self, filepath: str, precision: Optional[str] = None) -> None:
+        """
+        Write the binary store of the embeddings
+        :param filepath: The path of the embedding file the store is named after
+        :param precision: The storage precision ('float32', 'float16' or 'int8'), None to keep the current one
+        """
+        embeddings = self if precision is None or precision == self.precision else self.to_precision(precision)
+        vocab_path, matrix_path = self.binary_paths(filepath)
+        with open(vocab_path, 'w', encoding='utf-8') as fp:
+            for word in self.index2word:
+                fp.write(word + '\n')
+        np.save(matrix_path, np.ascontiguousarray(embeddings.vectors))
+        scales_path = self.scales_path(filepath)
+        if embeddings.scales is not None:
+            np.save(scales_path, embeddings.scales)
+        elif os.path.isfile(scales_path):
+            os.remove(scales_path)
+
+    @classmethod
+    def convert(cls, filepath: str, precision: str = 'float32') -> 'WordEmbeddings':
+        """
+        Convert an embedding file from the word2vec text format to the binary store
+        :param filepath: The path of the embedding file
+        :param precision: The storage precision ('float32', 'float16' or 'int8')
+        :return: The memory-mapped converted embeddings
+        """
+        cls.load_word2vec_format(filepath).save_binary(filepath, precision)
+        return cls.load_binary(filepath)
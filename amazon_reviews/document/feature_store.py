@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package for storing encoded features on disk.
+A feature store is a directory holding the features of all documents concatenated in flat arrays,
+the offsets of each document in these arrays, the labels, the ratings and a manifest describing how they were encoded.
+Arrays are memory-mapped when opened so that corpora larger than the memory can be used
+"""
+
+
+import json
+import os
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+# Version of the layout of a feature store, bump it when it changes
+FEATURE_STORE_VERSION = 2
+
+
+class RaggedArray:
+    """
+    A sequence of variable length arrays stored as one flat array and the offsets of each array
+    """
+
+    def __init__(self, values: 'np.ndarray', offsets: 'np.ndarray') -> None:
+        """
+        Constructor of the RaggedArray class
+        :param values: The flat array of all values
+        :param offsets: The offset of each array in `values`, followed by the total number of values
+        """
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        """
+        Compute the number of arrays
+        :return: The number of arrays
+        """
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: (int, slice)) -> ('np.ndarray', 'RaggedArray'):
+        """
+        Get an array, as a view of the flat array, or a contiguous range of arrays for a slice
+        :param index: The index of the array or the slice of arrays
+        :return: The array or the RaggedArray of the slice, sharing the flat array
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('RaggedArray slices must be contiguous')
+            return RaggedArray(self.values, self.offsets[start:max(start, stop) + 1])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('RaggedArray index out of range')
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self) -> Iterator['np.ndarray']:
+        """
+        Iterate over the arrays
+        :return: An iterator of the arrays
+        """
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def lengths(self) -> 'np.ndarray':
+        """
+        Length of each array
+        :return: The array of lengths
+        """
+        return np.diff(self.offsets)
+
+    def to_dense(self, max_len: Optional[int] = None) -> 'np.ndarray':
+        """
+        Create the dense view of the arrays, padded with zeros
+        :param max_len: The number of columns, longer arrays are truncated. None for the length of the longest array
+        :return: A matrix of shape (len(self), max_len) of the type of the values
+        """
+        lengths = self.lengths
+        if max_len is None:
+            max_len = int(lengths.max()) if len(lengths) else 0
+        lengths = np.minimum(lengths, max_len)
+        dense = np.zeros((len(self), max_len), dtype=self.values.dtype)
+        rows = np.repeat(np.arange(len(self)), lengths)
+        columns = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        dense[rows, columns] = self.values[np.repeat(self.offsets[:-1], lengths) + columns]
+        return dense
+
+
+class FeatureStore:
+    """
+    Features, labels and ratings of a corpus encoded by a `Vectorizer`, stored in a directory
+    """
+
+    FEATURES = {'word': np.int32, 'pos': np.uint8, 'shape': np.uint8}
+
+    def __init__(self, directory: str, manifest: dict, word: RaggedArray, pos: RaggedArray, shape: RaggedArray,
+                 labels: 'np.ndarray', ratings: 'np.ndarray') -> None:
+        """
+        Constructor of the FeatureStore class, use `FeatureStore.open` or `FeatureStore.write` to get one
+        :param directory: The directory of the store
+        :param manifest: The description of the store
+        :param word: The word features
+        :param pos: The pos features
+        :param shape: The shape features
+        :param labels: The labels of the documents
+        :param ratings: The ratings of the documents, e.g. to compute the agreement rate of the predictions
+        """
+        self.directory = directory
+        self.manifest = manifest
+        self.word = word
+        self.pos = pos
+        self.shape = shape
+        self.labels = labels
+        self.ratings = ratings
+
+    def __len__(self) -> int:
+        """
+        Compute the number of documents in the store
+        :return: The number of documents
+        """
+        return len(self.labels)
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """
+        Check if a directory holds a feature store
+        :param directory: The directory of the store
+        :return: If the manifest of the store exists
+        """
+        return os.path.isfile(os.path.join(directory, 'manifest.json'))
+
+    @classmethod
+    def open(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'FeatureStore':
+        """
+        Open a feature store, in constant time as the arrays are memory-mapped
+        :param directory: The directory of the store
+        :param mmap_mode: The memory-map mode, None to read the arrays in memory
+        :return: The opened FeatureStore object
+        """
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as fp:
+            manifest = json.load(fp)
+        if manifest.get('version') != FEATURE_STORE_VERSION:
+            raise ValueError(f"Feature store version '{manifest.get('version')}' is not supported, "
+                             f"expected '{FEATURE_STORE_VERSION}'")
+        nb_documents = manifest['nb_documents']
+        nb_tokens = manifest['nb_tokens']
+        offsets = cls._load_array(directory, 'offsets', np.int64, nb_documents + 1, mmap_mode)
+        features = {name: RaggedArray(cls._load_array(directory, name, dtype, nb_tokens, mmap_mode), offsets)
+                    for name, dtype in cls.FEATURES.items()}
+        return cls(directory, manifest, labels=cls._load_array(directory, 'labels', np.int8, nb_documents, mmap_mode),
+                   ratings=cls._load_array(directory, 'ratings', np.float32, nb_documents, mmap_mode), **features)
+
+    @staticmethod
+    def _load_array(directory: str, name: str, dtype: type, size: int, mmap_mode: Optional[str]) -> 'np.ndarray':
+        """
+        Load an array of the store
+        :param directory: The directory of the store
+        :param name: The name of the array
+        :param dtype: The type of the values of the array
+        :param size: The number of values of the array
+        :param mmap_mode: The memory-map mode, None to read the array in memory
+        :return: The array
+        """
+        filepath = os.path.join(directory, f'{name}.bin')
+        if size == 0 or mmap_mode is None:
+            # An empty file can not be memory-mapped
+            return np.fromfile(filepath, dtype=dtype, count=size)
+        return np.memmap(filepath, dtype=dtype, mode=mmap_mode, shape=(size,))
+
+    @classmethod
+    def write(cls, directory: str, features: Iterable[Tuple['np.ndarray', 'np.ndarray', 'np.ndarray', int, float]],
+              manifest: dict) -> 'FeatureStore':
+        """
+        Write a feature store document by document, so that the whole corpus never needs to fit in memory
+        :param directory: The directory of the store, created if needed
+        :param features: The word, pos and shape features, the label and the rating of each document
+        :param manifest: The description of the encoding, completed with the counts and the layout version
+        :return: The written FeatureStore object, opened memory-mapped
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, 'manifest.json')
+        if os.path.exists(manifest_path):
+            # The store is invalid until its manifest is written back
+            os.remove(manifest_path)
+        names = list(cls.FEATURES) + ['offsets', 'labels', 'ratings']
+        files = {name: open(os.path.join(directory, f'{name}.bin'), 'wb') for name in names}
+        nb_documents = 0
+        nb_tokens = 0
+        try:
+            files['offsets'].write(np.zeros(1, dtype=np.int64).tobytes())
+            for word, pos, shape, label, rating in features:
+                for name, values in zip(cls.FEATURES, (word, pos, shape)):
+                    files[name].write(np.asarray(values, dtype=cls.FEATURES[name]).tobytes())
+                nb_tokens += len(word)
+                nb_documents += 1
+                files['offsets'].write(np.asarray([nb_tokens], dtype=np.int64).tobytes())
+                files['labels'].write(np.asarray([label], dtype=np.int8).tobytes())
+                files['ratings'].write(np.asarray([rating], dtype=np.float32).tobytes())
+        finally:
+            for fp in files.values():
+                fp.close()
+        manifest = dict(manifest, version=FEATURE_STORE_VERSION, nb_documents=nb_documents, nb_tokens=nb_tokens)
+        with open(manifest_path, 'w', encoding='utf-8') as fp:
+            json.dump(manifest, fp, indent=2)
+        return cls.open(directory)
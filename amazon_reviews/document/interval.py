@@ -8,34 +8,40 @@ From sentences `Sentence` to words `Token`
 """
 
 
+from functools import lru_cache
 import re
-from typing import List
+from typing import Iterable, List, Sequence
 
 
 class Interval:
     """
-    A class for representing a contiguous range of integers
+    A class for representing a contiguous range of integers.
+    Intervals are compared and hashed on their (start, end) span only
     """
 
+    __slots__ = ('_start', '_end')
+
     def __init__(self, start: int, end: int) -> None:
         """
         Constructor of the Interval class
         :param start: start of the range
         :param end: first integer not included the range
         """
-        self._start = int(start)
-        self._end = int(end)
-        if self.start > self.end:
-            raise ValueError(f"Start '{self.start}' must not be greater than end '{self.end}'")
-        if self.start < 0:
-            raise ValueError(f"Start '{self.start}' must not be negative")
+        start = int(start)
+        end = int(end)
+        if start > end:
+            raise ValueError(f"Start '{start}' must not be greater than end '{end}'")
+        if start < 0:
+            raise ValueError(f"Start '{start}' must not be negative")
+        self._start = start
+        self._end = end
 
     def __len__(self) -> int:
         """
         Compute the len of the Interval object
         :return: end - start
         """
-        return self.end - self.start
+        return self._end - self._start
 
     def __eq__(self, other: 'Interval') -> bool:
         """
@@ -43,7 +49,9 @@ class Interval:
         :param other: The Interval object to be compared with
         :return: If this is equivalent or not
         """
-        return self.start == other.start and self.end == other.end
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return self._start == other._start and self._end == other._end
 
     def __ne__(self, other: 'Interval') -> bool:
         """
@@ -51,7 +59,9 @@ class Interval:
         :param other: The Interval object to be compared with
         :return: If this is not equivalent or not
         """
-        return self.start != other.start or self.end != other.end
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return self._start != other._start or self._end != other._end
 
     def __lt__(self, other: 'Interval') -> bool:
         """
@@ -59,7 +69,8 @@ class Interval:
         :param other: The Interval object to be compared with
         :return: If this is lesser or not
         """
-        return (self.start, -len(self)) < (other.start, -len(other))
+        # Same order as (start, -len) without building the tuples, for a same start the longest comes first
+        return self._start < other._start or (self._start == other._start and self._end > other._end)
 
     def __le__(self, other: 'Interval') -> bool:
         """
@@ -67,7 +78,7 @@ class Interval:
         :param other: The Interval object to be compared with
         :return: If this is lesser or equal or not
         """
-        return (self.start, -len(self)) <= (other.start, -len(other))
+        return self._start < other._start or (self._start == other._start and self._end >= other._end)
 
     def __gt__(self, other: 'Interval') -> bool:
         """
@@ -75,7 +86,7 @@ class Interval:
         :param other: The Interval object to be compared with
         :return: If this is greater or not
         """
-        return (self.start, -len(self)) > (other.start, -len(other))
+        return self._start > other._start or (self._start == other._start and self._end < other._end)
 
     def __ge__(self, other: 'Interval') -> bool:
         """
@@ -83,14 +94,14 @@ class Interval:
         :param other: The Interval object to be compared with
         :return: If this is greater or equal or not
         """
-        return (self.start, -len(self)) >= (other.start, -len(other))
+        return self._start > other._start or (self._start == other._start and self._end <= other._end)
 
     def __hash__(self) -> hash:
         """
         Compute the hash of the interval object
         :return: Hash of the interval object
         """
-        return hash(tuple(v for k, v in sorted(self.__dict__.items())))
+        return hash((self._start, self._end))
 
     def __contains__(self, item: int) -> bool:
         """
@@ -98,7 +109,7 @@ class Interval:
         :param item: The index of the item to be checked
         :return: If the element is in the Interval or not
         """
-        return self.start <= item < self.end
+        return self._start <= item < self._end
 
     def __repr__(self) -> str:
         """
@@ -119,10 +130,10 @@ class Interval:
         Return the interval common to self and other
         :param other: The interval to intersect with
         """
-        a, b = sorted((self, other))
-        if a.end <= b.start:
-            return Interval(self.start, self.start)
-        return Interval(b.start, min(a.end, b.end))
+        a, b = (self, other) if self <= other else (other, self)
+        if a._end <= b._start:
+            return Interval(self._start, self._start)
+        return Interval(b._start, min(a._end, b._end))
 
     def overlaps(self, other: 'Interval') -> bool:
         """
@@ -130,8 +141,9 @@ class Interval:
         :param other: The interval to check the overlaps
         :return: If the is an interval or not as a bool
         """
-        a, b = sorted((self, other))
-        return a.end > b.start
+        if self <= other:
+            return self._end > other._start
+        return other._end > self._start
 
     def shift(self, i: int) -> None:
         """
@@ -163,6 +175,8 @@ class Token(Interval):
     A Interval representing word like units of text with a dictionary of features
     """
 
+    __slots__ = ('_doc', '_pos', '_shape', '_text')
+
     def __init__(self, document: 'amazon_reviews.document.Document', start: int, end: int,
                  pos: str, shape: str, text: str) -> None:
         """
@@ -179,8 +193,6 @@ class Token(Interval):
         """
         Interval.__init__(self, start, end)
         self._doc = document
-        self._start = int(start)
-        self._end = int(end)
         self._pos = pos
         self._shape = shape
         self._text = text
@@ -253,6 +265,8 @@ class Sentence(Interval):
     Interval corresponding to a Sentence
     """
 
+    __slots__ = ('_doc', '_token_range')
+
     def __init__(self, document: 'amazon_reviews.document.Document', start: int, end: int) -> None:
         """
         Constructor of the Sentence class
@@ -262,8 +276,7 @@ class Sentence(Interval):
         """
         Interval.__init__(self, start, end)
         self._doc = document
-        self._start = int(start)
-        self._end = int(end)
+        self._token_range = None
 
     def __repr__(self) -> str:
         """
@@ -273,12 +286,17 @@ class Sentence(Interval):
         return 'Sentence({}, {})'.format(self.start, self.end)
 
     @property
-    def tokens(self) -> List['Token']:
+    def tokens(self) -> Sequence['Token']:
         """
-        Get list of tokens contained in a sentence
+        Get list of tokens contained in a sentence, a slice of the document tokens when they are in the text order
         :return: the list of tokens contained in a sentence
         """
-        return [token for token in self._doc.tokens if self.overlaps(token)]
+        if self._token_range is None:
+            self._token_range = self._doc.token_range(self._start, self._end)
+            if self._token_range is None:
+                return [token for token in self._doc.tokens if self.overlaps(token)]
+        start, stop = self._token_range
+        return self._doc.tokens[start:stop]
 
     @property
     def document(self) -> 'amazon_reviews.document.Document':
@@ -305,24 +323,42 @@ class Sentence(Interval):
         return self._end
 
 
+_LINE_BREAK = re.compile('^[\n]+$')
+_NUMBER = re.compile('^[0-9.,]+$')
+_SPECIAL = re.compile('[^A-Za-z0-9\t\n ]+')
+_ALL_CAPS = re.compile(r'^[A-Z\-.]+$')
+_FIRST_CAP = re.compile(r'^[A-Z][a-z\-.]+$')
+_LOWER = re.compile(r'^[a-z\-.]+$')
+
+
 def get_shape_category(token: str) -> str:
     """
     Get the shape category of a token
     :param token: The Token to get the shape of
     :return: The shape category
     """
-    if re.match('^[\n]+$', token):  # IS LINE BREAK
+    if _LINE_BREAK.match(token):  # IS LINE BREAK
         return 'NL'
-    if any(char.isdigit() for char in token) and re.match('^[0-9.,]+$', token):  # IS NUMBER (E.G., 2, 2.000)
+    if any(char.isdigit() for char in token) and _NUMBER.match(token):  # IS NUMBER (E.G., 2, 2.000)
         return 'NUMBER'
-    if re.fullmatch('[^A-Za-z0-9\t\n ]+', token):  # IS SPECIAL CHARS (E.G., $, #, ., *)
+    if _SPECIAL.fullmatch(token):  # IS SPECIAL CHARS (E.G., $, #, ., *)
         return 'SPECIAL'
-    if re.fullmatch('^[A-Z\-.]+$', token):  # IS UPPERCASE (E.G., AGREEMENT, INC.)
+    if _ALL_CAPS.fullmatch(token):  # IS UPPERCASE (E.G., AGREEMENT, INC.)
         return 'ALL-CAPS'
-    if re.fullmatch('^[A-Z][a-z\-.]+$', token):  # FIRST LETTER UPPERCASE (E.G. This, Agreement)
+    if _FIRST_CAP.fullmatch(token):  # FIRST LETTER UPPERCASE (E.G. This, Agreement)
         return '1ST-CAP'
-    if re.fullmatch('^[a-z\-.]+$', token):  # IS LOWERCASE (E.G., may, third-party)
+    if _LOWER.fullmatch(token):  # IS LOWERCASE (E.G., may, third-party)
         return 'LOWER'
-    if not token.isupper() and not token.islower():  # WEIRD CASE (E.G., 3RD, E2, iPhone)
-        return 'MISC'
-    return 'MISC'
+    return 'MISC'  # WEIRD CASE (E.G., 3RD, E2, iPhone)
+
+
+_cached_shape_category = lru_cache(maxsize=1 << 16)(get_shape_category)
+
+
+def get_shape_categories(tokens: Iterable[str]) -> List[str]:
+    """
+    Get the shape category of a batch of tokens, memoized as the vocabulary of reviews repeats heavily
+    :param tokens: The Tokens to get the shape of
+    :return: The list of shape categories (one per token)
+    """
+    return list(map(_cached_shape_category, tokens))
@@ -7,11 +7,19 @@ Package for parsing documents
 """
 
 
+import bz2
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+from itertools import islice
 import json
+import lzma
 import os
-from typing import List, Optional
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
 
+from amazon_reviews.metrics import METRICS
 from config import DATA_DIR
+from .cache import TokenizationCache
 from .document import Document
 
 
@@ -20,27 +28,141 @@ class Parser:
     Parent class for all parser
     """
 
+    OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
     @classmethod
-    def read_file(cls, filename: str) -> List[Document]:
+    def open_file(cls, filepath: str) -> IO[str]:
         """
-        Read a file and return a Document
-        :param filename: The file path to load
-        :return: The constructed Document
+        Open a file as text, decompressing it on the fly according to its extension (.gz, .bz2 or .xz)
+        :param filepath: The file path to open
+        :return: The opened file object
+        """
+        opener = cls.OPENERS.get(os.path.splitext(filepath)[1], open)
+        return opener(filepath, 'rt', encoding='utf-8')
+
+    @classmethod
+    def iter_file(cls, filename: str, limit: Optional[int] = None, skip: int = 0,
+                  workers: Optional[int] = None, chunksize: int = 256,
+                  cache: Optional[TokenizationCache] = None) -> Iterator[Document]:
+        """
+        Lazily read a file line by line and yield its Documents in the file order
+        :param filename: The file path to load, relative to DATA_DIR
+        :param limit: The maximum number of lines to read, None to read the whole file
+        :param skip: The number of lines to skip at the beginning of the file
+        :param workers: The number of processes building the Documents, None to build them in this process
+        :param chunksize: The number of lines read at once, sent to a worker process if there are workers
+        :param cache: The tokenization cache to use, None to always tokenize the documents
+        :return: A generator of the constructed Documents
         """
-        docs = []
         filepath = os.path.join(DATA_DIR, filename)
-        with open(filepath, 'r', encoding='utf-8') as fp:
-            for line in fp.readlines():
-                doc = cls.read(line)
-                if doc is not None:
-                    docs.append(doc)
+        with cls.open_file(filepath) as fp:
+            stop = None if limit is None else skip + limit
+            lines = islice(fp, skip, stop)
+            if not workers or workers <= 1:
+                for chunk in cls._chunks(lines, chunksize):
+                    docs = cls.read_lines(chunk, cache=cache)
+                    if cache is not None:
+                        # The accesses of the chunk hits are written at once, as the worker processes do on close
+                        cache.flush()
+                    yield from docs
+                return
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Only a bounded number of chunks are in flight so memory does not grow with the file size
+                pending = deque()
+                for chunk in cls._chunks(lines, chunksize):
+                    pending.append(executor.submit(cls._read_chunk, chunk, cache, METRICS.enabled))
+                    if len(pending) >= 2 * workers:
+                        yield from cls._chunk_result(pending.popleft(), cache)
+                while pending:
+                    yield from cls._chunk_result(pending.popleft(), cache)
+
+    @classmethod
+    def read_file(cls, filename: str, limit: Optional[int] = None, skip: int = 0,
+                  workers: Optional[int] = None, chunksize: int = 256,
+                  cache: Optional[TokenizationCache] = None) -> List[Document]:
+        """
+        Read a file and return its Documents
+        :param filename: The file path to load, relative to DATA_DIR
+        :param limit: The maximum number of lines to read, None to read the whole file
+        :param skip: The number of lines to skip at the beginning of the file
+        :param workers: The number of processes building the Documents, None to build them in this process
+        :param chunksize: The number of lines read at once, sent to a worker process if there are workers
+        :param cache: The tokenization cache to use, None to always tokenize the documents
+        :return: The list of constructed Documents
+        """
+        return list(cls.iter_file(filename, limit=limit, skip=skip, workers=workers, chunksize=chunksize,
+                                  cache=cache))
+
+    @classmethod
+    def read_lines(cls, lines: List[str], cache: Optional[TokenizationCache] = None) -> List[Document]:
+        """
+        Read a chunk of lines and return the non empty Documents
+        :param lines: The lines of the file
+        :param cache: The tokenization cache to use, None to always tokenize the documents
+        :return: The list of constructed Documents
+        """
+        docs = []
+        for line in lines:
+            doc = cls.read(line, cache=cache)
+            if doc is not None:
+                docs.append(doc)
         return docs
 
     @classmethod
-    def read(cls, content: str) -> Document:
+    def _read_chunk(cls, lines: List[str], cache: Optional[TokenizationCache], metrics: bool = False)\
+            -> Tuple[List[Document], int, int, Optional[dict]]:
+        """
+        Read a chunk of lines in a worker process
+        :param lines: The lines of the file
+        :param cache: The tokenization cache to use, None to always tokenize the documents
+        :param metrics: If the metrics are recorded, they are enabled in the main process
+        :return: The list of constructed Documents, the number of cache hits and misses of the worker
+                 and the metrics recorded by the worker (None if they are disabled)
+        """
+        if metrics:
+            METRICS.enable()
+        docs = cls.read_lines(lines, cache=cache)
+        snapshot = METRICS.snapshot() if metrics else None
+        if cache is None:
+            return docs, 0, 0, snapshot
+        cache.close()
+        return docs, cache.hits, cache.misses, snapshot
+
+    @staticmethod
+    def _chunk_result(future: 'concurrent.futures.Future', cache: Optional[TokenizationCache]) -> List[Document]:
+        """
+        Wait for a chunk read by a worker process and report its cache counters and its metrics to this process
+        :param future: The future of the `_read_chunk` call
+        :param cache: The tokenization cache used, None if there is none
+        :return: The list of constructed Documents
+        """
+        docs, hits, misses, metrics = future.result()
+        METRICS.merge(metrics)
+        if cache is not None:
+            cache.hits += hits
+            cache.misses += misses
+        return docs
+
+    @staticmethod
+    def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+        """
+        Split an iterable into lists of `size` elements, the last one may be shorter
+        :param iterable: The iterable to split
+        :param size: The number of elements of a chunk
+        :return: A generator of the chunks
+        """
+        iterator = iter(iterable)
+        chunk = list(islice(iterator, size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(iterator, size))
+
+    @classmethod
+    def read(cls, content: str, cache: Optional[TokenizationCache] = None) -> Document:
         """
         Read the content of the file and return a Document
         :param content: The content of the the text
+        :param cache: The tokenization cache to use, None to always tokenize the document
         :return: The constructed Document
         """
         raise NotImplementedError
@@ -52,15 +174,53 @@ class AmazonReviewParser(Parser):
     """
 
     @classmethod
-    def read(cls, content: str) -> Optional[Document]:
+    def read(cls, content: str, cache: Optional[TokenizationCache] = None) -> Optional[Document]:
         """
         Read the content of the file and return a Document if the doc is non empty
         :param content: The content of the the text
+        :param cache: The tokenization cache to use, None to always tokenize the document
         :return: The constructed Document
         """
-        reviews = json.loads(content)
-        if reviews['reviewText'] and reviews['overall']:
-            doc = Document.create_from_text(reviews['reviewText'])
-            doc.rating = reviews['overall']
-            return doc
-        return None
+        docs = cls.read_lines([content], cache=cache)
+        return docs[0] if docs else None
+
+    @classmethod
+    def count_file(cls, filename: str, limit: Optional[int] = None, skip: int = 0) -> int:
+        """
+        Count the Documents of a file without tokenizing them, e.g. to know the number of batches of a stream
+        :param filename: The file path to load, relative to DATA_DIR
+        :param limit: The maximum number of lines to read, None to read the whole file
+        :param skip: The number of lines to skip at the beginning of the file
+        :return: The number of Documents `iter_file` yields
+        """
+        with cls.open_file(os.path.join(DATA_DIR, filename)) as fp:
+            stop = None if limit is None else skip + limit
+            return sum(1 for line in islice(fp, skip, stop) if cls._is_review(json.loads(line)))
+
+    @staticmethod
+    def _is_review(review: dict) -> bool:
+        """
+        Check if a decoded review has a text and a rating
+        :param review: The decoded review
+        :return: True if a Document is built from the review
+        """
+        return bool(review['reviewText'] and review['overall'])
+
+    @classmethod
+    def read_lines(cls, lines: List[str], cache: Optional[TokenizationCache] = None) -> List[Document]:
+        """
+        Read a chunk of reviews and return the Documents of the non empty ones, tokenized together
+        :param lines: The lines of the file, one review per line
+        :param cache: The tokenization cache to use, None to always tokenize the documents
+        :return: The list of constructed Documents
+        """
+        reviews = []
+        for line in lines:
+            with METRICS.stage('json_decode'):
+                review = json.loads(line)
+            if cls._is_review(review):
+                reviews.append(review)
+        docs = Document.create_many([review['reviewText'] for review in reviews], cache=cache)
+        for doc, review in zip(docs, reviews):
+            doc.rating = review['overall']
+        return docs
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package defining the part of speech and shape tag sets, with the integer code of each tag.
+The codes are both the storage of the tokens in a `Document` and the features of the `Vectorizer`
+"""
+
+
+# Version of the tag sets, bump it when a code changes: a model is only valid for the version it was trained on
+TAGSET_VERSION = 2
+
+POS2INDEX = {'PAD': 0, 'TO': 1, 'VBN': 2, "''": 3, 'WP': 4, 'UH': 5, 'VBG': 6, 'JJ': 7, 'VBZ': 8,
+             '--': 9, 'VBP': 10, 'NN': 11, 'DT': 12, 'PRP': 13, ':': 14, 'WP$': 15, 'NNPS': 16,
+             'PRP$': 17, 'WDT': 18, '(': 19, ')': 20, '.': 21, ',': 22, '``': 23, '$': 24, 'RB': 25,
+             'RBR': 26, 'RBS': 27, 'VBD': 28, 'IN': 29, 'FW': 30, 'RP': 31, 'JJR': 32, 'JJS': 33,
+             'PDT': 34, 'MD': 35, 'VB': 36, 'WRB': 37, 'NNP': 38, 'EX': 39, 'NNS': 40, 'SYM': 41,
+             'CC': 42, 'CD': 43, 'POS': 44, 'LS': 45, '#': 46, 'NL': 47}
+INDEX2POS = sorted(POS2INDEX, key=POS2INDEX.get)
+
+# Code 0 of both tag sets is the padding, masked by the models
+SHAPE2INDEX = {'PAD': 0, 'NUMBER': 1, 'SPECIAL': 2, 'ALL-CAPS': 3, '1ST-CAP': 4, 'LOWER': 5, 'MISC': 6, 'NL': 7}
+INDEX2SHAPE = sorted(SHAPE2INDEX, key=SHAPE2INDEX.get)
+
+# Code of a tag missing from its tag set, the tag itself is then kept aside by the `Document`
+UNKNOWN = 255
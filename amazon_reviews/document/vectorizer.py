@@ -7,13 +7,21 @@ Package for for vectorizing documents
 """
 
 
+import copy
+import hashlib
+import json
 import os
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Tuple, Union
 
-from gensim.models import KeyedVectors
 import numpy as np
 
-from config import GLOVE_DIR
+from amazon_reviews.metrics import METRICS
+from config import DATA_DIR, GLOVE_DIR
+from .cache import TokenizationCache
+from .embeddings import WordEmbeddings
+from .feature_store import FeatureStore, RaggedArray
+from .parser import AmazonReviewParser
+from .tagset import POS2INDEX, SHAPE2INDEX, TAGSET_VERSION, UNKNOWN
 
 
 class Vectorizer:
@@ -24,48 +32,90 @@ class Vectorizer:
     def __init__(self, word_embedding_path: str) -> None:
         """
         initialize the class
-        :param word_embedding_path: path to gensim embedding file
+        :param word_embedding_path: path to gensim embedding file, its binary store is used if it has been converted
         """
+        self.word_embedding_path = word_embedding_path
         filename = os.path.join(GLOVE_DIR, word_embedding_path)
-        self.word_embeddings = KeyedVectors.load_word2vec_format(filename, binary=False)
-        self.pos2index = {'PAD': 0, 'TO': 1, 'VBN': 2, "''": 3, 'WP': 4, 'UH': 5, 'VBG': 6, 'JJ': 7, 'VBZ': 8,
-                          '--': 9, 'VBP': 10, 'NN': 11, 'DT': 12, 'PRP': 13, ':': 14, 'WP$': 15, 'NNPS': 16,
-                          'PRP$': 17, 'WDT': 18, '(': 19, ')': 20, '.': 21, ',': 22, '``': 23, '$': 24, 'RB': 25,
-                          'RBR': 26, 'RBS': 27, 'VBD': 28, 'IN': 29, 'FW': 30, 'RP': 31, 'JJR': 32, 'JJS': 33,
-                          'PDT': 34, 'MD': 35, 'VB': 36, 'WRB': 37, 'NNP': 38, 'EX': 39, 'NNS': 40, 'SYM': 41,
-                          'CC': 42, 'CD': 43, 'POS': 44, 'LS': 45, '#': 46}
-        self.shape2index = {'NL': 0, 'NUMBER': 1, 'SPECIAL': 2, 'ALL-CAPS': 3,
-                            '1ST-CAP': 4, 'LOWER': 5, 'MISC': 6}
+        self.word_embeddings = WordEmbeddings.load(filename)
+        self._index_words()
+        # Rows of the embedding file kept by `prune`, None if the whole vocabulary is used
+        self.vocabulary_rows = None
+        self.pos2index = POS2INDEX
+        self.shape2index = SHAPE2INDEX
         self.labels2index = {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}
+        self._vocabulary_hash = None
 
-    def encode_features(self, documents: List['amazon_reviews.document.Document'])\
-            -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+    def encode_features(self, documents: List['amazon_reviews.document.Document'], ragged: bool = False,
+                        max_len: Optional[int] = None, truncating: str = 'post')\
+            -> Tuple[Union['np.ndarray', RaggedArray], Union['np.ndarray', RaggedArray],
+                     Union['np.ndarray', RaggedArray]]:
         """
         Creates a feature matrix for all documents in the sample list
         :param documents: list of all samples as document objects
+        :param ragged: If the features are returned unpadded as `RaggedArray` (CSR style): flat int32 word ids,
+                       flat uint8 pos and shape codes, sharing the offsets of each document
+        :param max_len: The maximum number of tokens kept per document, None to keep all of them
+        :param truncating: Remove the tokens past `max_len` at the end ('post') or at the beginning ('pre')
         :return: lists of numpy arrays for word, pos and shape features.
-                 Each item in the list is a sentence, i.e. a list of indices (one per token)
-        """
-        nb_max_words = 0
-        for doc in documents:
-            if len(doc.tokens) > nb_max_words:
-                nb_max_words = len(doc.tokens)
-        words = np.empty((len(documents), nb_max_words))
-        pos = np.empty((len(documents), nb_max_words))
-        shape = np.empty((len(documents), nb_max_words))
-        doc_nb = 0
-        for doc in documents:
-            word_nb = 0
-            for token in doc.tokens:
-                if token.text.lower() in self.word_embeddings.index2word:
-                    words[doc_nb][word_nb] = self.word_embeddings.index2word.index(token.text.lower())
-                else:
-                    words[doc_nb][word_nb] = 0
-                pos[doc_nb][word_nb] = self.pos2index[token.pos]
-                shape[doc_nb][word_nb] = self.shape2index[token.shape]
-                word_nb = word_nb + 1
-            doc_nb = doc_nb + 1
-        return words, pos, shape
+                 Each item in the list is a sentence, i.e. a list of indices (one per token), padded with 0
+        """
+        with METRICS.stage('embedding_lookup'):
+            features = [self.encode_document(doc) for doc in documents]
+        return self.stack_features(features, ragged=ragged, max_len=max_len, truncating=truncating)
+
+    @staticmethod
+    def stack_features(features: List[Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']], ragged: bool = False,
+                       max_len: Optional[int] = None, truncating: str = 'post')\
+            -> Tuple[Union['np.ndarray', RaggedArray], Union['np.ndarray', RaggedArray],
+                     Union['np.ndarray', RaggedArray]]:
+        """
+        Stack the features of several documents, e.g. the ones `encode_document` did not fail on
+        :param features: The word, pos and shape features of each document, as returned by `encode_document`
+        :param ragged: If the features are returned unpadded as `RaggedArray`, as in `encode_features`
+        :param max_len: The maximum number of tokens kept per document, None to keep all of them
+        :param truncating: Remove the tokens past `max_len` at the end ('post') or at the beginning ('pre')
+        :return: The word, pos and shape features, padded with 0 unless `ragged`
+        """
+        if truncating not in ('pre', 'post'):
+            raise ValueError(f"Truncating '{truncating}' must be 'pre' or 'post'")
+        if max_len is not None:
+            features = [tuple(f[:max_len] if truncating == 'post' else f[max(0, len(f) - max_len):] for f in feature)
+                        for feature in features]
+        offsets = np.zeros(len(features) + 1, dtype=np.int64)
+        np.cumsum([len(feature[0]) for feature in features], out=offsets[1:])
+        words, pos, shape = (RaggedArray(np.concatenate([feature[i] for feature in features] or
+                                                        [np.zeros(0, dtype=dtype)]).astype(dtype, copy=False),
+                                         offsets)
+                             for i, dtype in enumerate((np.int32, np.uint8, np.uint8)))
+        if ragged:
+            return words, pos, shape
+        return words.to_dense(), pos.to_dense(), shape.to_dense()
+
+    def encode_document(self, document: 'amazon_reviews.document.Document')\
+            -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """
+        Creates the unpadded features of a single document
+        :param document: The document to encode
+        :return: numpy arrays for word (int32), pos and shape (uint8) features, of one index per token
+        """
+        words = np.asarray(self.encode_words(document.token_texts()), dtype=np.int32)
+        for codes, tags in ((document.pos_codes, document.pos_tags), (document.shape_codes, document.shape_tags)):
+            unknown = np.flatnonzero(codes == UNKNOWN)
+            if len(unknown):
+                raise KeyError(tags()[unknown[0]])
+        return words, document.pos_codes, document.shape_codes
+
+    def encode_words(self, words: List[str]) -> List[int]:
+        """
+        Map a batch of words to their index in the word embeddings, unknown words are mapped to 0
+        :param words: The words to encode, e.g. the tokens text of a document
+        :return: The list of indices (one per word)
+        """
+        word2index = self.word2index
+        if METRICS.enabled:
+            METRICS.add('encoded_words', len(words))
+            METRICS.add('oov_words', sum(word not in word2index for word in map(str.lower, words)))
+        return [word2index.get(word, 0) for word in map(str.lower, words)]
 
     def encode_annotations(self, documents: List['amazon_reviews.document.Document']) -> 'np.ndarray':
         """
@@ -74,3 +124,194 @@ class Vectorizer:
         :return: A numpy array where each item in the list is a sentence, i.e. a list of labels (one per token)
         """
         return np.asarray([self.labels2index[doc.rating] for doc in documents], dtype=np.int8)
+
+    def _index_words(self) -> None:
+        """
+        Map each word of the embeddings to its index, the first occurrence of a word wins
+        """
+        self.word2index = {}
+        for index, word in enumerate(self.word_embeddings.index2word):
+            self.word2index.setdefault(word, index)
+        self._vocabulary_hash = None
+
+    def prune(self, word: Union['np.ndarray', RaggedArray], nb_training: Optional[int] = None)\
+            -> Union['np.ndarray', RaggedArray]:
+        """
+        Keep only the words of the embeddings seen in a training corpus, so that the embedding layer of a model
+        built on `word_embeddings` holds the corpus vocabulary instead of the whole embedding file.
+        Index 0 stays the padding and out of vocabulary index
+        :param word: The word features of the corpus, encoded with the whole vocabulary
+        :param nb_training: The number of documents of the training corpus at the beginning of `word`, the words
+                            seen only in the next ones (e.g. the validation split) become out of vocabulary,
+                            None if they are all training documents
+        :return: The word features re-encoded with the pruned vocabulary
+        """
+        if isinstance(word, RaggedArray):
+            # The flat array of a RaggedArray slice also holds the values of the other documents
+            stop = len(word) if nb_training is None else min(nb_training, len(word))
+            values = word.values[word.offsets[0]:word.offsets[stop]]
+        else:
+            values = word if nb_training is None else word[:nb_training]
+        rows = np.union1d(np.zeros(1, dtype=np.int64), np.unique(values))
+        self.restrict(rows)
+        return self.remap(word)
+
+    def copy(self) -> 'Vectorizer':
+        """
+        Copy the vectorizer without loading the word embeddings again, e.g. to restrict the vocabulary of the copy
+        :return: The Vectorizer object, sharing the word embeddings
+        """
+        return copy.copy(self)
+
+    def restrict(self, rows: 'np.ndarray') -> None:
+        """
+        Restrict the vocabulary to some rows of the embedding file
+        :param rows: The sorted rows of the words to keep, starting with row 0
+        """
+        if self.vocabulary_rows is not None:
+            raise ValueError(f"Vocabulary of '{self.word_embedding_path}' is already pruned")
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows) or rows[0] != 0 or np.any(np.diff(rows) <= 0):
+            raise ValueError('Rows must be sorted, unique and start with row 0')
+        self.word_embeddings = self.word_embeddings.subset(rows)
+        self.vocabulary_rows = rows
+        self._index_words()
+
+    def remap(self, word: Union['np.ndarray', RaggedArray]) -> Union['np.ndarray', RaggedArray]:
+        """
+        Re-encode word features encoded with the whole vocabulary (e.g. a feature store) with the pruned one,
+        words outside the pruned vocabulary become out of vocabulary
+        :param word: The word features encoded with the whole vocabulary
+        :return: The word features encoded with the pruned vocabulary
+        """
+        if isinstance(word, RaggedArray):
+            return RaggedArray(self.remap(word.values), word.offsets)
+        if self.vocabulary_rows is None:
+            return word
+        rows = self.vocabulary_rows
+        positions = np.minimum(np.searchsorted(rows, word), len(rows) - 1)
+        return np.where(rows[positions] == word, positions, 0).astype(np.int32)
+
+    @staticmethod
+    def vocabulary_path(model_filename: str) -> str:
+        """
+        Get the path of the vocabulary saved next to a model
+        :param model_filename: The model file
+        :return: The path of the vocabulary file
+        """
+        return os.path.splitext(model_filename)[0] + '.vocab.json'
+
+    def save_vocabulary(self, filepath: str) -> None:
+        """
+        Save the pruned vocabulary, e.g. next to the model trained with it
+        :param filepath: The path of the vocabulary file
+        """
+        if self.vocabulary_rows is None:
+            raise ValueError(f"Vocabulary of '{self.word_embedding_path}' is not pruned")
+        with open(filepath, 'w', encoding='utf-8') as fp:
+            json.dump({'embedding_file': self.word_embedding_path, 'tagset_version': TAGSET_VERSION,
+                       'rows': self.vocabulary_rows.tolist()}, fp)
+
+    def load_vocabulary(self, filepath: str) -> None:
+        """
+        Restrict the vocabulary to a saved pruned vocabulary, so that documents are encoded as for the model
+        :param filepath: The path of the vocabulary file
+        """
+        with open(filepath, 'r', encoding='utf-8') as fp:
+            vocabulary = json.load(fp)
+        if vocabulary['embedding_file'] != self.word_embedding_path:
+            raise ValueError(f"Vocabulary '{filepath}' was pruned from '{vocabulary['embedding_file']}' "
+                             f"instead of '{self.word_embedding_path}'")
+        # Vocabularies saved before the tag sets were versioned belong to version 1
+        if vocabulary.get('tagset_version', 1) != TAGSET_VERSION:
+            raise ValueError(f"Vocabulary '{filepath}' was saved with the tag set version "
+                             f"'{vocabulary.get('tagset_version', 1)}' instead of '{TAGSET_VERSION}', "
+                             f"its model must be retrained")
+        self.restrict(np.asarray(vocabulary['rows'], dtype=np.int64))
+
+    def load_model_vocabulary(self, model_filename: str, vocabulary_size: int) -> None:
+        """
+        Restrict the vocabulary to the one a model was trained with, saved next to it by `vocabulary_path`,
+        and check the model embeds as many words as this vectorizer encodes
+        :param model_filename: The path of the model file
+        :param vocabulary_size: The number of rows of the word embeddings of the model
+        """
+        vocabulary_path = self.vocabulary_path(model_filename)
+        if os.path.isfile(vocabulary_path):
+            self.load_vocabulary(vocabulary_path)
+        if vocabulary_size != len(self.word_embeddings):
+            raise ValueError(f"Model '{model_filename}' embeds '{vocabulary_size}' words instead of "
+                             f"'{len(self.word_embeddings)}', its vocabulary file '{vocabulary_path}' "
+                             f"is missing or does not belong to it")
+
+    @property
+    def vocabulary_hash(self) -> str:
+        """
+        Hash of the vocabulary of the word embeddings, to check features were encoded with the same indices
+        :return: The hexadecimal hash of the vocabulary
+        """
+        if self._vocabulary_hash is None:
+            self._vocabulary_hash = hashlib.sha1('\n'.join(self.word_embeddings.index2word).encode('utf-8')).hexdigest()
+        return self._vocabulary_hash
+
+    def manifest(self) -> dict:
+        """
+        Describe how this vectorizer encodes documents
+        :return: The embedding file, the vocabulary hash, the tag set version and the label and tag mappings
+        """
+        return {
+            'embedding_file': self.word_embedding_path,
+            'vocabulary_hash': self.vocabulary_hash,
+            'labels2index': {str(label): index for label, index in self.labels2index.items()},
+            'tagset_version': TAGSET_VERSION,
+            'pos2index': self.pos2index,
+            'shape2index': self.shape2index
+        }
+
+    def save_features(self, documents: Iterable['amazon_reviews.document.Document'], directory: str,
+                      source: Optional[dict] = None) -> FeatureStore:
+        """
+        Encode documents one by one into a feature store, e.g. straight from `AmazonReviewParser.iter_file`
+        :param documents: The documents to encode
+        :param directory: The directory of the store, relative to DATA_DIR
+        :param source: The review file the documents are read from and its slice,
+                       e.g. {'filename': 'Automotive_5_train.json', 'skip': 0, 'limit': None}
+        :return: The written FeatureStore object, opened memory-mapped
+        """
+        features = (self.encode_document(doc) + (self.labels2index[doc.rating], doc.rating) for doc in documents)
+        return FeatureStore.write(os.path.join(DATA_DIR, directory), features, dict(self.manifest(), source=source))
+
+    def load_features(self, directory: str, source: Optional[dict] = None) -> FeatureStore:
+        """
+        Open a feature store and check it was encoded the same way as this vectorizer would,
+        from the same review file if one is given
+        :param directory: The directory of the store, relative to DATA_DIR
+        :param source: The review file the features must come from and its slice, as given to `save_features`
+        :return: The opened FeatureStore object, memory-mapped
+        """
+        store = FeatureStore.open(os.path.join(DATA_DIR, directory))
+        manifest = self.manifest()
+        if source is not None:
+            manifest['source'] = source
+        for key, value in manifest.items():
+            if store.manifest.get(key) != value:
+                raise ValueError(f"Feature store '{directory}' was encoded with a different {key}: "
+                                 f"'{store.manifest.get(key)}' instead of '{value}'")
+        return store
+
+    def open_or_write_features(self, filename: str, directory: str, cache: Optional[TokenizationCache] = None,
+                               workers: Optional[int] = None) -> FeatureStore:
+        """
+        Open the feature store of a whole review file, or encode the file into it on first use
+        :param filename: The review file, relative to DATA_DIR
+        :param directory: The directory of the store, relative to DATA_DIR
+        :param cache: The tokenization cache used when the file is read, None to always tokenize the documents
+        :param workers: The number of processes building the Documents when the file is read
+        :return: The FeatureStore object, opened memory-mapped
+        """
+        # Recorded in the feature store so that it is not reused for another review file
+        source = {'filename': filename, 'skip': 0, 'limit': None}
+        if FeatureStore.exists(os.path.join(DATA_DIR, directory)):
+            return self.load_features(directory, source)
+        documents = AmazonReviewParser.iter_file(filename, workers=workers, cache=cache)
+        return self.save_features(documents, directory, source)
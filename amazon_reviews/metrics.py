@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which instrument the stages of the pipeline (JSON decoding, tokenization, tagging, alignment,
+embedding lookup, Keras) with timers and counters, exported as a JSON report or a Prometheus text file.
+Instrumentation is disabled by default, it is enabled with `METRICS.enable()` or the `AMAZON_REVIEWS_METRICS`
+environment variable; when disabled a stage only returns a shared no-op context manager
+"""
+
+
+from contextlib import contextmanager
+import json
+import os
+import time
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class _NullStage:
+    """
+    Context manager doing nothing, returned by `Metrics.stage` when the instrumentation is disabled
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        """
+        Enter the stage
+        """
+
+    def __exit__(self, *args) -> None:
+        """
+        Exit the stage
+        """
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Metrics:
+    """
+    Accumulate the time spent and the number of calls of each stage, and counters such as
+    the number of documents, tokens, out of vocabulary words or misaligned tokens
+    """
+
+    PREFIX = 'amazon_reviews'
+
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Constructor of the Metrics class
+        :param enabled: If the stages and counters are recorded
+        """
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+
+    def enable(self) -> None:
+        """
+        Start recording, from a clean state
+        """
+        self.reset()
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Stop recording, the recorded values are kept
+        """
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Forget the recorded values
+        """
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+
+    def stage(self, name: str) -> 'typing.ContextManager':
+        """
+        Time a block of code: `with METRICS.stage('tokenize'): ...`
+        :param name: The name of the stage
+        :return: The context manager timing the block
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        """
+        Time a block of code and add its duration to its stage
+        :param name: The name of the stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float, calls: int = 1) -> None:
+        """
+        Add time spent in a stage
+        :param name: The name of the stage
+        :param seconds: The time spent
+        :param calls: The number of calls the time was spent in
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [calls, seconds]
+        else:
+            stage[0] += calls
+            stage[1] += seconds
+
+    def add(self, name: str, value: int = 1) -> None:
+        """
+        Increment a counter, callers check `enabled` first on hot paths
+        :param name: The name of the counter
+        :param value: The increment
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> dict:
+        """
+        Copy the recorded values, e.g. to send them from a worker process to the main one
+        :return: The stages and the counters
+        """
+        return {'stages': {name: list(stage) for name, stage in self.stages.items()},
+                'counters': dict(self.counters)}
+
+    def merge(self, snapshot: Optional[dict]) -> None:
+        """
+        Add the values recorded by another process
+        :param snapshot: The result of `snapshot` in the other process, None if it recorded nothing
+        """
+        if snapshot is None:
+            return
+        for name, (calls, seconds) in snapshot['stages'].items():
+            self.add_time(name, seconds, calls)
+        for name, value in snapshot['counters'].items():
+            self.add(name, value)
+
+    @staticmethod
+    def peak_rss() -> Optional[int]:
+        """
+        Peak resident set size of this process and of its terminated children (e.g. the parser workers)
+        :return: The peak RSS in bytes, None if it is not available on this platform
+        """
+        if resource is None:
+            return None
+        # ru_maxrss is in kilobytes on Linux
+        return 1024 * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                          resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    def report(self) -> dict:
+        """
+        Summarize the recorded values
+        :return: The stages (calls and seconds), the counters, the documents and tokens per second
+                 since the instrumentation was enabled, the out of vocabulary rate and the peak RSS
+        """
+        elapsed = time.perf_counter() - self.started
+        counters = self.counters
+        return {
+            'elapsed_seconds': elapsed,
+            'stages': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in
+                       sorted(self.stages.items())},
+            'counters': dict(sorted(counters.items())),
+            'documents_per_second': counters.get('documents', 0) / elapsed if elapsed else 0.,
+            'tokens_per_second': counters.get('tokens', 0) / elapsed if elapsed else 0.,
+            'oov_rate': counters.get('oov_words', 0) / counters['encoded_words']
+            if counters.get('encoded_words') else 0.,
+            'peak_rss_bytes': self.peak_rss()
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Format the report in the Prometheus text exposition format
+        :return: The text of the metrics
+        """
+        report = self.report()
+        prefix = self.PREFIX
+        lines = [f'# TYPE {prefix}_stage_seconds_total counter',
+                 f'# TYPE {prefix}_stage_calls_total counter']
+        for name, stage in report['stages'].items():
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {stage["seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {stage["calls"]}')
+        for name, value in report['counters'].items():
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {value}')
+        gauges = {name: report[name] for name in ('elapsed_seconds', 'documents_per_second', 'tokens_per_second',
+                                                  'oov_rate', 'peak_rss_bytes') if report[name] is not None}
+        for name, value in gauges.items():
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            lines.append(f'{prefix}_{name} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, filepath: str) -> None:
+        """
+        Write the report, in the Prometheus text format if the file extension is .prom, else as JSON
+        :param filepath: The path of the file to write
+        """
+        with open(filepath, 'w', encoding='utf-8') as fp:
+            if os.path.splitext(filepath)[1] == '.prom':
+                fp.write(self.to_prometheus())
+            else:
+                json.dump(self.report(), fp, indent=2)
+
+
+# The metrics of this process, shared by all the instrumented modules
+METRICS = Metrics(enabled=bool(os.environ.get('AMAZON_REVIEWS_METRICS')))
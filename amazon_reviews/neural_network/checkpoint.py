@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which save the full state of a training run so that it can be resumed after an interruption:
+the model with its optimizer state, the epoch and batch position in the `BucketedSequence`, its seed,
+the state of the other callbacks (e.g. `EarlyStopping`) and of the Python and NumPy random generators.
+The random generator of the Keras backend (e.g. the dropout masks) is not restored
+"""
+
+
+import json
+import os
+import random
+from typing import List, Optional
+
+from keras.callbacks import Callback
+import numpy as np
+
+from .sequence import BucketedSequence
+
+
+class TrainingCheckpoint(Callback):
+    """
+    Keras callback writing a checkpoint at the end of each epoch, and every `every_batches` batches if given.
+    A checkpoint is a model file and a `state.json` file pointing to it, only the last one is kept.
+    It must be the last callback of the training so that the state of the others is restored after they reset it
+    """
+
+    STATE_FILENAME = 'state.json'
+    # Attributes of the callbacks changing during the training, e.g. the patience counter of `EarlyStopping`
+    CALLBACK_ATTRIBUTES = ('wait', 'best', 'stopped_epoch')
+
+    def __init__(self, directory: str, sequence: BucketedSequence, every_batches: Optional[int] = None,
+                 callbacks: Optional[List['keras.callbacks.Callback']] = None) -> None:
+        """
+        Constructor of the TrainingCheckpoint class
+        :param directory: The directory of the checkpoint
+        :param sequence: The training sequence
+        :param every_batches: The number of batches between two checkpoints within an epoch, None for epochs only
+        :param callbacks: The other callbacks whose state is saved
+        """
+        super().__init__()
+        self.directory = directory
+        self.sequence = sequence
+        self.every_batches = every_batches
+        self.callbacks = callbacks or []
+        # The last saved or restored state
+        self.state = None
+        self.epoch = 0
+        # The number of batches of the current epoch skipped by the sequence when this call of the training began,
+        # `sequence.start` is reset by the Keras enqueuer thread once it has queued the last batches of the epoch
+        self.start = 0
+
+    @property
+    def state_path(self) -> str:
+        """
+        Get the path of the state file
+        :return: The path of the state file
+        """
+        return os.path.join(self.directory, self.STATE_FILENAME)
+
+    @property
+    def model_path(self) -> Optional[str]:
+        """
+        Get the path of the model file of the last checkpoint
+        :return: The path of the model file, None if there is no checkpoint
+        """
+        return os.path.join(self.directory, self.state['model']) if self.state else None
+
+    @property
+    def position(self) -> tuple:
+        """
+        Get the position the training stopped at
+        :return: The epoch and the number of batches of this epoch already trained on, (0, 0) without checkpoint
+        """
+        return (self.state['epoch'], self.state['batch']) if self.state else (0, 0)
+
+    @property
+    def stopped(self) -> bool:
+        """
+        Check if the training was stopped by a callback, e.g. `EarlyStopping`
+        :return: True if the training must not be resumed
+        """
+        return bool(self.state and self.state['stopped'])
+
+    def restore(self) -> bool:
+        """
+        Read the last checkpoint, the seed of the sequence and the random generators are restored immediately,
+        the state of the callbacks when the training begins
+        :return: True if there was a checkpoint to restore
+        """
+        if not os.path.isfile(self.state_path):
+            return False
+        with open(self.state_path, 'r', encoding='utf-8') as fp:
+            self.state = json.load(fp)
+        self.sequence.seed = self.state['seed']
+        python_random = self.state['python_random']
+        random.setstate((python_random[0], tuple(python_random[1]), python_random[2]))
+        numpy_random = self.state['numpy_random']
+        np.random.set_state((numpy_random[0], np.asarray(numpy_random[1], dtype=np.uint32), *numpy_random[2:]))
+        return True
+
+    def on_train_begin(self, logs: Optional[dict] = None) -> None:
+        """
+        Restore the state of the other callbacks, which reset themselves when the training begins,
+        and keep the number of batches the sequence skips before the enqueuer thread starts
+        :param logs: The Keras logs
+        """
+        self.start = self.sequence.start
+        if not self.state:
+            return
+        for callback, attributes in zip(self.callbacks, self.state['callbacks']):
+            for name, value in attributes.items():
+                setattr(callback, name, value)
+
+    def on_epoch_begin(self, epoch: int, logs: Optional[dict] = None) -> None:
+        """
+        Keep track of the current epoch
+        :param epoch: The index of the epoch
+        :param logs: The Keras logs
+        """
+        self.epoch = epoch
+
+    def on_batch_end(self, batch: int, logs: Optional[dict] = None) -> None:
+        """
+        Write a checkpoint every `every_batches` batches, the last batch of an epoch is left to `on_epoch_end`
+        :param batch: The index of the batch in this call of the training, skipped batches excluded
+        :param logs: The Keras logs
+        """
+        position = self.start + batch + 1
+        if self.every_batches and position % self.every_batches == 0 and position < len(self.sequence.batches):
+            self.save(self.epoch, position)
+
+    def on_epoch_end(self, epoch: int, logs: Optional[dict] = None) -> None:
+        """
+        Write a checkpoint at the beginning of the next epoch, which skips no batch
+        :param epoch: The index of the epoch
+        :param logs: The Keras logs
+        """
+        self.start = 0
+        self.save(epoch + 1, 0)
+
+    def save(self, epoch: int, batch: int) -> None:
+        """
+        Write a checkpoint: the model file first, then the state file is replaced atomically,
+        so that an interruption leaves the previous checkpoint usable
+        :param epoch: The epoch to resume at
+        :param batch: The number of batches of this epoch already trained on
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        model_filename = f'model_{epoch:04d}_{batch:06d}.h5'
+        # Keras saves the optimizer state along with the weights
+        self.model.save(os.path.join(self.directory, model_filename))
+        numpy_random = np.random.get_state()
+        state = {
+            'model': model_filename,
+            'epoch': epoch,
+            'batch': batch,
+            'stopped': bool(getattr(self.model, 'stop_training', False)),
+            'seed': self.sequence.seed,
+            'callbacks': [{name: float(getattr(callback, name)) if name == 'best' else getattr(callback, name)
+                           for name in self.CALLBACK_ATTRIBUTES if hasattr(callback, name)}
+                          for callback in self.callbacks],
+            'python_random': random.getstate(),
+            'numpy_random': [numpy_random[0], numpy_random[1].tolist(), *numpy_random[2:]]
+        }
+        temporary_path = self.state_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as fp:
+            json.dump(state, fp)
+        os.replace(temporary_path, self.state_path)
+        self.state = state
+        self._remove_models(keep=model_filename)
+
+    def clear(self) -> None:
+        """
+        Remove the checkpoint of a previous run, e.g. when a run is started instead of resumed,
+        so that it cannot be resumed by mistake later on
+        """
+        if os.path.isfile(self.state_path):
+            os.remove(self.state_path)
+        self.state = None
+        self._remove_models()
+
+    def _remove_models(self, keep: Optional[str] = None) -> None:
+        """
+        Remove the model files of the directory which the state file does not point to
+        :param keep: The model file of the state file, None to remove all of them
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.startswith('model_') and filename.endswith('.h5') and filename != keep:
+                os.remove(os.path.join(self.directory, filename))
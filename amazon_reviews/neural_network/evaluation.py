@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which evaluate the predictions of a model incrementally, chunk by chunk,
+so that test sets of any size are evaluated in bounded memory
+"""
+
+
+from typing import List, Optional
+
+import numpy as np
+
+
+def is_rating_concordant_comment(comments: 'np.ndarray', ratings: 'np.ndarray') -> 'np.ndarray':
+    """
+    Check if ratings and comments are concordant
+    :param comments: The status of each comment (negative: 0, positive: 1)
+    :param ratings: The rating of each document (1 to 5)
+    :return: If each rating and comment are concordant
+    """
+    comments = np.asarray(comments)
+    ratings = np.asarray(ratings)
+    return ((ratings <= 3) & (comments == 0)) | ((ratings >= 4) & (comments == 1))
+
+
+class StreamingEvaluation:
+    """
+    Accumulate the confusion matrix of predicted classes and the agreement rate between predicted comments
+    and ratings, one chunk of predictions at a time
+    """
+
+    def __init__(self, nb_classes: int = 2) -> None:
+        """
+        Constructor of the StreamingEvaluation class
+        :param nb_classes: The number of classes
+        """
+        self.nb_classes = nb_classes
+        self.confusion_matrix = np.zeros((nb_classes, nb_classes), dtype=np.int64)
+        self.nb_concordant = 0
+        self.nb_rated = 0
+
+    def __len__(self) -> int:
+        """
+        Compute the number of evaluated predictions
+        :return: The number of evaluated predictions
+        """
+        return int(self.confusion_matrix.sum())
+
+    def update(self, labels: 'np.ndarray', predicted: 'np.ndarray', ratings: Optional['np.ndarray'] = None) -> None:
+        """
+        Add a chunk of predictions
+        :param labels: The true class of each document
+        :param predicted: The predicted class of each document
+        :param ratings: The rating of each document, to compute the agreement rate, None if unknown
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        predicted = np.asarray(predicted, dtype=np.int64)
+        self.confusion_matrix += np.bincount(labels * self.nb_classes + predicted,
+                                             minlength=self.nb_classes ** 2).reshape(self.confusion_matrix.shape)
+        if ratings is not None:
+            self.nb_concordant += int(is_rating_concordant_comment(predicted, ratings).sum())
+            self.nb_rated += len(predicted)
+
+    @property
+    def accuracy(self) -> float:
+        """
+        Share of correctly predicted documents
+        :return: The accuracy
+        """
+        return float(np.trace(self.confusion_matrix) / max(1, len(self)))
+
+    @property
+    def agreement_rate(self) -> Optional[float]:
+        """
+        Share of predicted comments concordant with the rating of their document
+        :return: The agreement rate, None if no ratings were given
+        """
+        return self.nb_concordant / self.nb_rated if self.nb_rated else None
+
+    def report(self, target_names: List[str]) -> str:
+        """
+        Build a text report with the precision, recall, F1-score and support of each class
+        :param target_names: The name of each class
+        :return: The text report
+        """
+        true_positives = np.diag(self.confusion_matrix).astype(np.float64)
+        support = self.confusion_matrix.sum(axis=1)
+        predicted = self.confusion_matrix.sum(axis=0)
+        precision = np.divide(true_positives, predicted, out=np.zeros_like(true_positives), where=predicted > 0)
+        recall = np.divide(true_positives, support, out=np.zeros_like(true_positives), where=support > 0)
+        total = precision + recall
+        f1 = np.divide(2 * precision * recall, total, out=np.zeros_like(total), where=total > 0)
+        width = max(len(name) for name in target_names + ['weighted avg'])
+        lines = [f"{'':>{width}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", '']
+        for name, p, r, f, s in zip(target_names, precision, recall, f1, support):
+            lines.append(f'{name:>{width}} {p:>9.2f} {r:>9.2f} {f:>9.2f} {s:>9}')
+        lines.append('')
+        lines.append(f"{'accuracy':>{width}} {'':>9} {'':>9} {self.accuracy:>9.2f} {len(self):>9}")
+        weights = support / max(1, support.sum())
+        for name, average in (('macro avg', np.mean), ('weighted avg', lambda x: np.sum(x * weights))):
+            lines.append(f'{name:>{width}} {average(precision):>9.2f} {average(recall):>9.2f} '
+                         f'{average(f1):>9.2f} {len(self):>9}')
+        if self.agreement_rate is not None:
+            lines.append('')
+            lines.append(f'rating / comment agreement rate: {self.agreement_rate:.4f} ({self.nb_rated} rated)')
+        return '\n'.join(lines)
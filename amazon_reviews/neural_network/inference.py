@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which run the models of `RecurrentNeuralNetwork.build_classification` with NumPy only.
+The weights are exported once from Keras into an inference bundle (a .npz file without optimizer state),
+which loads in milliseconds and predicts without importing Keras or TensorFlow.
+Bundles can be stored in reduced precision, embeddings being converted back to float32 on lookup
+"""
+
+
+import json
+from typing import List, Optional
+
+import numpy as np
+
+from amazon_reviews.document.embeddings import dequantize_rows, PRECISIONS, quantize_rows
+from .recurrent import RecurrentNeuralNetwork
+
+
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1. / (1. + np.exp(-x)),
+    'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0., 1.),
+    'relu': lambda x: np.maximum(x, 0.),
+    'linear': lambda x: x
+}
+
+
+class NumpyRecurrentNetwork:
+    """
+    Forward pass of the word / pos / shape embeddings -> BiLSTM -> LSTM -> Dense classifier, with the masking
+    of Keras: a timestep is skipped when any of its word, pos or shape index is 0
+    """
+
+    LSTM_LAYERS = ('bilstm_forward', 'bilstm_backward', 'lstm')
+    EMBEDDINGS = ('word_embeddings', 'pos_embeddings', 'shape_embeddings')
+
+    def __init__(self, weights: dict, config: dict) -> None:
+        """
+        Constructor of the NumpyRecurrentNetwork class
+        :param weights: The arrays of the bundle by name
+        :param config: The activations of each layer by name
+        """
+        self.weights = weights
+        self.config = config
+
+    @classmethod
+    def from_keras(cls, model: 'keras.models.Model') -> 'NumpyRecurrentNetwork':
+        """
+        Extract the inference weights of a Keras model built by `RecurrentNeuralNetwork.build_classification`
+        :param model: The Keras model
+        :return: An initialized `NumpyRecurrentNetwork` object
+        """
+        weights = {}
+        for name in ('word', 'pos', 'shape'):
+            weights[f'{name}_embeddings'] = model.get_layer(f'{name}_embeddings_layer').get_weights()[0]
+        bilstm = model.get_layer('bi-lstm')
+        lstm_layers = {'bilstm_forward': bilstm.forward_layer, 'bilstm_backward': bilstm.backward_layer,
+                       'lstm': model.get_layer('lstm')}
+        config = {}
+        for name, layer in lstm_layers.items():
+            weights[f'{name}_kernel'], weights[f'{name}_recurrent_kernel'], weights[f'{name}_bias'] = \
+                layer.get_weights()
+            layer_config = layer.get_config()
+            config[name] = {'activation': layer_config['activation'],
+                            'recurrent_activation': layer_config['recurrent_activation']}
+        output = model.get_layer('output')
+        weights['output_kernel'], weights['output_bias'] = output.get_weights()
+        config['output'] = {'activation': output.get_config()['activation']}
+        return cls({name: np.asarray(array, dtype=np.float32) for name, array in weights.items()}, config)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'NumpyRecurrentNetwork':
+        """
+        Load an inference bundle
+        :param filepath: The path of the .npz bundle
+        :return: An initialized `NumpyRecurrentNetwork` object
+        """
+        with np.load(filepath) as bundle:
+            weights = {name: bundle[name] for name in bundle.files if name != 'config'}
+            config = json.loads(str(bundle['config']))
+        # Only the embeddings are looked up in their storage precision, the other weights are small
+        for name, array in weights.items():
+            if not name.startswith(cls.EMBEDDINGS):
+                weights[name] = array.astype(np.float32)
+        return cls(weights, config)
+
+    @property
+    def precision(self) -> str:
+        """
+        Storage precision of the embeddings
+        :return: 'float32', 'float16' or 'int8'
+        """
+        return self.weights['word_embeddings'].dtype.name
+
+    @property
+    def vocabulary_size(self) -> int:
+        """
+        Number of words of the word embeddings
+        :return: The number of rows of the word embeddings
+        """
+        return self.weights['word_embeddings'].shape[0]
+
+    def to_precision(self, precision: str) -> 'NumpyRecurrentNetwork':
+        """
+        Convert the network to another storage precision: the embeddings are stored as float16, or as int8
+        with one scale per row, and the other weights as float16 for both reduced precisions
+        :param precision: 'float32', 'float16' or 'int8'
+        :return: A new `NumpyRecurrentNetwork` object
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Precision '{precision}' must be one of {PRECISIONS}")
+        weights = {}
+        for name in self.EMBEDDINGS:
+            weights[name], scales = quantize_rows(self.embeddings(name), precision)
+            if scales is not None:
+                weights[f'{name}_scales'] = scales
+        dtype = np.float32 if precision == 'float32' else np.float16
+        for name, array in self.weights.items():
+            if not name.startswith(self.EMBEDDINGS):
+                weights[name] = array.astype(dtype).astype(np.float32)
+        return NumpyRecurrentNetwork(weights, self.config)
+
+    def embeddings(self, name: str, rows: object = slice(None)) -> 'np.ndarray':
+        """
+        Look embeddings up as float32, whatever their storage precision
+        :param name: The name of the embeddings in the bundle
+        :param rows: The indices to look up, all of them by default
+        :return: The float32 embeddings
+        """
+        return dequantize_rows(self.weights[name], self.weights.get(f'{name}_scales'), rows)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the weights
+        :return: The number of bytes of all the arrays
+        """
+        return sum(array.nbytes for array in self.weights.values())
+
+    def save(self, filepath: str) -> None:
+        """
+        Write the inference bundle, the weights other than the embeddings are stored as float16
+        when the embeddings are in reduced precision
+        :param filepath: The path of the .npz bundle
+        """
+        dtype = np.float32 if self.precision == 'float32' else np.float16
+        weights = {name: array if name.startswith(self.EMBEDDINGS) else array.astype(dtype)
+                   for name, array in self.weights.items()}
+        np.savez(filepath, config=np.asarray(json.dumps(self.config)), **weights)
+
+    def predict(self, inputs: List['np.ndarray'], batch_size: Optional[int] = None) -> 'np.ndarray':
+        """
+        Predict the probabilities of padded documents, as `Model.predict` does
+        :param inputs: The word, pos and shape matrices of shape (nb documents, length)
+        :param batch_size: The number of documents computed at once, None to compute them all at once
+        :return: The probabilities of shape (nb documents, nb outputs)
+        """
+        word, pos, shape = (np.asarray(features) for features in inputs)
+        batch_size = batch_size or max(1, len(word))
+        outputs = [self._predict_batch(word[i:i + batch_size], pos[i:i + batch_size], shape[i:i + batch_size])
+                   for i in range(0, len(word), batch_size)]
+        if not outputs:
+            return np.zeros((0, self.weights['output_bias'].shape[0]), dtype=np.float32)
+        return np.concatenate(outputs)
+
+    probas_to_classes = staticmethod(RecurrentNeuralNetwork.probas_to_classes)
+    probas_to_classes_batch = staticmethod(RecurrentNeuralNetwork.probas_to_classes_batch)
+
+    def _predict_batch(self, word: 'np.ndarray', pos: 'np.ndarray', shape: 'np.ndarray') -> 'np.ndarray':
+        """
+        Predict the probabilities of a batch of padded documents
+        :param word: The word matrix of shape (batch, length)
+        :param pos: The pos matrix of shape (batch, length)
+        :param shape: The shape matrix of shape (batch, length)
+        :return: The probabilities of shape (batch, nb outputs)
+        """
+        mask = (word != 0) & (pos != 0) & (shape != 0)
+        # Trailing timesteps masked for the whole batch do not change any state
+        used = np.flatnonzero(mask.any(axis=0))
+        length = used[-1] + 1 if len(used) else 0
+        word, pos, shape, mask = word[:, :length], pos[:, :length], shape[:, :length], mask[:, :length]
+        weights = self.weights
+        inputs = np.concatenate([self.embeddings('word_embeddings', word), self.embeddings('pos_embeddings', pos),
+                                 self.embeddings('shape_embeddings', shape)], axis=-1)
+        forward = self._lstm('bilstm_forward', inputs, mask)
+        backward = self._lstm('bilstm_backward', inputs, mask, backwards=True)
+        sequence = np.concatenate([forward, backward], axis=-1)
+        last = self._lstm('lstm', sequence, mask)[:, -1] if length else \
+            np.zeros((len(word), weights['lstm_recurrent_kernel'].shape[0]), dtype=np.float32)
+        output = last @ weights['output_kernel'] + weights['output_bias']
+        return ACTIVATIONS[self.config['output']['activation']](output)
+
+    def _lstm(self, name: str, inputs: 'np.ndarray', mask: 'np.ndarray', backwards: bool = False) -> 'np.ndarray':
+        """
+        Run a Keras LSTM layer over a batch of sequences, the state and the output are carried over masked timesteps
+        :param name: The name of the layer in the bundle
+        :param inputs: The inputs of shape (batch, length, input dimension)
+        :param mask: The mask of shape (batch, length), False for the skipped timesteps
+        :param backwards: If the sequences are read from the end, the outputs stay aligned with the inputs
+        :return: The output at each timestep, of shape (batch, length, units)
+        """
+        kernel = self.weights[f'{name}_kernel']
+        recurrent_kernel = self.weights[f'{name}_recurrent_kernel']
+        activation = ACTIVATIONS[self.config[name]['activation']]
+        recurrent_activation = ACTIVATIONS[self.config[name]['recurrent_activation']]
+        units = recurrent_kernel.shape[0]
+        batch, length = mask.shape
+        # The input projections of all the timesteps are computed at once, gates are ordered i, f, c, o
+        projections = inputs @ kernel + self.weights[f'{name}_bias']
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.zeros((batch, length, units), dtype=np.float32)
+        for t in (range(length - 1, -1, -1) if backwards else range(length)):
+            z = projections[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            new_c = f * c + i * activation(z[:, 2 * units:3 * units])
+            new_h = o * activation(new_c)
+            keep = mask[:, t, None]
+            c = np.where(keep, new_c, c)
+            h = np.where(keep, new_h, h)
+            outputs[:, t] = h
+        return outputs
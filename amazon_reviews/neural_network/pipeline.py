@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which feed `fit_generator` while the reviews are still being parsed: a producer thread reads
+the documents (tokenized by the worker processes of `Parser.iter_file`), encodes them and puts padded batches
+in a bounded queue, so that the preparation of the next batches overlaps the training of the current one
+"""
+
+
+from collections import deque
+import queue
+import threading
+from typing import Deque, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from amazon_reviews.metrics import METRICS
+from .sequence import BucketedSequence
+
+
+class PrefetchingPipeline:
+    """
+    Producer / consumer pipeline over a stream of documents. The first epoch trains on the batches as they are
+    encoded, each chunk of documents sorted by length before it is split into batches. The encoded documents are
+    kept, the next epochs are drawn from a `BucketedSequence` over them. Every `validation_every`-th document
+    is kept for the validation instead, whose batches are available once the stream is over.
+    The streamed batches have the sizes of the batches of the next epochs, so that each epoch counts
+    `steps_per_epoch` batches and the next ones start on an epoch boundary
+    """
+
+    # Put in the queue by the producer after the last batch
+    _END = object()
+
+    def __init__(self, documents: Iterable['amazon_reviews.document.Document'],
+                 vectorizer: 'amazon_reviews.document.Vectorizer', nb_documents: int, batch_size: int = 64,
+                 nb_buckets: int = 10, validation_every: int = 5, chunk_size: int = 1024, queue_size: int = 16,
+                 seed: Optional[int] = None) -> None:
+        """
+        Constructor of the PrefetchingPipeline class
+        :param documents: The stream of documents, e.g. `AmazonReviewParser.iter_file`
+        :param vectorizer: The vectorizer encoding the documents
+        :param nb_documents: The number of documents of the stream, e.g. `AmazonReviewParser.count_file`
+        :param batch_size: The maximum number of documents in a batch
+        :param nb_buckets: The number of buckets of documents of similar length of the next epochs
+        :param validation_every: One document out of `validation_every` is used for the validation
+        :param chunk_size: The number of documents encoded at once
+        :param queue_size: The maximum number of batches waiting in the queue, the producer blocks when it is full
+        :param seed: The seed of the shuffling, None to draw one
+        """
+        self.documents = documents
+        self.vectorizer = vectorizer
+        self.batch_size = batch_size
+        self.nb_buckets = nb_buckets
+        self.validation_every = validation_every
+        self.chunk_size = chunk_size
+        self.seed = int(np.random.randint(2 ** 31 - 1)) if seed is None else seed
+        self.nb_validation = nb_documents // validation_every
+        self.nb_train = nb_documents - self.nb_validation
+        # Encoded features of the documents read so far: word, pos, shape and labels
+        self.train = ([], [], [], [])
+        self.validation = ([], [], [], [])
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._produce, name='prefetching-pipeline', daemon=True)
+
+    @property
+    def steps_per_epoch(self) -> int:
+        """
+        Compute the number of training batches of an epoch
+        :return: The number of batches
+        """
+        return BucketedSequence.count_batches(self.nb_train, self.batch_size, self.nb_buckets)
+
+    @property
+    def validation_steps(self) -> int:
+        """
+        Compute the number of validation batches
+        :return: The number of batches
+        """
+        return BucketedSequence.count_batches(self.nb_validation, self.batch_size, self.nb_buckets)
+
+    def start(self) -> 'PrefetchingPipeline':
+        """
+        Start the producer thread
+        :return: The pipeline itself
+        """
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """
+        Stop the producer thread, e.g. when the training stopped early
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def __enter__(self) -> 'PrefetchingPipeline':
+        """
+        Start the producer thread
+        :return: The pipeline itself
+        """
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        """
+        Stop the producer thread
+        """
+        self.close()
+
+    def train_batches(self) -> Iterator[tuple]:
+        """
+        Yield the training batches endlessly, as `fit_generator` expects
+        :return: A generator of the word, pos and shape inputs and the labels of each batch
+        """
+        while True:
+            with METRICS.stage('prefetch_wait'):
+                batch = self._queue.get()
+            if batch is self._END:
+                break
+            yield batch
+        self._raise_error()
+        word, pos, shape, labels = self.train
+        sequence = BucketedSequence(word, pos, shape, np.asarray(labels, dtype=np.int8), batch_size=self.batch_size,
+                                    nb_buckets=self.nb_buckets, seed=self.seed)
+        while True:
+            for index in range(len(sequence)):
+                yield sequence[index]
+            sequence.on_epoch_end()
+
+    def validation_batches(self) -> Iterator[tuple]:
+        """
+        Yield the validation batches endlessly, in the same order each time, once the stream is over
+        :return: A generator of the word, pos and shape inputs and the labels of each batch
+        """
+        with METRICS.stage('prefetch_wait'):
+            self._done.wait()
+        self._raise_error()
+        word, pos, shape, labels = self.validation
+        sequence = BucketedSequence(word, pos, shape, np.asarray(labels, dtype=np.int8), batch_size=self.batch_size,
+                                    nb_buckets=self.nb_buckets, shuffle=False)
+        while True:
+            for index in range(len(sequence)):
+                yield sequence[index]
+
+    def _raise_error(self) -> None:
+        """
+        Raise the exception of the producer thread in the consumer one
+        """
+        if self._error is not None:
+            raise RuntimeError('The prefetching pipeline failed') from self._error
+
+    def _put(self, item: object) -> bool:
+        """
+        Put an item in the queue, waiting for a free slot unless the pipeline is closed
+        :param item: The batch to put
+        :return: False if the pipeline was closed
+        """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        """
+        Read, encode and batch the stream of documents, run by the producer thread
+        """
+        rng = np.random.RandomState(self.seed)
+        # The size of each streamed batch, as the ones of the next epochs
+        sizes = deque(BucketedSequence.batch_sizes(self.nb_train, self.batch_size, self.nb_buckets))
+        position = 0
+        # Training documents waiting for a full batch, as indices in `train`
+        pending = []
+        documents = iter(self.documents)
+        try:
+            chunk = self._next_chunk(documents)
+            while chunk and not self._stop.is_set():
+                word, pos, shape = self.vectorizer.encode_features(chunk, ragged=True)
+                labels = self.vectorizer.encode_annotations(chunk)
+                positions = np.arange(position, position + len(chunk))
+                position += len(chunk)
+                is_validation = positions % self.validation_every == self.validation_every - 1
+                pending.extend(range(len(self.train[3]), len(self.train[3]) + int(np.sum(~is_validation))))
+                for rows, features in ((np.flatnonzero(is_validation), self.validation),
+                                       (np.flatnonzero(~is_validation), self.train)):
+                    for cache, values in zip(features, (word, pos, shape)):
+                        cache.extend(values[row] for row in rows.tolist())
+                    features[3].extend(labels[rows].tolist())
+                if not self._put_batches(rng, pending, sizes, flush=False):
+                    break
+                chunk = self._next_chunk(documents)
+            if not chunk:
+                self._put_batches(rng, pending, sizes, flush=True)
+        except Exception as error:  # Raised in the consumer thread
+            self._error = error
+        finally:
+            if hasattr(documents, 'close'):
+                # Stop the parser and its worker processes
+                documents.close()
+            self._done.set()
+            self._put(self._END)
+
+    def _next_chunk(self, documents: Iterator['amazon_reviews.document.Document']) \
+            -> List['amazon_reviews.document.Document']:
+        """
+        Read the next documents of the stream
+        :param documents: The stream of documents
+        :return: Up to `chunk_size` documents, an empty list at the end of the stream
+        """
+        chunk = []
+        for document in documents:
+            chunk.append(document)
+            if len(chunk) == self.chunk_size:
+                break
+        return chunk
+
+    def _put_batches(self, rng: 'np.random.RandomState', pending: List[int], sizes: Deque[int], flush: bool) -> bool:
+        """
+        Split the pending training documents into batches of similar length and put them in the queue,
+        the documents left over are kept for the next chunk until there are enough of them for the next batch size
+        :param rng: The random generator shuffling the batches
+        :param pending: The indices in `train` of the documents waiting for a batch, updated in place
+        :param sizes: The sizes of the batches left to put, updated in place
+        :param flush: If the stream is over and the last documents are put too
+        :return: False if the pipeline was closed
+        """
+        word, pos, shape, labels = self.train
+        pending.sort(key=lambda index: len(word[index]))
+        batches = []
+        while sizes and (len(pending) >= sizes[0] or flush and pending):
+            size = sizes.popleft()
+            batches.append(pending[:size])
+            del pending[:size]
+        if flush:
+            # The stream held more documents than counted
+            batches.extend(pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size))
+            del pending[:]
+        for index in rng.permutation(len(batches)):
+            batch = batches[index]
+            inputs = [BucketedSequence.pad([values[row] for row in batch]) for values in (word, pos, shape)]
+            if not self._put((inputs, np.asarray([labels[row] for row in batch], dtype=np.int8))):
+                return False
+        return True
@@ -3,12 +3,16 @@
 
 
 """
-Package which define recurrent Neural network models
+Package which define recurrent Neural network models,
+Keras is only imported when a model is built or loaded
 """
 
 
-from keras.layers import Bidirectional, concatenate, Dense, Dropout, Embedding, Input, LSTM
-from keras.models import load_model, Model
+from typing import Optional
+
+import numpy as np
+
+from amazon_reviews.metrics import METRICS
 
 
 class RecurrentNeuralNetwork:
@@ -16,13 +20,21 @@ class RecurrentNeuralNetwork:
     Wrapper class for managing Keras recurrent network usage
     """
 
-    def __init__(self, model: Model = None) -> None:
+    def __init__(self, model: 'keras.models.Model' = None) -> None:
         """
         Init the class with a model if provided else None
         :param model: The Keras `Model` to use
         """
         self._model = model
 
+    @property
+    def vocabulary_size(self) -> int:
+        """
+        Number of words of the word embeddings layer
+        :return: The number of rows of the word embeddings
+        """
+        return self._model.get_layer('word_embeddings_layer').input_dim
+
     def load_weights(self, *args, **kwargs) -> None:
         """
         Wrapper around `Model.load_weights`
@@ -37,7 +49,8 @@ class RecurrentNeuralNetwork:
         :param args: The args to pass to the underlying function
         :param kwargs: The kwargs to pass to the underlying function
         """
-        return self._model.fit(*args, **kwargs)
+        with METRICS.stage('keras_fit'):
+            return self._model.fit(*args, **kwargs)
 
     def fit_generator(self, *args, **kwargs) -> 'keras.callbacks.History':
         """
@@ -45,7 +58,37 @@ class RecurrentNeuralNetwork:
         :param args: The args to pass to the underlying function
         :param kwargs: The kwargs to pass to the underlying function
         """
-        return self._model.fit_generator(*args, **kwargs)
+        with METRICS.stage('keras_fit'):
+            return self._model.fit_generator(*args, **kwargs)
+
+    def fit_checkpointed(self, sequence: 'BucketedSequence', checkpoint: 'TrainingCheckpoint', epochs: int,
+                         callbacks: Optional[list] = None, **kwargs) -> Optional['keras.callbacks.History']:
+        """
+        Wrapper around `Model.fit_generator` writing checkpoints, and resuming from the position of the checkpoint
+        if it was restored. An interrupted epoch is finished in its own call, as Keras counts the batches of an epoch
+        once per call. The batches are shuffled by the sequence only, so that their order can be replayed
+        :param sequence: The training sequence
+        :param checkpoint: The checkpoint callback, added after the other callbacks
+        :param epochs: The total number of epochs
+        :param callbacks: The other callbacks
+        :param kwargs: The kwargs to pass to the underlying function, e.g. `validation_data`
+        :return: The history of the last call of the underlying function, None if the training was already over
+        """
+        callbacks = (callbacks or []) + [checkpoint]
+        epoch, batch = checkpoint.position
+        history = None
+        if checkpoint.stopped:
+            return history
+        if batch:
+            sequence.set_position(epoch, batch)
+            history = self.fit_generator(sequence, epochs=epoch + 1, initial_epoch=epoch, callbacks=callbacks,
+                                         shuffle=False, **kwargs)
+            epoch += 1
+        if epoch < epochs and not self._model.stop_training:
+            sequence.set_position(epoch)
+            history = self.fit_generator(sequence, epochs=epochs, initial_epoch=epoch, callbacks=callbacks,
+                                         shuffle=False, **kwargs)
+        return history
 
     def predict_generator(self, *args, **kwargs) -> 'numpy.ndarray':
         """
@@ -53,7 +96,8 @@ class RecurrentNeuralNetwork:
         :param args: The args to pass to the underlying function
         :param kwargs: The kwargs to pass to the underlying function
         """
-        return self._model.predict_generator(*args, **kwargs)
+        with METRICS.stage('keras_predict'):
+            return self._model.predict_generator(*args, **kwargs)
 
     def predict(self, *args, **kwargs) -> 'numpy.ndarray':
         """
@@ -61,7 +105,19 @@ class RecurrentNeuralNetwork:
         :param args: The args to pass to the underlying function
         :param kwargs: The kwargs to pass to the underlying function
         """
-        return self._model.predict(*args, **kwargs)
+        with METRICS.stage('keras_predict'):
+            return self._model.predict(*args, **kwargs)
+
+    def make_predict_function(self) -> None:
+        """
+        Build the predict function of the model on the current thread, so that another thread can then predict
+        with it, e.g. the `MicroBatcher` one: with Keras 2 the graph of a model is the default graph of the thread
+        which loaded it only
+        """
+        make_predict_function = getattr(self._model, '_make_predict_function', None) or \
+            getattr(self._model, 'make_predict_function', None)
+        if make_predict_function is not None:
+            make_predict_function()
 
     @staticmethod
     def probas_to_classes(proba: 'numpy.ndarray') -> int:
@@ -72,6 +128,17 @@ class RecurrentNeuralNetwork:
         """
         return proba.argmax(axis=-1) if proba.shape[-1] > 1 else int(round(proba[0]))
 
+    @staticmethod
+    def probas_to_classes_batch(probas: 'numpy.ndarray') -> 'numpy.ndarray':
+        """
+        Get the class with the highest probability of each row, in one vectorized operation
+        :param probas: The matrix of probability of classes, one row per sample
+        :return: The ID of the class with the highest probability of each sample
+        """
+        if probas.shape[-1] > 1:
+            return probas.argmax(axis=-1).astype(np.int8)
+        return np.rint(probas[:, 0]).astype(np.int8)
+
     @classmethod
     def build_classification(cls, word_embeddings: 'gensim.models.word2vec.Wod2Vec', input_shape: dict, out_shape: int,
                              units: int = 128, dropout_rate: float = 0.4) -> 'RecurrentNeuralNetwork':
@@ -84,6 +151,8 @@ class RecurrentNeuralNetwork:
         :param dropout_rate: The Dropout rate for the model
         :return: An initialized `RecurrentNeuralNetwork` object
         """
+        from keras.layers import Bidirectional, concatenate, Dense, Dropout, Embedding, Input, LSTM
+        from keras.models import Model
         print('Building RNN models')
         word_input = Input(shape=(None,), dtype='int32', name='word_input')
         weights = word_embeddings.syn0
@@ -113,11 +182,32 @@ class RecurrentNeuralNetwork:
         :param filename: The filename to use for loading
         :return: An initialized `RecurrentNeuralNetwork` object
         """
+        from keras.models import load_model
         return RecurrentNeuralNetwork(load_model(filename))
 
+    @classmethod
+    def resume(cls, checkpoint: 'TrainingCheckpoint') -> Optional['RecurrentNeuralNetwork']:
+        """
+        Load the model and its optimizer state from the last checkpoint of a training run
+        :param checkpoint: The checkpoint callback of the run
+        :return: An initialized `RecurrentNeuralNetwork` object, None if there is no checkpoint
+        """
+        if not checkpoint.restore():
+            return None
+        return cls.load(checkpoint.model_path)
+
     def save(self, filename: str) -> None:
         """
         Wrapper around `Model.save` to save a model
         :param filename: The filename to use for saving
         """
         self._model.save(filename)
+
+    def export_inference(self, filename: str, precision: str = 'float32') -> None:
+        """
+        Write the inference bundle of the model, to predict with `NumpyRecurrentNetwork` without Keras
+        :param filename: The filename of the .npz bundle
+        :param precision: The storage precision of the bundle ('float32', 'float16' or 'int8')
+        """
+        from .inference import NumpyRecurrentNetwork
+        NumpyRecurrentNetwork.from_keras(self._model).to_precision(precision).save(filename)
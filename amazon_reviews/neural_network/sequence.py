@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which define the batch generators feeding the neural network models
+"""
+
+
+from typing import List, Optional, Sequence as SequenceType
+
+from keras.utils import Sequence
+import numpy as np
+
+
+class BucketedSequence(Sequence):
+    """
+    Keras `Sequence` grouping documents of similar length in the same batches.
+    Documents are sorted by length and split into buckets, each batch is drawn from a single bucket
+    and padded only to the length of its longest document. Batches are shuffled across buckets each epoch,
+    the order of an epoch only depends on the seed and the epoch number so that an interrupted run can be resumed
+    """
+
+    def __init__(self, word: SequenceType['np.ndarray'], pos: SequenceType['np.ndarray'],
+                 shape: SequenceType['np.ndarray'], labels: Optional['np.ndarray'] = None, batch_size: int = 64,
+                 nb_buckets: int = 10, shuffle: bool = True, seed: Optional[int] = None,
+                 indices: Optional['np.ndarray'] = None) -> None:
+        """
+        Constructor of the BucketedSequence class
+        :param word: The unpadded word features, one array per document (e.g. a list or a `RaggedArray`)
+        :param pos: The unpadded pos features, one array per document
+        :param shape: The unpadded shape features, one array per document
+        :param labels: The labels of the documents, None to only yield the features (e.g. for prediction)
+        :param batch_size: The maximum number of documents in a batch
+        :param nb_buckets: The number of buckets of documents of similar length
+        :param shuffle: If the documents and the batches are shuffled each epoch
+        :param seed: The seed of the shuffling, None to draw one
+        :param indices: The indices of the documents to use (e.g. a train split), None to use all of them
+        """
+        if not len(word) == len(pos) == len(shape):
+            raise ValueError(f"Features must have the same number of documents, got "
+                             f"'{len(word)}', '{len(pos)}' and '{len(shape)}'")
+        self.word = word
+        self.pos = pos
+        self.shape = shape
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = int(np.random.randint(2 ** 31 - 1)) if seed is None else seed
+        self.epoch = 0
+        # The number of batches of the current epoch already used, skipped when a run is resumed
+        self.start = 0
+        self.indices = np.arange(len(word)) if indices is None else np.asarray(indices, dtype=np.int64)
+        if hasattr(word, 'lengths'):
+            lengths = np.asarray(word.lengths)[self.indices]
+        else:
+            lengths = np.asarray([len(word[i]) for i in self.indices], dtype=np.int64)
+        # Buckets and batches hold positions in `indices`
+        by_length = np.argsort(lengths, kind='stable')
+        self.buckets = [bucket for bucket in np.array_split(by_length, self._nb_buckets(len(by_length), nb_buckets))
+                        if len(bucket)]
+        self.batches = []
+        self._make_batches()
+
+    def __len__(self) -> int:
+        """
+        Compute the number of batches in an epoch, without the skipped ones
+        :return: The number of batches
+        """
+        return len(self.batches) - self.start
+
+    def __getitem__(self, index: int) -> (list, tuple):
+        """
+        Get a batch padded to the length of its longest document
+        :param index: The index of the batch
+        :return: The list of word, pos and shape inputs, along with the labels if provided
+        """
+        indices = self.indices[self.batches[self.start + index]]
+        inputs = [self.pad([features[i] for i in indices]) for features in (self.word, self.pos, self.shape)]
+        if self.labels is None:
+            return inputs
+        return inputs, np.asarray(self.labels)[indices]
+
+    def on_epoch_end(self) -> None:
+        """
+        Reshuffle the batches at the end of each epoch
+        """
+        self.set_position(self.epoch + 1)
+
+    def set_position(self, epoch: int, batch: int = 0) -> None:
+        """
+        Move to a batch of an epoch, e.g. to resume a training run from a checkpoint
+        :param epoch: The epoch, whose batches are shuffled from the seed
+        :param batch: The number of batches of the epoch to skip
+        """
+        if not 0 <= batch <= len(self.batches):
+            raise ValueError(f"Batch '{batch}' must be between 0 and '{len(self.batches)}'")
+        self.epoch = epoch
+        self.start = 0
+        if self.shuffle:
+            self._make_batches()
+        self.start = batch
+
+    def _make_batches(self) -> None:
+        """
+        Split each bucket into batches, shuffling the documents of the buckets and the batches if needed
+        """
+        batches = []
+        rng = np.random.RandomState([self.seed, self.epoch])
+        for bucket in self.buckets:
+            if self.shuffle:
+                bucket = rng.permutation(bucket)
+            batches.extend(bucket[i:i + self.batch_size] for i in range(0, len(bucket), self.batch_size))
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        self.batches = batches
+
+    @staticmethod
+    def _nb_buckets(nb_documents: int, nb_buckets: int) -> int:
+        """
+        Compute the number of buckets actually used
+        :param nb_documents: The number of documents
+        :param nb_buckets: The requested number of buckets
+        :return: The number of buckets, at least 1
+        """
+        return min(nb_buckets, nb_documents) or 1
+
+    @classmethod
+    def count_batches(cls, nb_documents: int, batch_size: int = 64, nb_buckets: int = 10) -> int:
+        """
+        Compute the number of batches of an epoch before the features are known, e.g. for `steps_per_epoch`
+        :param nb_documents: The number of documents
+        :param batch_size: The maximum number of documents in a batch
+        :param nb_buckets: The number of buckets of documents of similar length
+        :return: The number of batches
+        """
+        return len(cls.batch_sizes(nb_documents, batch_size, nb_buckets))
+
+    @classmethod
+    def batch_sizes(cls, nb_documents: int, batch_size: int = 64, nb_buckets: int = 10) -> List[int]:
+        """
+        Compute the number of documents of each batch of an epoch before the features are known, bucket by bucket
+        :param nb_documents: The number of documents
+        :param batch_size: The maximum number of documents in a batch
+        :param nb_buckets: The number of buckets of documents of similar length
+        :return: The size of each batch, the last batch of each bucket may be partial
+        """
+        sizes = []
+        for bucket in np.array_split(np.arange(nb_documents), cls._nb_buckets(nb_documents, nb_buckets)):
+            sizes.extend(min(batch_size, len(bucket) - i) for i in range(0, len(bucket), batch_size))
+        return sizes
+
+    @property
+    def order(self) -> 'np.ndarray':
+        """
+        Positions in `indices` of the documents in the order they are yielded by the batches, the skipped ones excepted
+        :return: The positions of the documents
+        """
+        batches = self.batches[self.start:]
+        return np.concatenate(batches) if batches else np.zeros(0, dtype=np.int64)
+
+    def restore_order(self, predictions: 'np.ndarray') -> 'np.ndarray':
+        """
+        Reorder the output of `predict_generator` on this sequence to the order of the documents
+        :param predictions: The predictions in the order of the batches
+        :return: The predictions in the order of `indices`
+        """
+        restored = np.empty_like(predictions)
+        restored[self.order] = predictions
+        return restored
+
+    @staticmethod
+    def pad(sequences: List['np.ndarray']) -> 'np.ndarray':
+        """
+        Pad sequences with zeros to the length of the longest one
+        :param sequences: The sequences to pad
+        :return: A matrix of shape (len(sequences), max length)
+        """
+        padded = np.zeros((len(sequences), max((len(s) for s in sequences), default=0)), dtype=np.int32)
+        for i, sequence in enumerate(sequences):
+            padded[i, :len(sequence)] = sequence
+        return padded
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which train several configurations of `RecurrentNeuralNetwork.build_classification` concurrently.
+The features are encoded once into a feature store and memory-mapped read-only by every worker process,
+each worker is capped to a number of threads so that the configurations do not compete for the cores
+"""
+
+
+from concurrent.futures import as_completed, ProcessPoolExecutor
+import csv
+from itertools import product
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+# Environment variables capping the threads of the numerical libraries and of the TensorFlow backend
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS')
+
+# Columns of the results table, after the hyperparameters
+RESULT_COLUMNS = ('val_loss', 'val_accuracy', 'best_epoch', 'epochs', 'seconds_per_epoch', 'model', 'error')
+
+
+def expand_grid(grid: Dict[str, Sequence]) -> List[dict]:
+    """
+    List every combination of the values of the hyperparameters
+    :param grid: The values of each hyperparameter, e.g. {'units': [64, 128], 'dropout_rate': [0.2, 0.4]}
+    :return: The configurations, one dict per combination
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def configuration_name(config: dict) -> str:
+    """
+    Name a configuration after its hyperparameters, e.g. for its model file
+    :param config: The hyperparameters
+    :return: The name of the configuration
+    """
+    return '_'.join(f'{name}-{value}' for name, value in config.items())
+
+
+def train_configuration(config: dict, data: dict) -> dict:
+    """
+    Train a configuration in a worker process, on the shared memory-mapped features
+    :param config: The hyperparameters: units, dropout_rate, pos_size and shape_size
+    :param data: The paths of the features, pruned word features, vocabulary and pruned embeddings,
+                 the output directory and the training settings (epochs, patience, batch_size, seed)
+    :return: The hyperparameters and the results of the configuration
+    """
+    from keras.callbacks import EarlyStopping, ModelCheckpoint
+    from amazon_reviews.document import FeatureStore, Vectorizer
+    from amazon_reviews.document.embeddings import WordEmbeddings
+    from amazon_reviews.document.feature_store import RaggedArray
+    from amazon_reviews.document.tagset import POS2INDEX, SHAPE2INDEX
+    from .recurrent import RecurrentNeuralNetwork
+    from .sequence import BucketedSequence
+    store = FeatureStore.open(data['features'])
+    word = RaggedArray(np.load(data['word'], mmap_mode='r'), store.word.offsets)
+    # The pruned embeddings are shared memory-mapped instead of loading the whole embedding file in each worker
+    word_embeddings = WordEmbeddings.load_binary(data['embeddings'])
+    # Same split as `validation_split=0.2` and the same batch order for every configuration
+    split = int(len(store) * 0.8)
+    train_sequence = BucketedSequence(word, store.pos, store.shape, store.labels, batch_size=data['batch_size'],
+                                      seed=data['seed'], indices=np.arange(split))
+    validation_sequence = BucketedSequence(word, store.pos, store.shape, store.labels,
+                                           batch_size=data['batch_size'], shuffle=False,
+                                           indices=np.arange(split, len(store)))
+    input_shape = {'pos': (len(POS2INDEX), config['pos_size']), 'shape': (len(SHAPE2INDEX), config['shape_size'])}
+    model = RecurrentNeuralNetwork.build_classification(word_embeddings, input_shape, 1,
+                                                        units=config['units'], dropout_rate=config['dropout_rate'])
+    model_path = os.path.join(data['output'], configuration_name(config) + '.h5')
+    callbacks = [EarlyStopping(monitor='val_loss', patience=data['patience']),
+                 ModelCheckpoint(model_path, monitor='val_loss', save_best_only=True)]
+    start = time.perf_counter()
+    history = model.fit_generator(train_sequence, validation_data=validation_sequence, epochs=data['epochs'],
+                                  callbacks=callbacks, verbose=0).history
+    elapsed = time.perf_counter() - start
+    shutil.copyfile(data['vocabulary'], Vectorizer.vocabulary_path(model_path))
+    best = int(np.argmin(history['val_loss']))
+    # The accuracy is logged as 'val_acc' by the older Keras versions
+    accuracy = history.get('val_accuracy', history.get('val_acc'))
+    return dict(config, val_loss=float(history['val_loss'][best]),
+                val_accuracy=float(accuracy[best]) if accuracy else None, best_epoch=best + 1,
+                epochs=len(history['val_loss']), seconds_per_epoch=elapsed / len(history['val_loss']),
+                model=model_path, error=None)
+
+
+def run_sweep(configs: List[dict], data: dict, jobs: int, threads: int) -> List[dict]:
+    """
+    Train the configurations in a pool of worker processes, a failed configuration does not stop the others
+    :param configs: The hyperparameters of each configuration
+    :param data: The paths of the features and the training settings, passed to `train_configuration`
+    :param jobs: The number of configurations trained concurrently
+    :param threads: The maximum number of threads of each worker process
+    :return: The results, ranked by `rank_results`
+    """
+    # The workers are spawned, so they read the thread caps before importing the numerical libraries
+    caps = dict.fromkeys(THREAD_VARIABLES, str(threads))
+    caps['TF_NUM_INTEROP_THREADS'] = '1'
+    previous = {name: os.environ.get(name) for name in caps}
+    os.environ.update(caps)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(train_configuration, config, data): config for config in configs}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as error:  # Reported in the results table
+                    result = dict(futures[future], **{column: None for column in RESULT_COLUMNS})
+                    result['error'] = f'{type(error).__name__}: {error}'
+                print(f'Done {len(results) + 1}/{len(configs)}: {configuration_name(futures[future])} '
+                      f'val_loss={result["val_loss"]}')
+                results.append(result)
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return rank_results(results)
+
+
+def rank_results(results: List[dict]) -> List[dict]:
+    """
+    Sort the results by validation loss, the failed configurations last
+    :param results: The results of the configurations
+    :return: The sorted results
+    """
+    return sorted(results, key=lambda result: math.inf if result['val_loss'] is None else result['val_loss'])
+
+
+def format_results(results: List[dict]) -> str:
+    """
+    Format ranked results as an aligned text table
+    :param results: The ranked results
+    :return: The table, one line per configuration
+    """
+    if not results:
+        return ''
+    columns = ['rank'] + [column for column in results[0] if column not in ('model', 'error')] + ['error']
+    rows = [[str(rank)] + [_format_value(result.get(column)) for column in columns[1:]]
+            for rank, result in enumerate(results, start=1)]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    return '\n'.join(' '.join(value.rjust(width) for value, width in zip(row, widths)).rstrip()
+                     for row in [columns] + rows)
+
+
+def write_results(results: List[dict], filepath: str) -> None:
+    """
+    Write ranked results as a CSV file
+    :param results: The ranked results
+    :param filepath: The path of the CSV file
+    """
+    columns = ['rank'] + list(results[0]) if results else ['rank']
+    with open(filepath, 'w', encoding='utf-8', newline='') as fp:
+        writer = csv.DictWriter(fp, fieldnames=columns)
+        writer.writeheader()
+        for rank, result in enumerate(results, start=1):
+            writer.writerow(dict(result, rank=rank))
+
+
+def _format_value(value: object) -> str:
+    """
+    Format a value of the results table
+    :param value: The value
+    :return: The formatted value, floats with 4 significant digits and an empty string for None
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f'{value:.4g}'
+    return str(value)
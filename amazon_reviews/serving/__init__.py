@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+from .batcher import MicroBatcher
+from .scorer import ReviewScorer
+from .server import create_http_server, serve_stdio
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package for grouping concurrent requests into micro-batches
+"""
+
+
+from collections import deque
+from concurrent.futures import Future
+import queue
+import threading
+import time
+from typing import Any, Callable, List
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collect the items submitted by concurrent callers and process them in batches on a background thread.
+    A batch is processed once it holds `max_batch_size` items or `max_wait` seconds after its first item arrived.
+    The processing function may return an exception as the result of an item, which is raised to its caller only
+    """
+
+    def __init__(self, process: Callable[[List[Any]], List[Any]], max_batch_size: int = 64, max_wait: float = 0.01,
+                 latency_window: int = 10000) -> None:
+        """
+        Constructor of the MicroBatcher class, the background thread is started right away
+        :param process: The function processing a batch of items, returning one result (or exception) per item
+        :param max_batch_size: The maximum number of items in a batch
+        :param max_wait: The maximum time in seconds a batch waits for more items
+        :param latency_window: The number of most recent requests the latency percentiles are computed on
+        """
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.nb_requests = 0
+        self.nb_batches = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._queue = queue.Queue()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Submit an item to be processed in the next batch
+        :param item: The item to process
+        :return: The future of the result of the item
+        """
+        future = Future()
+        # Under the lock so that no item is queued after the end of the background thread
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Cannot submit an item to a closed MicroBatcher')
+            self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item: Any, timeout: float = None) -> Any:
+        """
+        Process an item and wait for its result
+        :param item: The item to process
+        :param timeout: The maximum time in seconds to wait for the result, None to wait forever
+        :return: The result of the item
+        """
+        return self.submit(item).result(timeout)
+
+    def close(self) -> None:
+        """
+        Process the pending items and stop the background thread, the items submitted afterwards are rejected
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        """
+        Compute the latency and throughput statistics of the processed requests
+        :return: The number of requests and batches, the mean batch size, the requests per second
+                 since the start and the p50 / p99 latencies in milliseconds
+        """
+        with self._lock:
+            latencies = np.asarray(self._latencies) * 1000
+            nb_requests = self.nb_requests
+            nb_batches = self.nb_batches
+        return {
+            'requests': nb_requests,
+            'batches': nb_batches,
+            'mean_batch_size': nb_requests / nb_batches if nb_batches else 0.,
+            'throughput': nb_requests / (time.perf_counter() - self._started),
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.
+        }
+
+    def _run(self) -> None:
+        """
+        Loop of the background thread: wait for a first item, fill the batch until it is full or too old,
+        then process it
+        """
+        closed = False
+        while not closed:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    pending = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    closed = True
+                    break
+                batch.append(pending)
+            self._process_batch(batch)
+
+    def _process_batch(self, batch: List[tuple]) -> None:
+        """
+        Process a batch and resolve the futures of its items
+        :param batch: The list of (item, future, submission time)
+        """
+        items = [item for item, _, _ in batch]
+        try:
+            results = self.process(items)
+            if len(results) != len(items):
+                raise ValueError(f"Processing '{len(items)}' items returned '{len(results)}' results")
+        except Exception as exception:
+            for _, future, _ in batch:
+                future.set_exception(exception)
+            return
+        done = time.perf_counter()
+        with self._lock:
+            self.nb_batches += 1
+            self.nb_requests += len(batch)
+            self._latencies.extend(done - submitted for _, _, submitted in batch)
+        for (_, future, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package for scoring review texts with a trained model
+"""
+
+
+from typing import List, Optional, Union
+
+from amazon_reviews.document import Document
+
+
+class ReviewScorer:
+    """
+    Tokenize, encode and predict batches of review texts with a resident vectorizer and model
+    """
+
+    LABELS = ['negative', 'positive']
+
+    def __init__(self, vectorizer: 'amazon_reviews.document.Vectorizer',
+                 model: 'amazon_reviews.neural_network.recurrent.RecurrentNeuralNetwork',
+                 max_len: Optional[int] = None) -> None:
+        """
+        Constructor of the ReviewScorer class
+        :param vectorizer: The vectorizer encoding the reviews
+        :param model: The model predicting the probability of a review to be positive
+        :param max_len: The maximum number of tokens kept per review, None to keep all of them
+        """
+        self.vectorizer = vectorizer
+        self.model = model
+        self.max_len = max_len
+        # A Keras model predicts from the `MicroBatcher` thread, the NumPy one has no predict function to build
+        if hasattr(model, 'make_predict_function'):
+            model.make_predict_function()
+
+    def __call__(self, texts: List[str]) -> List[Union[dict, Exception]]:
+        """
+        Score a batch of review texts, tokenized and tagged at once, a review failing to be encoded
+        does not fail the others
+        :param texts: The review texts, they must not be empty
+        :return: The probability of each review to be positive and its label,
+                 or the exception raised while encoding it, which `MicroBatcher` raises to its caller only
+        """
+        results = [None] * len(texts)
+        features = []
+        try:
+            documents = Document.create_many(texts)
+        except Exception:
+            # The texts are tokenized one at a time, so that only the failing one is answered with an error
+            documents = None
+        for index, text in enumerate(texts):
+            try:
+                document = Document.create_from_text(text) if documents is None else documents[index]
+                features.append(self.vectorizer.encode_document(document))
+            except Exception as error:  # e.g. a KeyError on a tag unknown to the vectorizer
+                results[index] = ValueError(f'Review cannot be encoded: {type(error).__name__}: {error}')
+        if features:
+            word, pos, shape = self.vectorizer.stack_features(features, max_len=self.max_len)
+            probabilities = self.model.predict([word, pos, shape], batch_size=len(features))
+            scores = iter({'probability': float(proba[0]), 'label': self.LABELS[self.model.probas_to_classes(proba)]}
+                          for proba in probabilities)
+            results = [next(scores) if result is None else result for result in results]
+        return results
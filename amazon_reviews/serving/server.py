@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which expose a `MicroBatcher` over a local HTTP endpoint or a stdin / stdout JSONL protocol.
+A request is a JSON object with a non empty `reviewText` (e.g. a line of an Amazon review file),
+the response is the result of the batcher as a JSON object, or `{"error": message}`
+"""
+
+
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+from typing import IO, Tuple
+
+from .batcher import MicroBatcher
+
+
+def _parse_request(content: (str, bytes)) -> str:
+    """
+    Extract the review text of a request
+    :param content: The JSON content of the request
+    :return: The review text
+    """
+    request = json.loads(content)
+    text = request.get('reviewText') if isinstance(request, dict) else None
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("Request must be a JSON object with a non empty 'reviewText'")
+    return text
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    HTTP handler: POST /score scores a review, GET /stats returns the batcher statistics
+    """
+
+    batcher = None
+
+    def do_POST(self) -> None:
+        """
+        Score the review of the request body
+        """
+        if self.path != '/score':
+            self._reply(404, {'error': f"Unknown path '{self.path}'"})
+            return
+        try:
+            text = _parse_request(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError as error:
+            self._reply(400, {'error': str(error)})
+            return
+        try:
+            self._reply(200, self.batcher(text))
+        except Exception as error:
+            self._reply(500, {'error': str(error)})
+
+    def do_GET(self) -> None:
+        """
+        Return the statistics of the batcher
+        """
+        if self.path != '/stats':
+            self._reply(404, {'error': f"Unknown path '{self.path}'"})
+            return
+        self._reply(200, self.batcher.stats())
+
+    def _reply(self, status: int, body: dict) -> None:
+        """
+        Send a JSON response
+        :param status: The HTTP status code
+        :param body: The object to send as JSON
+        """
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args) -> None:
+        """
+        Do not log each request, the batcher statistics summarize them
+        """
+
+
+def create_http_server(batcher: MicroBatcher, address: Tuple[str, int] = ('127.0.0.1', 8000)) -> ThreadingHTTPServer:
+    """
+    Create the HTTP server, each connection is handled by its own thread so that requests are batched together.
+    Call `serve_forever` on the result to start serving
+    :param batcher: The batcher scoring the reviews
+    :param address: The host and port to listen on, port 0 picks a free port
+    :return: The HTTP server
+    """
+    handler = type('Handler', (_Handler,), {'batcher': batcher})
+    return ThreadingHTTPServer(address, handler)
+
+
+def serve_stdio(batcher: MicroBatcher, input_stream: IO[str], output_stream: IO[str], window: int = 256) -> None:
+    """
+    Score the JSONL requests of a stream and write one JSON response per line in the same order.
+    Responses are written by a separate thread as soon as they are ready, while up to `window` requests
+    are in flight so that they are batched together
+    :param batcher: The batcher scoring the reviews
+    :param input_stream: The stream of requests, one per line
+    :param output_stream: The stream of responses
+    :param window: The maximum number of requests waiting for their response
+    """
+    pending = queue.Queue(maxsize=window)
+    writer = threading.Thread(target=_write_responses, args=(pending, output_stream), name='stdio-writer')
+    writer.start()
+    try:
+        for line in input_stream:
+            if not line.strip():
+                continue
+            try:
+                future = batcher.submit(_parse_request(line))
+            except ValueError as error:
+                future = Future()
+                future.set_exception(error)
+            pending.put(future)
+    finally:
+        pending.put(None)
+        writer.join()
+
+
+def _write_responses(pending: 'queue.Queue', output_stream: IO[str]) -> None:
+    """
+    Write the response of each request in the order of the requests, until None is received
+    :param pending: The queue of the futures of the requests
+    :param output_stream: The stream of responses
+    """
+    for future in iter(pending.get, None):
+        try:
+            response = future.result()
+        except Exception as error:
+            response = {'error': str(error)}
+        output_stream.write(json.dumps(response) + '\n')
+        output_stream.flush()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the benchmarks/suite.py file
+"""
+
+
+from benchmarks.suite import compare
+
+
+def test_compare() -> None:
+    """
+    Test the regressions are found on the throughput, whatever the number of items of the baseline
+    """
+    baseline = {'parse': {'seconds': 1., 'items': 1000}, 'encode': {'seconds': 2., 'items': 1000},
+                'predict': {'seconds': 0., 'items': 1000}}
+    results = {'parse': {'seconds': 1.1, 'items': 1000}, 'encode': {'seconds': 2., 'items': 500},
+               'predict': {'seconds': 5., 'items': 1000}, 'new': {'seconds': 1., 'items': 10}}
+    assert compare(results, baseline, 0.2) == ['encode: 250 items/s vs baseline 500 items/s '
+                                               '(500 vs 1000 items, +100% slower)']
+    results['encode']['seconds'] = 1.
+    assert compare(results, baseline, 0.2) == []
+    assert [regression.split(':')[0] for regression in compare(results, baseline, 0.05)] == ['parse']
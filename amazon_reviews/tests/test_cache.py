@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the document/cache.py file
+"""
+
+
+import pickle
+
+import pytest
+
+from amazon_reviews.document import Document, Sentence, Token, TokenizationCache
+
+
+def _document(text: str) -> Document:
+    """
+    Build a tokenized document without running nltk
+    :param text: The text of the document, tokens are separated by a space
+    :return: A Document object
+    """
+    doc = Document()
+    doc.text = text
+    tokens = []
+    start = 0
+    for word in text.split(' '):
+        tokens.append(Token(doc, start, start + len(word), 'NN', 'LOWER', word))
+        start += len(word) + 1
+    doc.tokens = tokens
+    doc.sentences = [Sentence(doc, 0, len(text))]
+    return doc
+
+
+@pytest.fixture
+def cache(tmp_path: 'pathlib.Path') -> TokenizationCache:
+    """
+    An empty cache stored in a temporary directory
+    :param tmp_path: The pytest temporary directory
+    :return: A TokenizationCache object
+    """
+    cache = TokenizationCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_TokenizationCache(cache: TokenizationCache) -> None:
+    """
+    Test everything about the TokenizationCache class
+    :param cache: The fixture cache to test on
+    """
+    assert cache.get('hello world') is None
+    cache.put(_document('hello world'))
+    doc = cache.get('hello world')
+    assert doc.text == 'hello world'
+    assert [(t.start, t.end, t.pos, t.shape, t.text) for t in doc.tokens] == [(0, 5, 'NN', 'LOWER', 'hello'),
+                                                                              (6, 11, 'NN', 'LOWER', 'world')]
+    assert all(token.document is doc for token in doc.tokens)
+    assert [(s.start, s.end) for s in doc.sentences] == [(0, 11)]
+    assert (cache.hits, cache.misses) == (1, 1)
+    copy = pickle.loads(pickle.dumps(cache))
+    assert (copy.hits, copy.misses) == (0, 0)
+    assert copy.get('hello world').text == 'hello world'
+    copy.close()
+
+
+def test_TokenizationCache_evict(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the least recently used documents are evicted in a batch once the cache is full
+    :param tmp_path: The pytest temporary directory
+    """
+    cache = TokenizationCache(str(tmp_path / 'cache.sqlite'), max_entries=10)
+    for i in range(10):
+        cache.put(_document(f'doc{i}'))
+    assert cache.get('doc0') is not None
+    cache.put(_document('doc10'))
+    # Evicted down to 90% of max_entries, the access of doc0 is written before
+    assert len(cache) == 9
+    assert cache.get('doc1') is None and cache.get('doc2') is None
+    assert cache.get('doc0') is not None
+    assert cache.get('doc10') is not None
+    cache.put(_document('doc11'))
+    assert len(cache) == 10
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0
+    cache.close()
+
+
+def test_TokenizationCache_size(cache: TokenizationCache) -> None:
+    """
+    Test the number of documents is shared by the copies of the cache and only counts new documents
+    :param cache: The fixture cache to test on
+    """
+    cache.put(_document('first'))
+    cache.put(_document('first'))
+    assert len(cache) == 1
+    copy = pickle.loads(pickle.dumps(cache))
+    copy.put(_document('second'))
+    assert len(cache) == len(copy) == 2
+    # The copy evicts the documents stored by the original one too
+    copy.put(_document('third'))
+    assert len(cache) == 1 and copy.get('third') is not None
+    copy.close()
+
+
+def test_TokenizationCache_flush(cache: TokenizationCache) -> None:
+    """
+    Test the accesses of the hits are only written on flush or close
+    :param cache: The fixture cache to test on
+    """
+    cache.put(_document('hello world'))
+    last_access = 'SELECT last_access FROM documents'
+    written = cache.connection.execute(last_access).fetchone()[0]
+    cache.get('hello world')
+    assert cache.connection.execute(last_access).fetchone()[0] == written
+    cache.flush()
+    assert cache.connection.execute(last_access).fetchone()[0] > written
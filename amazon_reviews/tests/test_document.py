@@ -7,9 +7,13 @@ Pytest file for the document/document.py file
 """
 
 
+import nltk
+import numpy as np
 import pytest
 
-from amazon_reviews.document import Document
+from amazon_reviews.document import Document, Sentence, Token, TokenizationCache
+from amazon_reviews.metrics import METRICS
+from amazon_reviews.document.tagset import UNKNOWN
 
 
 @pytest.fixture
@@ -34,3 +38,118 @@ def test_Document(document: Document) -> None:
     assert tokens == ['Hello', 'world', '!']
     assert sentences == [(0, 13)]
     assert document.rating == 5.0
+
+
+def test_Document_create_from_text_cache(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the tokenization of a document is read back from the cache
+    :param tmp_path: The pytest temporary directory
+    """
+    cache = TokenizationCache(str(tmp_path / 'cache.sqlite'))
+    first = Document.create_from_text('Hello world !', cache=cache)
+    second = Document.create_from_text('Hello world !', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [(t.start, t.end, t.pos, t.shape, t.text) for t in second.tokens] == \
+        [(t.start, t.end, t.pos, t.shape, t.text) for t in first.tokens]
+    assert [(s.start, s.end) for s in second.sentences] == [(0, 13)]
+    cache.close()
+
+
+def test_Document_columns(document: Document) -> None:
+    """
+    Test the tokens of a document are stored in columns and read back as Token objects
+    :param document: The fixture document to run test on
+    """
+    assert document.token_starts.dtype == np.int32 and document.token_ends.dtype == np.int32
+    assert document.pos_codes.dtype == np.uint8 and document.shape_codes.dtype == np.uint8
+    assert document.token_starts.tolist() == [0, 6, 12]
+    assert document.token_ends.tolist() == [5, 11, 13]
+    assert document.token_texts() == ['Hello', 'world', '!']
+    assert document.shape_tags() == ['1ST-CAP', 'LOWER', 'SPECIAL']
+    assert len(document.tokens) == 3
+    assert [token.text for token in document.tokens[1:]] == ['world', '!']
+    assert document.tokens[-1].document is document
+    assert (document.tokens[0].start, document.tokens[0].end, document.tokens[0].pos) == (0, 5, 'NNP')
+    doc = Document()
+    doc.tokens = [Token(doc, 0, 4, 'NOT-A-TAG', 'LOWER', 'toto')]
+    assert doc.pos_codes.tolist() == [UNKNOWN]
+    assert doc.tokens[0].pos == 'NOT-A-TAG'
+
+
+def test_Document_sentence_tokens() -> None:
+    """
+    Test the mapping between sentences and tokens computed at construction time
+    """
+    doc = Document.create_from_text('Hello world ! Nice day .')
+    assert [(s.start, s.end) for s in doc.sentences] == [(0, 13), (14, 24)]
+    assert doc.token_sentence_ids.tolist() == [0, 0, 0, 1, 1, 1]
+    assert [[token.text for token in s.tokens] for s in doc.sentences] == [['Hello', 'world', '!'],
+                                                                          ['Nice', 'day', '.']]
+    assert doc.token_range(3, 16) == (0, 4)
+    assert doc.token_range(13, 14) == (3, 3)
+
+
+def test_Document_sentence_tokens_unsorted() -> None:
+    """
+    Test the sentences scan the tokens once they are replaced by tokens out of the text order
+    """
+    doc = Document()
+    doc.text = 'ab cd. ef'
+    doc.set_tokens([0, 3, 7], [2, 5, 9], ['NN'] * 3, ['LOWER'] * 3, ['ab', 'cd', 'ef'])
+    doc.sentences = [Sentence(doc, 0, 6), Sentence(doc, 7, 9)]
+    assert [[token.text for token in s.tokens] for s in doc.sentences] == [['ab', 'cd'], ['ef']]
+    doc.set_tokens([7, 0, 3], [9, 2, 5], ['NN'] * 3, ['LOWER'] * 3, ['ef', 'ab', 'cd'])
+    assert doc.token_sentence_ids is None
+    assert [[token.text for token in s.tokens] for s in doc.sentences] == [['ab', 'cd'], ['ef']]
+
+
+def test_Document_create_from_text_alignment() -> None:
+    """
+    Test the spans of quotes, line breaks and sentences found by the single pass alignment
+    """
+    text = 'I said "great".\n\nNice day.\n'
+    doc = Document.create_from_text(text)
+    spans = list(zip(doc.token_starts.tolist(), doc.token_ends.tolist()))
+    assert spans == [(0, 1), (2, 6), (7, 8), (8, 13), (13, 14), (14, 15), (15, 17), (17, 21), (22, 25), (25, 26),
+                     (26, 27)]
+    assert doc.token_texts()[6] == '\n\n' and doc.token_texts()[-1] == '\n'
+    assert doc.pos_tags()[6] == 'NL' and doc.shape_tags()[6] == 'NL'
+    # Line breaks are fed to the models, code 0 being the masked padding
+    assert doc.shape_codes[6] != 0 and doc.pos_codes[6] != 0
+    assert [(s.start, s.end) for s in doc.sentences] == [(0, 15), (17, 26)]
+    assert doc.token_sentence_ids.tolist() == [0, 0, 0, 0, 0, 0, -1, 1, 1, 1, -1]
+
+
+def test_Document_create_from_text_alignment_failures(monkeypatch: 'pytest.MonkeyPatch') -> None:
+    """
+    Test the tokens not found in the text are dropped and counted
+    :param monkeypatch: The pytest monkeypatch fixture
+    """
+    word_tokenize = nltk.word_tokenize
+    monkeypatch.setattr(nltk, 'word_tokenize', lambda *args, **kwargs: word_tokenize(*args, **kwargs) + ['missing'])
+    METRICS.enable()
+    try:
+        doc = Document.create_from_text('Hello world !')
+        assert METRICS.counters['dropped_tokens'] == 1
+    finally:
+        METRICS.disable()
+        METRICS.reset()
+    assert doc.token_texts() == ['Hello', 'world', '!']
+
+
+def test_Document_create_many(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the batch creation of documents, in order and through the cache
+    :param tmp_path: The pytest temporary directory
+    """
+    texts = ['Hello world !', 'Nice day .\nHello', '']
+    docs = Document.create_many(texts)
+    assert [doc.text for doc in docs] == texts
+    assert [doc.token_texts() for doc in docs] == [['Hello', 'world', '!'], ['Nice', 'day', '.', '\n', 'Hello'], []]
+    assert docs[0].pos_tags() == Document.create_from_text('Hello world !').pos_tags()
+    cache = TokenizationCache(str(tmp_path / 'cache.sqlite'))
+    Document.create_from_text(texts[1], cache=cache)
+    cached = Document.create_many(texts, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert [doc.token_texts() for doc in cached] == [doc.token_texts() for doc in docs]
+    cache.close()
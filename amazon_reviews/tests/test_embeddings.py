@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the document/embeddings.py file
+"""
+
+
+import numpy as np
+import pytest
+
+from amazon_reviews.document.embeddings import WordEmbeddings
+
+
+@pytest.fixture
+def embeddings() -> WordEmbeddings:
+    """
+    A small vocabulary with its word vectors
+    :return: A WordEmbeddings object
+    """
+    vectors = np.arange(12, dtype=np.float32).reshape((4, 3))
+    return WordEmbeddings(['the', 'hello', 'world', '!'], vectors)
+
+
+def test_WordEmbeddings(embeddings: WordEmbeddings, tmp_path: 'pathlib.Path') -> None:
+    """
+    Test everything about the WordEmbeddings class
+    :param embeddings: The fixture embeddings to test on
+    :param tmp_path: The pytest temporary directory
+    """
+    filepath = str(tmp_path / 'glove.test.3d.txt')
+    assert len(embeddings) == 4
+    assert embeddings.vector_size == 3
+    assert embeddings.syn0 is embeddings.vectors
+    assert not WordEmbeddings.has_binary(filepath)
+    embeddings.save_binary(filepath)
+    assert WordEmbeddings.has_binary(filepath)
+    loaded = WordEmbeddings.load(filepath)
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.index2word == embeddings.index2word
+    assert loaded.vectors.tolist() == embeddings.vectors.tolist()
+    with pytest.raises(ValueError):
+        WordEmbeddings(['the'], embeddings.vectors)
+
+
+@pytest.mark.parametrize('precision,tolerance', [('float16', 1e-2), ('int8', 11 / 127 / 2)])
+def test_WordEmbeddings_precision(embeddings: WordEmbeddings, tmp_path: 'pathlib.Path', precision: str,
+                                  tolerance: float) -> None:
+    """
+    Test the reduced precision stores and the conversion to float32 on lookup
+    :param embeddings: The fixture embeddings to test on
+    :param tmp_path: The pytest temporary directory
+    :param precision: The storage precision
+    :param tolerance: The maximum rounding error
+    """
+    filepath = str(tmp_path / 'glove.test.3d.txt')
+    embeddings.save_binary(filepath, precision)
+    loaded = WordEmbeddings.load(filepath)
+    assert loaded.precision == precision
+    assert loaded.vectors.nbytes < embeddings.vectors.nbytes
+    assert loaded.syn0.dtype == np.float32
+    assert np.abs(loaded.syn0 - embeddings.vectors).max() <= tolerance
+    assert np.array_equal(loaded.lookup(np.asarray([[2, 1]])), loaded.syn0[[[2, 1]]])
+    subset = loaded.subset(np.asarray([0, 2]))
+    assert subset.index2word == ['the', 'world']
+    assert np.array_equal(subset.syn0, loaded.syn0[[0, 2]])
+    # Saving back in float32 removes the scales of an int8 store
+    loaded.save_binary(filepath, 'float32')
+    assert WordEmbeddings.load(filepath).scales is None
+    with pytest.raises(ValueError):
+        WordEmbeddings(embeddings.index2word, loaded.vectors.astype(np.int8))
+    with pytest.raises(ValueError):
+        embeddings.to_precision('int4')
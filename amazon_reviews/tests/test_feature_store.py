@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the document/feature_store.py file
+"""
+
+
+import numpy as np
+import pytest
+
+from amazon_reviews.document import FeatureStore
+from amazon_reviews.document.feature_store import RaggedArray
+
+
+def test_RaggedArray() -> None:
+    """
+    Test everything about the RaggedArray class
+    """
+    ragged = RaggedArray(np.arange(6), np.asarray([0, 2, 2, 6]))
+    assert len(ragged) == 3
+    assert [array.tolist() for array in ragged] == [[0, 1], [], [2, 3, 4, 5]]
+    assert ragged[-1].tolist() == [2, 3, 4, 5]
+    assert ragged.lengths.tolist() == [2, 0, 4]
+    assert [array.tolist() for array in ragged[1:]] == [[], [2, 3, 4, 5]]
+    assert ragged[1:].to_dense().tolist() == [[0, 0, 0, 0], [2, 3, 4, 5]]
+    assert len(ragged[3:]) == 0
+    with pytest.raises(IndexError):
+        ragged[3]
+
+
+def test_FeatureStore(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test everything about the FeatureStore class
+    :param tmp_path: The pytest temporary directory
+    """
+    directory = str(tmp_path / 'store')
+    features = [([13075, 85, 805], [38, 11, 21], [4, 5, 2], 1, 5.), ([], [], [], 0, 2.), ([7], [11], [5], 0, 3.)]
+    assert not FeatureStore.exists(directory)
+    store = FeatureStore.write(directory, iter(features), {'embedding_file': 'glove.6B.50d.txt'})
+    assert FeatureStore.exists(directory)
+    store = FeatureStore.open(directory)
+    assert len(store) == 3
+    assert store.manifest['embedding_file'] == 'glove.6B.50d.txt'
+    assert (store.manifest['nb_documents'], store.manifest['nb_tokens']) == (3, 4)
+    assert isinstance(store.word.values, np.memmap)
+    assert store.word.values.dtype == np.int32 and store.pos.values.dtype == np.uint8
+    assert [w.tolist() for w in store.word] == [[13075, 85, 805], [], [7]]
+    assert [p.tolist() for p in store.pos] == [[38, 11, 21], [], [11]]
+    assert [s.tolist() for s in store.shape] == [[4, 5, 2], [], [5]]
+    assert store.labels.tolist() == [1, 0, 0]
+    assert store.ratings.tolist() == [5., 2., 3.]
+    empty = FeatureStore.write(str(tmp_path / 'empty'), [], {})
+    assert len(empty) == 0 and len(empty.word) == 0
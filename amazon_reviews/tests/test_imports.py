@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the import time of the packages: the heavy dependencies (nltk, gensim, keras)
+must only be imported on first use
+"""
+
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+# Import time budget in seconds of the lightweight entry points, importing numpy alone takes about 0.1s
+IMPORT_BUDGET = 0.5
+
+HEAVY_MODULES = ('nltk', 'gensim', 'keras', 'tensorflow', 'sklearn')
+
+
+def _import(statement: str) -> dict:
+    """
+    Run an import statement in a fresh interpreter
+    :param statement: The import statement
+    :return: The import time in seconds and the heavy modules it loaded
+    """
+    code = (f'import json, sys, time\n'
+            f'start = time.perf_counter()\n'
+            f'{statement}\n'
+            f'elapsed = time.perf_counter() - start\n'
+            f'print(json.dumps({{"elapsed": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))')
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize('statement', [
+    'import amazon_reviews.document',
+    'from amazon_reviews.document import Interval, Sentence, Token',
+    'from amazon_reviews.document import AmazonReviewParser, Document, TokenizationCache',
+    'from amazon_reviews.document import FeatureStore, Vectorizer',
+    'from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork'
+])
+def test_import_is_lazy(statement: str) -> None:
+    """
+    Test that importing the package does not load the heavy dependencies and fits the budget
+    :param statement: The import statement
+    """
+    result = _import(statement)
+    assert result['heavy'] == []
+    assert result['elapsed'] < IMPORT_BUDGET
+
+
+def test_document_getattr() -> None:
+    """
+    Test the lazy attributes of the document package
+    """
+    import amazon_reviews.document as document
+    assert set(document.__all__) <= set(dir(document))
+    assert document.Interval(0, 1).end == 1
+    with pytest.raises(AttributeError):
+        document.Unknown
@@ -4,13 +4,13 @@
 
 """
 Pytest file for the document/interval.py file
-TODO: Implement all the `pass` function
 """
 
 
 import pytest
 
 from amazon_reviews.document import *
+from amazon_reviews.document.interval import get_shape_categories, get_shape_category
 
 
 @pytest.fixture
@@ -45,6 +45,23 @@ def test_Interval() -> None:
     assert interval.start == 15 and interval.end == 20
 
 
+def test_Interval_hash() -> None:
+    """
+    Test the hashing, ordering and memory layout of the Interval classes
+    """
+    assert hash(Interval(5, 10)) == hash(Interval(5, 10))
+    assert len({Interval(5, 10), Interval(5, 10), Interval(5, 11)}) == 2
+    assert {Interval(0, 5): 'a'}[Interval(0, 5)] == 'a'
+    intervals = [Interval(5, 6), Interval(0, 2), Interval(5, 10)]
+    assert sorted(intervals) == [Interval(0, 2), Interval(5, 10), Interval(5, 6)]
+    assert Interval(5, 5).overlaps(Interval(3, 8))
+    assert Interval(5, 8).overlaps(Interval(5, 5))
+    assert not Interval(5, 8).overlaps(Interval(8, 9))
+    assert Interval(5, 10) != 'Interval[5, 10]'
+    for interval in (Interval(0, 1), Token(None, 0, 1, 'NN', 'LOWER', 'a'), Sentence(None, 0, 1)):
+        assert not hasattr(interval, '__dict__')
+
+
 def test_Token() -> None:
     """
     Test everything about the Token class
@@ -78,4 +95,8 @@ def test_get_shape_category() -> None:
     """
     Test the Document.get_shape_category function
     """
-    pass
+    tokens = ['\n\n', '2', '2.000', '$', '...', 'AGREEMENT', 'INC.', 'This', 'may', 'third-party', '3RD', 'iPhone']
+    shapes = ['NL', 'NUMBER', 'NUMBER', 'SPECIAL', 'SPECIAL', 'ALL-CAPS', 'ALL-CAPS', '1ST-CAP', 'LOWER', 'LOWER',
+              'MISC', 'MISC']
+    assert [get_shape_category(token) for token in tokens] == shapes
+    assert get_shape_categories(tokens + tokens) == shapes + shapes
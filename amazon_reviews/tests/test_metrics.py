@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the metrics.py file
+"""
+
+
+import json
+from typing import Iterator
+
+import pytest
+
+from amazon_reviews.document import AmazonReviewParser
+from amazon_reviews.metrics import Metrics, METRICS
+
+
+@pytest.fixture
+def metrics() -> Iterator[Metrics]:
+    """
+    Enable the shared metrics for a test and disable them afterwards
+    :return: The enabled shared metrics
+    """
+    METRICS.enable()
+    yield METRICS
+    METRICS.disable()
+    METRICS.reset()
+
+
+def test_Metrics_disabled() -> None:
+    """
+    Test that nothing is recorded when the metrics are disabled
+    """
+    metrics = Metrics()
+    with metrics.stage('tokenize'):
+        pass
+    assert metrics.stages == {}
+    assert metrics.report()['oov_rate'] == 0.
+
+
+def test_Metrics(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the stages, counters, merge and exports of the Metrics class
+    :param tmp_path: The pytest temporary directory
+    """
+    metrics = Metrics(enabled=True)
+    with metrics.stage('tokenize'):
+        pass
+    with metrics.stage('tokenize'):
+        pass
+    metrics.add('encoded_words', 8)
+    metrics.add('oov_words', 2)
+    worker = Metrics(enabled=True)
+    worker.add_time('tag', 1.5)
+    worker.add('oov_words')
+    metrics.merge(worker.snapshot())
+    metrics.merge(None)
+    report = metrics.report()
+    assert report['stages']['tokenize']['calls'] == 2
+    assert report['stages']['tag'] == {'calls': 1, 'seconds': 1.5}
+    assert report['oov_rate'] == 3 / 8
+    json_path = str(tmp_path / 'metrics.json')
+    metrics.export(json_path)
+    with open(json_path, 'r', encoding='utf-8') as fp:
+        assert json.load(fp)['counters'] == {'encoded_words': 8, 'oov_words': 3}
+    prometheus_path = str(tmp_path / 'metrics.prom')
+    metrics.export(prometheus_path)
+    with open(prometheus_path, 'r', encoding='utf-8') as fp:
+        lines = fp.read().splitlines()
+    assert 'amazon_reviews_stage_seconds_total{stage="tag"} 1.500000' in lines
+    assert 'amazon_reviews_oov_words_total 3' in lines
+    assert 'amazon_reviews_oov_rate 0.375' in lines
+
+
+def test_pipeline_metrics(metrics: Metrics) -> None:
+    """
+    Test the metrics recorded by the parser and the documents
+    :param metrics: The enabled metrics fixture
+    """
+    docs = AmazonReviewParser.read_file('../amazon_reviews/tests/ressources/amazon_review_test.json')
+    report = metrics.report()
+    assert set(report['stages']) == {'json_decode', 'tokenize', 'tag', 'align'}
+    assert report['counters']['documents'] == len(docs)
+    assert report['counters']['tokens'] == sum(len(doc.tokens) for doc in docs)
+    assert report['counters']['misaligned_tokens'] == 0
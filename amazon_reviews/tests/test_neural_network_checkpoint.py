@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the neural_network/checkpoint.py file
+"""
+
+
+import os
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip('keras.callbacks')
+
+from amazon_reviews.neural_network.checkpoint import TrainingCheckpoint
+from amazon_reviews.neural_network.sequence import BucketedSequence
+
+
+class FakeModel:
+    """
+    Stand-in of a Keras model, writing its name instead of its weights
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor of the FakeModel class
+        """
+        self.stop_training = False
+
+    def save(self, filepath: str) -> None:
+        """
+        Write the model file
+        :param filepath: The path of the model file
+        """
+        with open(filepath, 'w', encoding='utf-8') as fp:
+            fp.write('model')
+
+
+class FakeEarlyStopping:
+    """
+    Stand-in of the `EarlyStopping` callback state
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor of the FakeEarlyStopping class
+        """
+        self.wait = 0
+        self.best = np.inf
+        self.stopped_epoch = 0
+
+
+@pytest.fixture
+def sequence() -> BucketedSequence:
+    """
+    A sequence of 10 documents in 5 batches
+    :return: A BucketedSequence object
+    """
+    word = [np.ones(n, dtype=np.int32) for n in range(1, 11)]
+    return BucketedSequence(word, word, word, np.zeros(10), batch_size=2, nb_buckets=2)
+
+
+def test_TrainingCheckpoint(sequence: BucketedSequence, tmp_path: 'pathlib.Path') -> None:
+    """
+    Test a checkpoint is written every few batches and at the end of each epoch, then restored
+    :param sequence: The sequence fixture
+    :param tmp_path: The pytest temporary directory
+    """
+    directory = str(tmp_path / 'checkpoints')
+    early_stopping = FakeEarlyStopping()
+    checkpoint = TrainingCheckpoint(directory, sequence, every_batches=2, callbacks=[early_stopping])
+    checkpoint.set_model(FakeModel())
+    checkpoint.on_train_begin()
+    checkpoint.on_epoch_begin(0)
+    for batch in range(2):
+        checkpoint.on_batch_end(batch)
+    assert checkpoint.position == (0, 2)
+    early_stopping.wait, early_stopping.best = 1, np.float64(0.25)
+    for batch in range(2, 5):
+        checkpoint.on_batch_end(batch)
+    checkpoint.on_epoch_end(0)
+    assert checkpoint.position == (1, 0)
+    # Only the model file of the last checkpoint is kept
+    assert sorted(os.listdir(directory)) == ['model_0001_000000.h5', 'state.json']
+    checkpoint.on_epoch_begin(1)
+    checkpoint.on_batch_end(0)
+    checkpoint.on_batch_end(1)
+    expected = random.random(), np.random.rand()
+
+    resumed_sequence = BucketedSequence(sequence.word, sequence.pos, sequence.shape, sequence.labels,
+                                        batch_size=2, nb_buckets=2)
+    resumed_early_stopping = FakeEarlyStopping()
+    resumed = TrainingCheckpoint(directory, resumed_sequence, callbacks=[resumed_early_stopping])
+    assert resumed.position == (0, 0) and not resumed.stopped
+    assert resumed.restore()
+    assert resumed.position == (1, 2)
+    assert resumed.model_path == os.path.join(directory, 'model_0001_000002.h5')
+    assert (random.random(), np.random.rand()) == expected
+    assert resumed_sequence.seed == sequence.seed
+    resumed.on_train_begin()
+    assert (resumed_early_stopping.wait, resumed_early_stopping.best) == (1, 0.25)
+    resumed_sequence.set_position(1, 2)
+    sequence.set_position(1, 2)
+    assert [resumed_sequence[i][0][0].tolist() for i in range(3)] == [sequence[i][0][0].tolist() for i in range(3)]
+
+
+def test_TrainingCheckpoint_resumed_epoch(sequence: BucketedSequence, tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the batch position of a resumed epoch does not depend on the sequence being reset by the enqueuer thread
+    :param sequence: The sequence fixture
+    :param tmp_path: The pytest temporary directory
+    """
+    checkpoint = TrainingCheckpoint(str(tmp_path), sequence, every_batches=1)
+    checkpoint.set_model(FakeModel())
+    sequence.set_position(1, 2)
+    checkpoint.on_train_begin()
+    checkpoint.on_epoch_begin(1)
+    checkpoint.on_batch_end(0)
+    assert checkpoint.position == (1, 3)
+    # The enqueuer has queued the last batches of the epoch while they are still trained on
+    sequence.on_epoch_end()
+    checkpoint.on_batch_end(1)
+    assert checkpoint.position == (1, 4)
+    checkpoint.on_batch_end(2)
+    checkpoint.on_epoch_end(1)
+    assert checkpoint.position == (2, 0)
+    checkpoint.on_epoch_begin(2)
+    checkpoint.on_batch_end(0)
+    assert checkpoint.position == (2, 1)
+
+
+def test_TrainingCheckpoint_clear(sequence: BucketedSequence, tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the model files the state file does not point to are removed, and a previous run is cleared
+    :param sequence: The sequence fixture
+    :param tmp_path: The pytest temporary directory
+    """
+    directory = str(tmp_path / 'checkpoints')
+    os.makedirs(directory)
+    # Left over by an interrupted run
+    FakeModel().save(os.path.join(directory, 'model_0003_000000.h5'))
+    checkpoint = TrainingCheckpoint(directory, sequence)
+    checkpoint.set_model(FakeModel())
+    checkpoint.on_epoch_end(0)
+    assert sorted(os.listdir(directory)) == ['model_0001_000000.h5', 'state.json']
+    checkpoint.clear()
+    assert os.listdir(directory) == [] and checkpoint.position == (0, 0)
+    assert not TrainingCheckpoint(directory, sequence).restore()
+
+
+def test_TrainingCheckpoint_missing(sequence: BucketedSequence, tmp_path: 'pathlib.Path') -> None:
+    """
+    Test restoring a run without checkpoint
+    :param sequence: The sequence fixture
+    :param tmp_path: The pytest temporary directory
+    """
+    checkpoint = TrainingCheckpoint(str(tmp_path), sequence)
+    assert not checkpoint.restore()
+    assert checkpoint.model_path is None
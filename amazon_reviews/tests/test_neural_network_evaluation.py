@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the neural_network/evaluation.py file
+"""
+
+
+import numpy as np
+
+from amazon_reviews.neural_network.evaluation import is_rating_concordant_comment, StreamingEvaluation
+
+
+def test_is_rating_concordant_comment() -> None:
+    """
+    Test the is_rating_concordant_comment function
+    """
+    comments = np.asarray([0, 1, 0, 1, 0, 1])
+    ratings = np.asarray([1, 3, 4, 5, 3.0, 4.0])
+    assert is_rating_concordant_comment(comments, ratings).tolist() == [True, False, False, True, True, True]
+
+
+def test_StreamingEvaluation() -> None:
+    """
+    Test everything about the StreamingEvaluation class
+    """
+    evaluation = StreamingEvaluation(nb_classes=2)
+    evaluation.update([0, 0, 1], [0, 1, 1], ratings=[1, 2, 5])
+    evaluation.update(np.asarray([1, 1], dtype=np.int8), np.asarray([0, 1], dtype=np.int8))
+    assert len(evaluation) == 5
+    assert evaluation.confusion_matrix.tolist() == [[1, 1], [1, 2]]
+    assert evaluation.accuracy == 3 / 5
+    assert evaluation.agreement_rate == 2 / 3
+    report = evaluation.report(['negative', 'positive'])
+    lines = report.splitlines()
+    assert lines[2].split() == ['negative', '0.50', '0.50', '0.50', '2']
+    assert lines[3].split() == ['positive', '0.67', '0.67', '0.67', '3']
+    assert 'agreement rate: 0.6667' in report
+    assert StreamingEvaluation().agreement_rate is None
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the neural_network/inference.py file
+"""
+
+
+import numpy as np
+import pytest
+
+from amazon_reviews.neural_network.inference import NumpyRecurrentNetwork
+
+
+@pytest.fixture
+def network() -> NumpyRecurrentNetwork:
+    """
+    A network with random weights: 20 words, 6 pos and 5 shapes, 4 BiLSTM units and 3 LSTM units
+    :return: A NumpyRecurrentNetwork object
+    """
+    rng = np.random.RandomState(0)
+    weights = {'word_embeddings': rng.randn(20, 3), 'pos_embeddings': rng.randn(6, 2),
+               'shape_embeddings': rng.randn(5, 2), 'output_kernel': rng.randn(3, 1), 'output_bias': rng.randn(1)}
+    for name, input_dim, units in (('bilstm_forward', 7, 4), ('bilstm_backward', 7, 4), ('lstm', 8, 3)):
+        weights[f'{name}_kernel'] = rng.randn(input_dim, 4 * units)
+        weights[f'{name}_recurrent_kernel'] = rng.randn(units, 4 * units)
+        weights[f'{name}_bias'] = rng.randn(4 * units)
+    config = {name: {'activation': 'tanh', 'recurrent_activation': 'hard_sigmoid'}
+              for name in NumpyRecurrentNetwork.LSTM_LAYERS}
+    config['output'] = {'activation': 'sigmoid'}
+    return NumpyRecurrentNetwork({name: array.astype(np.float32) for name, array in weights.items()}, config)
+
+
+def test_NumpyRecurrentNetwork_masking(network: NumpyRecurrentNetwork) -> None:
+    """
+    Test padded and masked timesteps do not change the predictions, whatever the batch
+    :param network: The network fixture
+    """
+    word = np.asarray([[3, 7, 1, 0, 0, 0], [4, 9, 2, 11, 5, 8]])
+    pos = np.asarray([[1, 2, 3, 0, 0, 0], [5, 4, 3, 2, 1, 1]])
+    shape = np.asarray([[1, 1, 2, 0, 0, 0], [4, 3, 2, 1, 1, 2]])
+    batch = network.predict([word, pos, shape])
+    assert batch.shape == (2, 1) and np.all((batch > 0) & (batch < 1))
+    assert np.allclose(network.predict([word[:1, :3], pos[:1, :3], shape[:1, :3]]), batch[:1], atol=1e-6)
+    assert np.allclose(network.predict([word, pos, shape], batch_size=1), batch, atol=1e-6)
+    # A timestep is skipped when any of its inputs is 0
+    masked = network.predict([np.asarray([[4, 9, 0, 11, 5, 8]]), pos[1:], shape[1:]])
+    skipped = network.predict([np.asarray([[4, 9, 11, 5, 8]]), pos[1:, [0, 1, 3, 4, 5]], shape[1:, [0, 1, 3, 4, 5]]])
+    assert np.allclose(masked, skipped, atol=1e-6)
+    assert network.predict([np.zeros((0, 4), dtype=int)] * 3).shape == (0, 1)
+
+
+def test_NumpyRecurrentNetwork_save(network: NumpyRecurrentNetwork, tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the inference bundle is read back identically
+    :param network: The network fixture
+    :param tmp_path: The pytest temporary directory
+    """
+    filepath = str(tmp_path / 'model.npz')
+    network.save(filepath)
+    loaded = NumpyRecurrentNetwork.load(filepath)
+    assert loaded.config == network.config
+    assert sorted(loaded.weights) == sorted(network.weights)
+    inputs = [np.asarray([[1, 2, 3, 0]])] * 3
+    assert np.array_equal(loaded.predict(inputs), network.predict(inputs))
+    assert loaded.probas_to_classes_batch(np.asarray([[0.2], [0.7]])).tolist() == [0, 1]
+
+
+def test_NumpyRecurrentNetwork_from_keras(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the predictions match Keras on a model built by `RecurrentNeuralNetwork.build_classification`
+    :param tmp_path: The pytest temporary directory
+    """
+    pytest.importorskip('keras.layers')
+    from amazon_reviews.document.embeddings import WordEmbeddings
+    from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork
+    rng = np.random.RandomState(0)
+    embeddings = WordEmbeddings([f'w{i}' for i in range(50)], rng.randn(50, 8).astype(np.float32))
+    model = RecurrentNeuralNetwork.build_classification(embeddings, {'pos': (48, 10), 'shape': (7, 2)}, 1, units=16)
+    filepath = str(tmp_path / 'model.npz')
+    model.export_inference(filepath)
+    network = NumpyRecurrentNetwork.load(filepath)
+    lengths = rng.randint(1, 12, size=16)
+    inputs = [np.where(np.arange(12) < lengths[:, None], rng.randint(1, size, size=(16, 12)), 0)
+              for size in (50, 48, 7)]
+    assert np.allclose(network.predict(inputs), model.predict(inputs, batch_size=16), atol=1e-5)
+
+
+@pytest.mark.parametrize('precision', ['float16', 'int8'])
+def test_NumpyRecurrentNetwork_precision(network: NumpyRecurrentNetwork, tmp_path: 'pathlib.Path',
+                                         precision: str) -> None:
+    """
+    Test the reduced precision bundles are smaller and predict close to the float32 network
+    :param network: The network fixture
+    :param tmp_path: The pytest temporary directory
+    :param precision: The storage precision
+    """
+    filepath = str(tmp_path / 'model.npz')
+    reduced = network.to_precision(precision)
+    reduced.save(filepath)
+    loaded = NumpyRecurrentNetwork.load(filepath)
+    assert loaded.precision == precision
+    assert loaded.vocabulary_size == network.vocabulary_size == network.weights['word_embeddings'].shape[0]
+    assert loaded.weights['lstm_kernel'].dtype == np.float32
+    assert loaded.nbytes < network.nbytes
+    inputs = [np.asarray([[3, 7, 1, 0], [4, 9, 2, 11]]), np.asarray([[1, 2, 3, 0], [5, 4, 3, 2]]),
+              np.asarray([[1, 1, 2, 0], [4, 3, 2, 1]])]
+    assert np.array_equal(loaded.predict(inputs), reduced.predict(inputs))
+    assert np.abs(loaded.predict(inputs) - network.predict(inputs)).max() < 0.05
+    assert np.allclose(loaded.to_precision('float32').predict(inputs), loaded.predict(inputs), atol=1e-6)
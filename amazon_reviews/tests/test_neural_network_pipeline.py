@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the neural_network/pipeline.py file
+"""
+
+
+from itertools import islice
+from typing import Iterator, List
+
+import pytest
+
+from amazon_reviews.document import Document, Vectorizer
+from amazon_reviews.neural_network.pipeline import PrefetchingPipeline
+from .test_vectorizer import vectorizer
+
+
+@pytest.fixture
+def documents() -> List[Document]:
+    """
+    Documents of 1 to 23 words, rated 1 or 5 alternately
+    :return: The list of documents
+    """
+    docs = Document.create_many([' '.join(['hello'] * n) for n in range(1, 24)])
+    for i, doc in enumerate(docs):
+        doc.rating = 5 if i % 2 else 1
+    return docs
+
+
+@pytest.mark.usefixtures('vectorizer')
+def test_PrefetchingPipeline(vectorizer: Vectorizer, documents: List[Document]) -> None:
+    """
+    Test the streamed epoch, the next ones and the validation batches
+    :param vectorizer: The fixture vectorizer
+    :param documents: The fixture documents
+    """
+    with PrefetchingPipeline(iter(documents), vectorizer, len(documents), batch_size=3, nb_buckets=2,
+                             chunk_size=5, queue_size=2, seed=0) as pipeline:
+        assert (pipeline.nb_train, pipeline.nb_validation) == (19, 4)
+        assert (pipeline.steps_per_epoch, pipeline.validation_steps) == (7, 2)
+        train = pipeline.train_batches()
+        streamed = list(islice(train, 7))
+        # Each chunk of 5 documents keeps 4 of them for training, the documents left over wait for the next chunk.
+        # The streamed batches have the sizes of the next epochs ones
+        assert sorted(len(labels) for _, labels in streamed) == [1, 3, 3, 3, 3, 3, 3]
+        lengths = sorted(int(length) for (word, _, _), _ in streamed for length in (word > 0).sum(axis=1))
+        assert lengths == [n for n in range(1, 24) if n % 5]
+        for (word, pos, shape), labels in streamed:
+            assert word.shape == pos.shape == shape.shape == (len(labels), (word > 0).sum(axis=1).max())
+        validation = list(islice(pipeline.validation_batches(), 3))
+        validation_lengths = [sorted((batch[0][0] > 0).sum(axis=1).tolist()) for batch in validation]
+        assert validation_lengths == [[5, 10], [15, 20], [5, 10]]
+        assert [batch[1].tolist() for batch in validation[:2]] == [[0, 1], [0, 1]]
+        # The next epochs are drawn from the kept documents
+        replayed = list(islice(train, 2 * pipeline.steps_per_epoch))
+        for epoch in (replayed[:7], replayed[7:]):
+            assert sorted(int(n) for (word, _, _), _ in epoch for n in (word > 0).sum(axis=1)) == lengths
+
+
+@pytest.mark.usefixtures('vectorizer')
+def test_PrefetchingPipeline_steps(vectorizer: Vectorizer, documents: List[Document]) -> None:
+    """
+    Test the streamed epoch counts as many batches as the next ones when the buckets hold partial batches
+    :param vectorizer: The fixture vectorizer
+    :param documents: The fixture documents
+    """
+    with PrefetchingPipeline(iter(documents), vectorizer, len(documents), batch_size=3, nb_buckets=4,
+                             chunk_size=5, seed=0) as pipeline:
+        assert pipeline.steps_per_epoch == 8
+        train = pipeline.train_batches()
+        epochs = [list(islice(train, pipeline.steps_per_epoch)) for _ in range(3)]
+        lengths = [n for n in range(1, 24) if n % 5]
+        for epoch in epochs:
+            assert sorted(len(labels) for _, labels in epoch) == [1, 2, 2, 2, 3, 3, 3, 3]
+            assert sorted(int(n) for (word, _, _), _ in epoch for n in (word > 0).sum(axis=1)) == lengths
+
+
+def test_PrefetchingPipeline_close(vectorizer: Vectorizer, documents: List[Document]) -> None:
+    """
+    Test the producer stops when the pipeline is closed before the end of the stream, and reports errors
+    :param vectorizer: The fixture vectorizer
+    :param documents: The fixture documents
+    """
+    closed = []
+
+    def stream() -> Iterator[Document]:
+        """
+        Yield the documents, recording when the stream is closed
+        :return: A generator of documents
+        """
+        try:
+            yield from documents
+        finally:
+            closed.append(True)
+
+    pipeline = PrefetchingPipeline(stream(), vectorizer, len(documents), batch_size=1, chunk_size=1, queue_size=1)
+    with pipeline:
+        next(pipeline.train_batches())
+    assert closed == [True]
+    failing = PrefetchingPipeline([None], vectorizer, 1).start()
+    with pytest.raises(RuntimeError):
+        next(failing.train_batches())
+    failing.close()
@@ -37,3 +37,14 @@ def test_RecurrentNeuralNetwork_probas_to_classes():
     arr2 = np.asarray([0.1], dtype=np.float32)
     assert RecurrentNeuralNetwork.probas_to_classes(arr1) == 2
     assert RecurrentNeuralNetwork.probas_to_classes(arr2) == 0
+
+
+def test_RecurrentNeuralNetwork_probas_to_classes_batch():
+    """
+    Test The probas_to_classes_batch class method matches probas_to_classes row by row
+    """
+    binary = np.asarray([[0.1], [0.5], [0.51], [0.9]], dtype=np.float32)
+    multiclass = np.asarray([[0.1, 0.2, 0.7], [0.6, 0.3, 0.1]], dtype=np.float32)
+    for probas in (binary, multiclass):
+        expected = [RecurrentNeuralNetwork.probas_to_classes(proba) for proba in probas]
+        assert RecurrentNeuralNetwork.probas_to_classes_batch(probas).tolist() == expected
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the neural_network/sequence.py file
+"""
+
+
+import numpy as np
+import pytest
+
+from amazon_reviews.neural_network.sequence import BucketedSequence
+
+
+@pytest.fixture
+def features() -> tuple:
+    """
+    Unpadded features of documents of various lengths
+    :return: The word, pos and shape features and the labels
+    """
+    lengths = [3, 40, 1, 6, 38, 2, 45, 41]
+    word = [np.arange(1, n + 1, dtype=np.int32) for n in lengths]
+    pos = [np.full(n, 2, dtype=np.int32) for n in lengths]
+    shape = [np.full(n, 3, dtype=np.int32) for n in lengths]
+    labels = np.arange(len(lengths), dtype=np.int8)
+    return word, pos, shape, labels
+
+
+def test_BucketedSequence(features: tuple) -> None:
+    """
+    Test everything about the BucketedSequence class
+    :param features: The fixture features to test on
+    """
+    word, pos, shape, labels = features
+    sequence = BucketedSequence(word, pos, shape, labels, batch_size=2, nb_buckets=2, seed=0)
+    assert len(sequence) == 4
+    seen = []
+    for i in range(len(sequence)):
+        (batch_word, batch_pos, batch_shape), batch_labels = sequence[i]
+        lengths = [len(word[label]) for label in batch_labels]
+        assert batch_word.shape == batch_pos.shape == batch_shape.shape == (len(batch_labels), max(lengths))
+        for row, label in zip(batch_word, batch_labels):
+            assert row.tolist() == word[label].tolist() + [0] * (max(lengths) - len(word[label]))
+        assert max(lengths) < 10 or min(lengths) > 10
+        seen.extend(batch_labels.tolist())
+    assert sorted(seen) == labels.tolist()
+    sequence.on_epoch_end()
+    assert sorted(np.concatenate([sequence[i][1] for i in range(len(sequence))]).tolist()) == labels.tolist()
+
+
+def test_BucketedSequence_batch_sizes(features: tuple) -> None:
+    """
+    Test the batch sizes computed before the features are known match the batches of the sequence
+    :param features: The fixture features to test on
+    """
+    word, pos, shape, labels = features
+    for batch_size, nb_buckets in ((2, 2), (3, 2), (3, 3), (64, 10)):
+        sequence = BucketedSequence(word, pos, shape, labels, batch_size=batch_size, nb_buckets=nb_buckets,
+                                    shuffle=False)
+        sizes = BucketedSequence.batch_sizes(len(word), batch_size, nb_buckets)
+        assert sizes == [len(batch) for batch in sequence.batches]
+        assert BucketedSequence.count_batches(len(word), batch_size, nb_buckets) == len(sequence)
+    assert BucketedSequence.batch_sizes(19, 3, 4) == [3, 2, 3, 2, 3, 2, 3, 1]
+    assert BucketedSequence.batch_sizes(0) == []
+
+
+def test_BucketedSequence_restore_order(features: tuple) -> None:
+    """
+    Test predictions made on the batches are put back in the documents order
+    :param features: The fixture features to test on
+    """
+    word, pos, shape, _ = features
+    sequence = BucketedSequence(word, pos, shape, batch_size=3, shuffle=False)
+    predictions = np.concatenate([batch[0][:, :1] for batch in (sequence[i] for i in range(len(sequence)))])
+    assert sequence.restore_order(predictions)[:, 0].tolist() == [1] * len(word)
+    lengths = np.concatenate([(sequence[i][0] > 0).sum(axis=1) for i in range(len(sequence))])
+    assert sequence.restore_order(lengths).tolist() == [len(w) for w in word]
+
+
+def test_BucketedSequence_indices(features: tuple) -> None:
+    """
+    Test a sequence only yields the documents of its indices
+    :param features: The fixture features to test on
+    """
+    word, pos, shape, labels = features
+    sequence = BucketedSequence(word, pos, shape, labels, batch_size=2, indices=np.asarray([6, 1, 2]), shuffle=False)
+    assert sorted(np.concatenate([sequence[i][1] for i in range(len(sequence))]).tolist()) == [1, 2, 6]
+    lengths = np.concatenate([(sequence[i][0][0] > 0).sum(axis=1) for i in range(len(sequence))])
+    assert sequence.restore_order(lengths).tolist() == [45, 40, 1]
+
+
+def test_BucketedSequence_set_position(features: tuple) -> None:
+    """
+    Test the batches of an epoch are replayed from the seed, skipping the batches already used
+    :param features: The fixture features to test on
+    """
+    word, pos, shape, labels = features
+    sequence = BucketedSequence(word, pos, shape, labels, batch_size=2, nb_buckets=2, seed=3)
+    epochs = []
+    for _ in range(3):
+        epochs.append([sequence[i][1].tolist() for i in range(len(sequence))])
+        sequence.on_epoch_end()
+    assert sequence.epoch == 3
+    resumed = BucketedSequence(word, pos, shape, labels, batch_size=2, nb_buckets=2, seed=3)
+    resumed.set_position(1, 3)
+    assert len(resumed) == 1
+    assert [resumed[0][1].tolist()] == epochs[1][3:]
+    assert resumed.order.tolist() == resumed.batches[3].tolist()
+    resumed.on_epoch_end()
+    assert len(resumed) == 4
+    assert [resumed[i][1].tolist() for i in range(len(resumed))] == epochs[2]
+    with pytest.raises(ValueError):
+        resumed.set_position(0, 5)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the neural_network/sweep.py file
+"""
+
+
+import csv
+import os
+
+from amazon_reviews.neural_network.sweep import configuration_name, expand_grid, format_results, rank_results, \
+    run_sweep, THREAD_VARIABLES, write_results
+
+
+def test_expand_grid() -> None:
+    """
+    Test every combination of the hyperparameters is listed and named
+    """
+    configs = expand_grid({'units': [64, 128], 'dropout_rate': [0.2], 'pos_size': [5, 10]})
+    assert configs == [{'units': 64, 'dropout_rate': 0.2, 'pos_size': 5},
+                       {'units': 64, 'dropout_rate': 0.2, 'pos_size': 10},
+                       {'units': 128, 'dropout_rate': 0.2, 'pos_size': 5},
+                       {'units': 128, 'dropout_rate': 0.2, 'pos_size': 10}]
+    assert configuration_name(configs[1]) == 'units-64_dropout_rate-0.2_pos_size-10'
+
+
+def test_results(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the ranking, the text table and the CSV file of the results
+    :param tmp_path: The pytest temporary directory
+    """
+    results = rank_results([
+        {'units': 64, 'val_loss': 0.5, 'seconds_per_epoch': 12.25, 'model': 'a.h5', 'error': None},
+        {'units': 32, 'val_loss': None, 'seconds_per_epoch': None, 'model': None, 'error': 'MemoryError: '},
+        {'units': 128, 'val_loss': 0.25, 'seconds_per_epoch': 20.5, 'model': 'b.h5', 'error': None}
+    ])
+    assert [result['units'] for result in results] == [128, 64, 32]
+    lines = format_results(results).splitlines()
+    assert lines[0].split() == ['rank', 'units', 'val_loss', 'seconds_per_epoch', 'error']
+    assert lines[1].split() == ['1', '128', '0.25', '20.5']
+    assert lines[3].split() == ['3', '32', 'MemoryError:']
+    filepath = str(tmp_path / 'results.csv')
+    write_results(results, filepath)
+    with open(filepath, 'r', encoding='utf-8') as fp:
+        rows = list(csv.DictReader(fp))
+    assert [row['rank'] for row in rows] == ['1', '2', '3']
+    assert rows[0]['model'] == 'b.h5'
+
+
+def test_run_sweep_failure(tmp_path: 'pathlib.Path') -> None:
+    """
+    Test a failed configuration is reported in the results and the thread caps are only set for the workers
+    :param tmp_path: The pytest temporary directory
+    """
+    environment = {name: os.environ.get(name) for name in THREAD_VARIABLES}
+    config = {'units': 4, 'dropout_rate': 0.1, 'pos_size': 2, 'shape_size': 2}
+    results = run_sweep([config], {'features': str(tmp_path / 'missing')}, jobs=1, threads=1)
+    assert len(results) == 1
+    assert results[0]['units'] == 4 and results[0]['val_loss'] is None
+    assert results[0]['error']
+    assert {name: os.environ.get(name) for name in THREAD_VARIABLES} == environment
@@ -7,9 +7,16 @@ Pytest file for the document/parser.py file
 """
 
 
+import bz2
+import gzip
+import lzma
+import os
+from typing import Iterator
+
 import pytest
 
 from amazon_reviews.document import AmazonReviewParser
+from config import DATA_DIR
 
 
 @pytest.fixture
@@ -31,3 +38,37 @@ def test_AmazonReviewParser(test_review_file_path: str) -> None:
     assert docs[0].rating == 5.0
     assert docs[1].text == 'Flo le déglingo !'
     assert docs[1].rating == 4.0
+    assert AmazonReviewParser.count_file(test_review_file_path) == len(docs)
+    assert AmazonReviewParser.count_file(test_review_file_path, skip=1) == 1
+
+
+@pytest.mark.parametrize('extension, opener', [('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open)])
+def test_AmazonReviewParser_iter_file(test_review_file_path: str, tmp_path: 'pathlib.Path',
+                                      extension: str, opener: 'Callable') -> None:
+    """
+    Test the lazy and compression-aware reading of a review file
+    :param test_review_file_path: The filepath fixture to the review
+    :param tmp_path: The pytest temporary directory
+    :param extension: The extension of the compressed file
+    :param opener: The function used to compress the file
+    """
+    with open(os.path.join(DATA_DIR, test_review_file_path), 'rb') as fp:
+        content = fp.read()
+    compressed_path = str(tmp_path / f'amazon_review_test.json{extension}')
+    with opener(compressed_path, 'wb') as fp:
+        fp.write(content)
+    docs = AmazonReviewParser.iter_file(compressed_path)
+    assert isinstance(docs, Iterator)
+    assert [doc.text for doc in docs] == ['Doudoux le doux !', 'Flo le déglingo !']
+    assert [doc.text for doc in AmazonReviewParser.iter_file(compressed_path, skip=1)] == ['Flo le déglingo !']
+    assert [doc.text for doc in AmazonReviewParser.read_file(compressed_path, limit=1)] == ['Doudoux le doux !']
+
+
+def test_AmazonReviewParser_workers(test_review_file_path: str) -> None:
+    """
+    Test that reading a file with a process pool keeps the documents and their order
+    :param test_review_file_path: The filepath fixture to the review
+    """
+    docs = AmazonReviewParser.read_file(test_review_file_path, workers=2, chunksize=1)
+    assert [(doc.text, doc.rating) for doc in docs] == [('Doudoux le doux !', 5.0), ('Flo le déglingo !', 4.0)]
+    assert [token.text for token in docs[0].tokens] == ['Doudoux', 'le', 'doux', '!']
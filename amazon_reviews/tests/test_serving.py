@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Pytest file for the serving package, the model is replaced by a stand-in scoring function
+so that everything runs on localhost without loading Keras, except for the Keras thread test
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import threading
+from typing import List, Optional
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from amazon_reviews.document import Document, TokenizationCache, Vectorizer
+from amazon_reviews.serving import create_http_server, MicroBatcher, ReviewScorer, serve_stdio
+from .test_vectorizer import vectorizer
+
+
+def _score(texts: List[str]) -> List[dict]:
+    """
+    Stand-in scoring function: the probability is the share of '!' in the text
+    :param texts: The review texts
+    :return: The score of each text
+    """
+    return [{'probability': text.count('!') / len(text), 'length': len(text)} for text in texts]
+
+
+@pytest.fixture
+def batcher() -> MicroBatcher:
+    """
+    A batcher recording the size of each of its batches
+    :return: A MicroBatcher object
+    """
+    sizes = []
+
+    def process(texts: List[str]) -> List[dict]:
+        sizes.append(len(texts))
+        return _score(texts)
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait=0.05)
+    batcher.sizes = sizes
+    yield batcher
+    batcher.close()
+
+
+def test_MicroBatcher(batcher: MicroBatcher) -> None:
+    """
+    Test concurrent requests are grouped into batches and each caller gets its own result
+    :param batcher: The fixture batcher to test on
+    """
+    texts = ['!' * i + 'a' * (20 - i) for i in range(20)]
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(batcher, texts))
+    assert results == _score(texts)
+    assert sum(batcher.sizes) == 20
+    assert max(batcher.sizes) <= 8
+    assert len(batcher.sizes) < 20
+    stats = batcher.stats()
+    assert stats['requests'] == 20 and stats['batches'] == len(batcher.sizes)
+    assert 0 < stats['latency_p50_ms'] <= stats['latency_p99_ms']
+    assert stats['throughput'] > 0
+
+
+def test_MicroBatcher_error() -> None:
+    """
+    Test an error while processing a batch is raised to the callers of the batch
+    """
+    def process(texts: List[str]) -> List[dict]:
+        raise RuntimeError('model failure')
+
+    batcher = MicroBatcher(process, max_wait=0)
+    with pytest.raises(RuntimeError):
+        batcher('text')
+    batcher.close()
+
+
+def test_MicroBatcher_item_error() -> None:
+    """
+    Test an exception returned for an item is raised to its caller only, the other items of the batch get a result
+    """
+    def process(texts: List[str]) -> List[object]:
+        return [ValueError('bad review') if text == 'bad' else result for text, result in zip(texts, _score(texts))]
+
+    batcher = MicroBatcher(process, max_batch_size=3, max_wait=1)
+    futures = [batcher.submit(text) for text in ('good !', 'bad', 'great !!')]
+    assert futures[0].result(10) == _score(['good !'])[0]
+    with pytest.raises(ValueError):
+        futures[1].result(10)
+    assert futures[2].result(10) == _score(['great !!'])[0]
+    batcher.close()
+
+
+def test_MicroBatcher_closed() -> None:
+    """
+    Test an item submitted after closing the batcher is rejected instead of waiting forever
+    """
+    batcher = MicroBatcher(_score, max_wait=0)
+    assert batcher('text !') == _score(['text !'])[0]
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit('text')
+    batcher.close()
+
+
+@pytest.mark.usefixtures('vectorizer')
+def test_ReviewScorer(vectorizer: Vectorizer, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test a review failing to be encoded is answered with an error while the rest of the batch is scored
+    :param vectorizer: The fixture vectorizer to test on
+    :param monkeypatch: The pytest monkeypatch fixture
+    """
+    encode_document = vectorizer.encode_document
+
+    def encode_unknown(document: 'amazon_reviews.document.Document') -> tuple:
+        if 'world' in document.token_texts():
+            raise KeyError('UNKNOWN-TAG')
+        return encode_document(document)
+
+    class Model:
+        """
+        Stand-in model: the probability is the number of tokens over 10
+        """
+        probas_to_classes = staticmethod(lambda proba: int(proba[0] > 0.5))
+
+        @staticmethod
+        def predict(inputs: list, batch_size: int) -> 'np.ndarray':
+            return np.sum(inputs[0] > 0, axis=1, keepdims=True) / 10
+
+    create_many = Document.create_many
+    batches = []
+
+    def record_batch(texts: List[str], cache: Optional[TokenizationCache] = None) -> list:
+        batches.append(texts)
+        return create_many(texts, cache=cache)
+
+    monkeypatch.setattr(vectorizer, 'encode_document', encode_unknown)
+    monkeypatch.setattr(Document, 'create_many', record_batch)
+    texts = ['hello !', 'hello world !', 'hello hello hello hello hello hello !']
+    results = ReviewScorer(vectorizer, Model())(texts)
+    assert batches == [texts]
+    assert results[0] == {'probability': 0.2, 'label': 'negative'}
+    assert isinstance(results[1], ValueError) and 'UNKNOWN-TAG' in str(results[1])
+    assert results[2] == {'probability': 0.7, 'label': 'positive'}
+    assert all(isinstance(result, ValueError) for result in ReviewScorer(vectorizer, Model())(['world']))
+
+    def fail_batch(texts: List[str], cache: Optional[TokenizationCache] = None) -> list:
+        if len(texts) > 1:
+            raise LookupError('tagger failure')
+        return create_many(texts, cache=cache)
+
+    # The texts are then tokenized one at a time
+    monkeypatch.setattr(Document, 'create_many', fail_batch)
+    results = ReviewScorer(vectorizer, Model())(texts)
+    assert results[0] == {'probability': 0.2, 'label': 'negative'}
+    assert isinstance(results[1], ValueError) and 'UNKNOWN-TAG' in str(results[1])
+    assert results[2] == {'probability': 0.7, 'label': 'positive'}
+
+
+@pytest.mark.usefixtures('vectorizer')
+def test_ReviewScorer_keras(vectorizer: Vectorizer) -> None:
+    """
+    Test a Keras model built on this thread predicts from the `MicroBatcher` thread
+    :param vectorizer: The fixture vectorizer to test on
+    """
+    pytest.importorskip('keras.layers')
+    from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork
+    input_shape = {'pos': (len(vectorizer.pos2index), 10), 'shape': (len(vectorizer.shape2index), 2)}
+    model = RecurrentNeuralNetwork.build_classification(vectorizer.word_embeddings, input_shape, 1, units=4)
+    batcher = MicroBatcher(ReviewScorer(vectorizer, model), max_batch_size=4, max_wait=0.05)
+    texts = ['Great product !', 'It broke after a week.', 'Works as expected.']
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(batcher, texts))
+    batcher.close()
+    assert all(0 <= result['probability'] <= 1 and result['label'] in ReviewScorer.LABELS for result in results)
+
+
+def test_create_http_server(batcher: MicroBatcher) -> None:
+    """
+    Test scoring reviews over HTTP on localhost
+    :param batcher: The fixture batcher to test on
+    """
+    server = create_http_server(batcher, ('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    try:
+        def post(body: bytes) -> dict:
+            request = urllib.request.Request(f'{url}/score', data=body, method='POST')
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return json.load(response)
+
+        reviews = [{'reviewText': 'Great !!', 'overall': 5.0}, {'reviewText': 'Bad'}]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(post, [json.dumps(review).encode('utf-8') for review in reviews]))
+        assert results == _score(['Great !!', 'Bad'])
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post(b'{"reviewText": ""}')
+        assert error.value.code == 400
+        with urllib.request.urlopen(f'{url}/stats', timeout=10) as response:
+            assert json.load(response)['requests'] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_stdio(batcher: MicroBatcher) -> None:
+    """
+    Test scoring a JSONL stream, responses are written in the order of the requests
+    :param batcher: The fixture batcher to test on
+    """
+    texts = [f'review {i} ' + '!' * i for i in range(30)]
+    requests = [json.dumps({'reviewText': text}) for text in texts]
+    input_stream = io.StringIO('\n'.join(requests[:10] + ['not json', ''] + requests[10:]) + '\n')
+    output_stream = io.StringIO()
+    serve_stdio(batcher, input_stream, output_stream, window=4)
+    responses = [json.loads(line) for line in output_stream.getvalue().splitlines()]
+    assert len(responses) == 31
+    assert 'error' in responses[10]
+    assert responses[:10] + responses[11:] == _score(texts)
@@ -7,9 +7,12 @@ Pytest file for the document/vectorizer.py file
 """
 
 
+import json
+
+import numpy as np
 import pytest
 
-from amazon_reviews.document import Vectorizer
+from amazon_reviews.document import AmazonReviewParser, Document, Vectorizer
 from .test_document import document
 
 
@@ -36,3 +39,135 @@ def test_Vectorizer(vectorizer: Vectorizer, document: 'amazon_reviews.document.D
     assert words.tolist() == [[13075, 85, 805]]
     assert pos.tolist() == [[38, 11, 21]]
     assert shapes.tolist() == [[4, 5, 2]]
+    assert vectorizer.encode_words(['Hello', 'WORLD', '!', 'notaglovewordatall']) == [13075, 85, 805, 0]
+
+
+@pytest.mark.usefixtures('document')
+def test_Vectorizer_ragged(vectorizer: Vectorizer, document: 'amazon_reviews.document.Document') -> None:
+    """
+    Test the ragged output mode, the padding and the truncation of the features
+    :param vectorizer: The fixture vectorizer to test on
+    :param document: The fixture document to run test on
+    """
+    docs = [document, Document.create_from_text('Hello')]
+    words, pos, shapes = vectorizer.encode_features(docs, ragged=True)
+    assert words.values.dtype == np.int32 and pos.values.dtype == np.uint8 and shapes.values.dtype == np.uint8
+    assert words.values.tolist() == [13075, 85, 805, 13075]
+    assert words.offsets.tolist() == [0, 3, 4]
+    assert shapes.offsets is words.offsets
+    assert pos[0].tolist() == [38, 11, 21]
+    words, pos, shapes = vectorizer.encode_features(docs)
+    assert words.tolist() == [[13075, 85, 805], [13075, 0, 0]]
+    assert shapes.tolist() == [[4, 5, 2], [4, 0, 0]]
+    words, _, _ = vectorizer.encode_features(docs, max_len=2)
+    assert words.tolist() == [[13075, 85], [13075, 0]]
+    words, _, _ = vectorizer.encode_features(docs, ragged=True, max_len=2, truncating='pre')
+    assert [w.tolist() for w in words] == [[85, 805], [13075]]
+
+
+@pytest.mark.usefixtures('document')
+def test_Vectorizer_features(vectorizer: Vectorizer, document: 'amazon_reviews.document.Document',
+                             tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the export and import of encoded features through a feature store
+    :param vectorizer: The fixture vectorizer to test on
+    :param document: The fixture document to run test on
+    :param tmp_path: The pytest temporary directory
+    """
+    directory = str(tmp_path / 'features')
+    source = {'filename': 'Automotive_5_train.json', 'skip': 0, 'limit': None}
+    vectorizer.save_features(iter([document]), directory, source)
+    store = vectorizer.load_features(directory, source)
+    assert store.manifest['embedding_file'] == 'glove.6B.50d.txt'
+    assert store.manifest['source'] == source
+    with pytest.raises(ValueError):
+        vectorizer.load_features(directory, {'filename': 'Automotive_5_test.json', 'skip': 0, 'limit': None})
+    with pytest.raises(ValueError):
+        vectorizer.load_features(directory, dict(source, limit=10))
+    assert [w.tolist() for w in store.word] == [[13075, 85, 805]]
+    assert [p.tolist() for p in store.pos] == [[38, 11, 21]]
+    assert [s.tolist() for s in store.shape] == [[4, 5, 2]]
+    assert store.labels.tolist() == [1]
+    assert store.ratings.tolist() == [document.rating]
+    vectorizer.labels2index = {1: 0, 2: 0, 3: 1, 4: 1, 5: 1}
+    with pytest.raises(ValueError):
+        vectorizer.load_features(directory)
+
+
+def test_Vectorizer_open_or_write_features(vectorizer: Vectorizer, tmp_path: 'pathlib.Path') -> None:
+    """
+    Test that a feature store is written from its review file on first use, then opened
+    :param vectorizer: The fixture vectorizer to test on
+    :param tmp_path: The pytest temporary directory
+    """
+    filename = '../amazon_reviews/tests/ressources/amazon_review_test.json'
+    directory = str(tmp_path / 'features')
+    written = vectorizer.open_or_write_features(filename, directory)
+    assert written.manifest['source'] == {'filename': filename, 'skip': 0, 'limit': None}
+    opened = vectorizer.open_or_write_features(filename, directory)
+    assert len(opened) == len(written) == len(AmazonReviewParser.read_file(filename))
+    assert opened.labels.tolist() == written.labels.tolist()
+    with pytest.raises(ValueError):
+        vectorizer.open_or_write_features('Automotive_5_test.json', directory)
+
+
+@pytest.mark.usefixtures('document')
+def test_Vectorizer_prune_training(vectorizer: Vectorizer, document: 'amazon_reviews.document.Document') -> None:
+    """
+    Test the words seen only after the training documents are out of the pruned vocabulary,
+    and the copy of a vectorizer is pruned on its own
+    :param vectorizer: The fixture vectorizer to test on
+    :param document: The fixture document to run test on
+    """
+    words, _, _ = vectorizer.encode_features([document, Document.create_from_text('Goodbye')], ragged=True)
+    copy = vectorizer.copy()
+    assert copy.word_embeddings is vectorizer.word_embeddings
+    pruned = copy.prune(words, nb_training=1)
+    assert copy.vocabulary_rows.tolist() == [0, 85, 805, 13075]
+    assert pruned.values.tolist() == [3, 1, 2, 0]
+    assert vectorizer.vocabulary_rows is None and len(vectorizer.word2index) > 4
+
+
+@pytest.mark.usefixtures('document')
+def test_Vectorizer_prune(vectorizer: Vectorizer, document: 'amazon_reviews.document.Document',
+                          tmp_path: 'pathlib.Path') -> None:
+    """
+    Test the pruning of the vocabulary to the words of a corpus and its reloading
+    :param vectorizer: The fixture vectorizer to test on
+    :param document: The fixture document to run test on
+    :param tmp_path: The pytest temporary directory
+    """
+    words, _, _ = vectorizer.encode_features([document], ragged=True)
+    full_vocabulary = list(vectorizer.word_embeddings.index2word)
+    pruned = vectorizer.prune(words)
+    assert vectorizer.vocabulary_rows.tolist() == [0, 85, 805, 13075]
+    assert vectorizer.word_embeddings.index2word == [full_vocabulary[0], 'world', '!', 'hello']
+    assert vectorizer.word_embeddings.syn0.shape[0] == 4
+    assert pruned.values.tolist() == [3, 1, 2] and pruned.offsets is words.offsets
+    assert vectorizer.encode_words(['Hello', 'WORLD', '!', 'notaglovewordatall']) == [3, 1, 2, 0]
+    assert vectorizer.remap(np.asarray([[13075, 85, 42, 0]])).tolist() == [[3, 1, 0, 0]]
+    with pytest.raises(ValueError):
+        vectorizer.prune(words)
+    vocabulary_path = Vectorizer.vocabulary_path(str(tmp_path / 'model.h5'))
+    assert vocabulary_path == str(tmp_path / 'model.vocab.json')
+    vectorizer.save_vocabulary(vocabulary_path)
+    reloaded = Vectorizer('glove.6B.50d.txt')
+    reloaded.load_vocabulary(vocabulary_path)
+    assert reloaded.word2index == vectorizer.word2index
+    assert reloaded.vocabulary_hash == vectorizer.vocabulary_hash
+    model_vectorizer = Vectorizer('glove.6B.50d.txt')
+    model_vectorizer.load_model_vocabulary(str(tmp_path / 'model.h5'), 4)
+    assert model_vectorizer.word2index == vectorizer.word2index
+    # The vocabulary file of a model trained on a pruned vocabulary is missing
+    with pytest.raises(ValueError):
+        Vectorizer('glove.6B.50d.txt').load_model_vocabulary(str(tmp_path / 'other.h5'), 4)
+    with pytest.raises(ValueError):
+        Vectorizer('glove.6B.50d.txt').load_model_vocabulary(str(tmp_path / 'model.h5'), 13076)
+    # A vocabulary saved with another version of the tag sets belongs to a model to retrain
+    with open(vocabulary_path, 'r', encoding='utf-8') as fp:
+        vocabulary = json.load(fp)
+    del vocabulary['tagset_version']
+    with open(vocabulary_path, 'w', encoding='utf-8') as fp:
+        json.dump(vocabulary, fp)
+    with pytest.raises(ValueError):
+        Vectorizer('glove.6B.50d.txt').load_vocabulary(vocabulary_path)
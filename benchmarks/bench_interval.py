@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Micro-benchmark of the Interval classes against their previous dict based implementation,
+can be launched from the command line: python -m benchmarks.bench_interval
+"""
+
+
+import timeit
+import tracemalloc
+from typing import List
+
+from amazon_reviews.document.interval import Interval, Token
+
+
+class LegacyInterval:
+    """
+    The previous implementation: no __slots__, hash of the sorted __dict__ and tuple comparisons
+    """
+
+    def __init__(self, start: int, end: int) -> None:
+        self._start = int(start)
+        self._end = int(end)
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __eq__(self, other: 'LegacyInterval') -> bool:
+        return self.start == other.start and self.end == other.end
+
+    def __lt__(self, other: 'LegacyInterval') -> bool:
+        return (self.start, -len(self)) < (other.start, -len(other))
+
+    def __hash__(self) -> hash:
+        return hash(tuple(v for k, v in sorted(self.__dict__.items())))
+
+    def overlaps(self, other: 'LegacyInterval') -> bool:
+        a, b = sorted((self, other))
+        return a.end > b.start
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+
+class LegacyToken(LegacyInterval):
+    """
+    The previous Token, its hash included the document and all its features
+    """
+
+    def __init__(self, document: object, start: int, end: int, pos: str, shape: str, text: str) -> None:
+        LegacyInterval.__init__(self, start, end)
+        self._doc = document
+        self._pos = pos
+        self._shape = shape
+        self._text = text
+
+
+def _spans(nb: int) -> List[tuple]:
+    """
+    Generate the spans of `nb` consecutive tokens
+    :param nb: The number of spans
+    :return: The list of (start, end)
+    """
+    return [(i * 6, i * 6 + 5) for i in range(nb)]
+
+
+def _measure(name: str, interval_cls: type, token_cls: type, nb: int, repeat: int) -> dict:
+    """
+    Time the bulk operations and measure the memory of `nb` tokens
+    :param name: The name of the implementation
+    :param interval_cls: The Interval class
+    :param token_cls: The Token class
+    :param nb: The number of tokens
+    :param repeat: The number of repetitions of each timing, the best one is kept
+    :return: The seconds taken by each operation and the bytes allocated by the tokens
+    """
+    spans = _spans(nb)
+    doc = object()
+    tracemalloc.start()
+    tokens = [token_cls(doc, start, end, 'NN', 'LOWER', 'token') for start, end in spans]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    intervals = [interval_cls(start, end) for start, end in spans]
+    reference = interval_cls(nb * 3, nb * 3 + 100)
+    operations = {
+        'set of tokens': lambda: set(tokens),
+        'dict of intervals': lambda: {interval: i for i, interval in enumerate(intervals)},
+        'sort': lambda: sorted(reversed(intervals)),
+        'overlaps': lambda: [reference.overlaps(interval) for interval in intervals],
+    }
+    timings = {operation: min(timeit.repeat(function, number=1, repeat=repeat))
+               for operation, function in operations.items()}
+    return {'name': name, 'memory': memory, **timings}
+
+
+def _main(nb: int = 200000, repeat: int = 3) -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    results = [_measure('legacy', LegacyInterval, LegacyToken, nb, repeat),
+               _measure('slotted', Interval, Token, nb, repeat)]
+    legacy, slotted = results
+    print(f'{nb} tokens')
+    print(f"{'operation':<20}{'legacy':>12}{'slotted':>12}{'speedup':>10}")
+    for operation in legacy:
+        if operation == 'name':
+            continue
+        unit = 'MB' if operation == 'memory' else 's'
+        scale = 1e6 if operation == 'memory' else 1
+        print(f'{operation:<20}{legacy[operation] / scale:>10.3f}{unit:>2}{slotted[operation] / scale:>10.3f}{unit:>2}'
+              f'{legacy[operation] / slotted[operation]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Accuracy and throughput report of the inference bundle and of the word embeddings stored in float32, float16
+and int8, on the test split. The float32 bundle is the reference of the probability differences,
+can be launched from the command line: python -m benchmarks.bench_precision [--model MODEL.npz]
+"""
+
+
+import argparse
+import os
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from amazon_reviews.document import AmazonReviewParser, Vectorizer
+from amazon_reviews.document.embeddings import PRECISIONS
+from amazon_reviews.neural_network.evaluation import StreamingEvaluation
+from amazon_reviews.neural_network.inference import NumpyRecurrentNetwork
+from amazon_reviews.neural_network.sequence import BucketedSequence
+
+
+def _predict(engine: NumpyRecurrentNetwork, batches: List[list]) -> 'np.ndarray':
+    """
+    Predict padded batches one after the other
+    :param engine: The inference engine
+    :param batches: The word, pos and shape inputs of each batch
+    :return: The probabilities of all the batches
+    """
+    return np.concatenate([engine.predict(inputs) for inputs in batches])
+
+
+def _main() -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default='./models_save/ner_weights.npz',
+                        help='The float32 inference bundle from export_model.py')
+    parser.add_argument('--embeddings', default='glove.6B.50d.txt', help='The word embedding file in GLOVE_DIR')
+    parser.add_argument('--test', default='Automotive_5_test.json', help='The test review file in DATA_DIR')
+    parser.add_argument('--repeat', type=int, default=3, help='The number of timed runs, the best one is kept')
+    args = parser.parse_args()
+    reference = NumpyRecurrentNetwork.load(args.model)
+    vectorizer = Vectorizer(args.embeddings)
+    vectorizer.load_model_vocabulary(args.model, reference.vocabulary_size)
+    documents = AmazonReviewParser.read_file(args.test)
+    word, pos, shape = vectorizer.encode_features(documents, ragged=True)
+    labels = vectorizer.encode_annotations(documents)
+    ratings = np.asarray([doc.rating for doc in documents])
+    sequence = BucketedSequence(word, pos, shape, batch_size=64, shuffle=False)
+    batches = [sequence[i] for i in range(len(sequence))]
+    reference_probas = None
+    print(f'{len(documents)} test reviews, {len(vectorizer.word_embeddings)} words of dimension '
+          f'{vectorizer.word_embeddings.vector_size}')
+    print(f'{"precision":>9} {"embeddings MB":>13} {"bundle MB":>9} {"load ms":>7} {"docs/s":>8} '
+          f'{"accuracy":>8} {"max diff":>8} {"flipped":>7}')
+    with tempfile.TemporaryDirectory() as directory:
+        for precision in PRECISIONS:
+            embeddings = vectorizer.word_embeddings.to_precision(precision)
+            embeddings_bytes = embeddings.vectors.nbytes
+            if embeddings.scales is not None:
+                embeddings_bytes += embeddings.scales.nbytes
+            filepath = os.path.join(directory, f'{precision}.npz')
+            reference.to_precision(precision).save(filepath)
+            start = time.perf_counter()
+            engine = NumpyRecurrentNetwork.load(filepath)
+            load_time = time.perf_counter() - start
+            seconds = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                probas = _predict(engine, batches)
+                seconds.append(time.perf_counter() - start)
+            probas = sequence.restore_order(probas)
+            if reference_probas is None:
+                reference_probas = probas
+            classes = engine.probas_to_classes_batch(probas)
+            evaluation = StreamingEvaluation(nb_classes=2)
+            evaluation.update(labels, classes, ratings)
+            flipped = int(np.sum(classes != engine.probas_to_classes_batch(reference_probas)))
+            print(f'{precision:>9} {embeddings_bytes / 2 ** 20:>13.1f} {os.path.getsize(filepath) / 2 ** 20:>9.1f} '
+                  f'{1000 * load_time:>7.1f} {len(documents) / min(seconds):>8.0f} {evaluation.accuracy:>8.4f} '
+                  f'{np.abs(probas - reference_probas).max():>8.1e} {flipped:>7}')
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Benchmark of the batch shape classifier against the previous per token function,
+can be launched from the command line: python -m benchmarks.bench_shape
+"""
+
+
+import random
+import re
+import string
+import timeit
+from typing import List
+
+from amazon_reviews.document.interval import get_shape_categories
+
+
+def legacy_shape_category(token: str) -> str:
+    """
+    The previous implementation of `get_shape_category`
+    :param token: The Token to get the shape of
+    :return: The shape category
+    """
+    if re.match('^[\n]+$', token):
+        return 'NL'
+    if any(char.isdigit() for char in token) and re.match('^[0-9.,]+$', token):
+        return 'NUMBER'
+    if re.fullmatch('[^A-Za-z0-9\t\n ]+', token):
+        return 'SPECIAL'
+    if re.fullmatch(r'^[A-Z\-.]+$', token):
+        return 'ALL-CAPS'
+    if re.fullmatch(r'^[A-Z][a-z\-.]+$', token):
+        return '1ST-CAP'
+    if re.fullmatch(r'^[a-z\-.]+$', token):
+        return 'LOWER'
+    if not token.isupper() and not token.islower():
+        return 'MISC'
+    return 'MISC'
+
+
+def review_tokens(nb: int, vocabulary_size: int = 5000, seed: int = 0) -> List[str]:
+    """
+    Generate tokens drawn with a Zipf like distribution from a random vocabulary, as in reviews
+    :param nb: The number of tokens
+    :param vocabulary_size: The number of distinct tokens
+    :param seed: The random seed
+    :return: The list of tokens
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + '.,-$!?\'"\n'
+    vocabulary = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 10))) for _ in range(vocabulary_size)]
+    vocabulary += ['the', 'The', 'GREAT', '2.000', '\n', '!', 'iPhone', 'third-party', '3RD', 'é']
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    rng.shuffle(vocabulary)
+    return rng.choices(vocabulary, weights, k=nb)
+
+
+def _main(nb: int = 500000, repeat: int = 3) -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    tokens = review_tokens(nb)
+    if get_shape_categories(tokens) != [legacy_shape_category(token) for token in tokens]:
+        raise AssertionError('get_shape_categories does not match the previous implementation')
+    legacy = min(timeit.repeat(lambda: [legacy_shape_category(token) for token in tokens], number=1, repeat=repeat))
+    batch = min(timeit.repeat(lambda: get_shape_categories(tokens), number=1, repeat=repeat))
+    print(f'{nb} tokens')
+    print(f'legacy get_shape_category: {legacy:.3f}s ({nb / legacy:,.0f} tokens/s)')
+    print(f'get_shape_categories:      {batch:.3f}s ({nb / batch:,.0f} tokens/s), {legacy / batch:.1f}x faster')
+
+
+if __name__ == '__main__':
+    _main()
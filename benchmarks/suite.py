@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Benchmark suite of the ingestion -> vectorization -> inference hot paths on synthetic Amazon reviews,
+with a small stand-in embedding file so that it runs offline.
+The throughputs are compared to a JSON baseline and regressions beyond a threshold make the suite fail,
+can be launched from the command line: python -m benchmarks.suite [--save] [--threshold 0.2]
+"""
+
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from amazon_reviews.document import AmazonReviewParser, Document, Interval, Vectorizer
+from amazon_reviews.document.embeddings import WordEmbeddings
+from amazon_reviews.document.interval import get_shape_category
+from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'baseline.json')
+
+
+def synthetic_vocabulary(vocabulary_size: int = 5000, seed: int = 0) -> List[str]:
+    """
+    Generate a vocabulary of pronounceable lowercase words, from the most to the least frequent
+    :param vocabulary_size: The number of distinct words
+    :param seed: The random seed
+    :return: The list of words
+    """
+    rng = random.Random(seed)
+    words = ['the', 'and', 'it', 'a', 'to', 'is', 'this', 'for', 'i', 'great', 'not', 'product', 'car', 'works']
+    known = set(words)
+    while len(words) < vocabulary_size:
+        word = ''.join(rng.choice('bcdfghlmnprstvz') + rng.choice('aeiou') for _ in range(rng.randint(1, 4)))
+        if word not in known:
+            known.add(word)
+            words.append(word)
+    return words
+
+
+def synthetic_review(rng: random.Random, vocabulary: List[str], weights: List[float], nb_words: int) -> str:
+    """
+    Generate the text of a review: sentences of 3 to 20 Zipf distributed words, with capitals,
+    numbers, commas, final punctuation and paragraphs
+    :param rng: The random generator
+    :param vocabulary: The list of words, from the most to the least frequent
+    :param weights: The weight of each word
+    :param nb_words: The number of words of the review
+    :return: The review text
+    """
+    words = rng.choices(vocabulary, weights, k=nb_words)
+    sentences = []
+    while words:
+        sentence = words[:rng.randint(3, 20)]
+        words = words[len(sentence):]
+        if rng.random() < 0.1:
+            sentence[rng.randrange(len(sentence))] = str(rng.randint(1, 500))
+        if len(sentence) > 6 and rng.random() < 0.3:
+            sentence[len(sentence) // 2] += ','
+        sentences.append(sentence[0].capitalize() + ''.join(' ' + word for word in sentence[1:])
+                         + rng.choice('..!?'))
+    text = ' '.join(sentences)
+    return text.replace('. ', '.\n', 1) if rng.random() < 0.2 else text
+
+
+def synthetic_reviews(filepath: str, nb: int, mean_words: float = 80., sigma: float = 0.8,
+                      vocabulary_size: int = 5000, seed: int = 0) -> None:
+    """
+    Write a JSONL file of synthetic Amazon reviews, the number of words of a review follows
+    a log-normal distribution as in real reviews (many short ones, a long tail of long ones)
+    :param filepath: The path of the JSONL file to write
+    :param nb: The number of reviews
+    :param mean_words: The median number of words of a review
+    :param sigma: The standard deviation of the logarithm of the number of words
+    :param vocabulary_size: The number of distinct words
+    :param seed: The random seed
+    """
+    rng = random.Random(seed)
+    vocabulary = synthetic_vocabulary(vocabulary_size, seed)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    with open(filepath, 'w', encoding='utf-8') as fp:
+        for i in range(nb):
+            nb_words = max(1, int(rng.lognormvariate(np.log(mean_words), sigma)))
+            text = synthetic_review(rng, vocabulary, weights, nb_words)
+            review = {'reviewerID': f'A{i:08d}', 'asin': f'B{i % 997:09d}', 'reviewText': text,
+                      'overall': float(rng.randint(1, 5)), 'summary': text[:30]}
+            fp.write(json.dumps(review) + '\n')
+
+
+def stand_in_embeddings(filepath: str, vector_size: int = 50, vocabulary_size: int = 5000, seed: int = 0) -> str:
+    """
+    Write the binary store of random embeddings over the synthetic vocabulary, in place of GloVe.
+    About one word in ten is left out so that the out of vocabulary path is exercised
+    :param filepath: The path of the embedding file the store is named after
+    :param vector_size: The dimension of the word vectors
+    :param vocabulary_size: The number of distinct words of the synthetic reviews
+    :param seed: The random seed
+    :return: The path of the embedding file, to give to `Vectorizer`
+    """
+    vocabulary = synthetic_vocabulary(vocabulary_size, seed)
+    index2word = [word for i, word in enumerate(vocabulary) if i % 10 != 9] + list('.,!?')
+    vectors = np.random.RandomState(seed).uniform(-1, 1, (len(index2word), vector_size)).astype(np.float32)
+    WordEmbeddings(index2word, vectors).save_binary(filepath)
+    return filepath
+
+
+def measure(function: Callable[[], object], nb_items: int, repeat: int) -> dict:
+    """
+    Time a function, keeping the best of several runs
+    :param function: The function to time
+    :param nb_items: The number of items processed by a call, to compute the throughput
+    :param repeat: The number of runs
+    :return: The best time in seconds, the number of items and the items per second
+    """
+    seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+    return {'seconds': seconds, 'items': nb_items, 'throughput': nb_items / seconds if seconds else float('inf')}
+
+
+def _interval_operations(spans: List[tuple]) -> None:
+    """
+    Build, sort, hash and intersect Intervals as done when aligning tokens and sentences
+    :param spans: The list of (start, end)
+    """
+    intervals = sorted(Interval(start, end) for start, end in spans)
+    len(set(intervals))
+    for a, b in zip(intervals, intervals[1:]):
+        if a.overlaps(b):
+            a.intersection(b)
+
+
+def _predict_benchmark(vectorizer: Vectorizer, documents: List[Document], repeat: int) -> Optional[dict]:
+    """
+    Time the prediction of an untrained model built on the stand-in embeddings
+    :param vectorizer: The vectorizer of the stand-in embeddings
+    :param documents: The documents to predict
+    :param repeat: The number of runs
+    :return: The timing, None if Keras is not installed
+    """
+    input_shape = {'pos': (len(vectorizer.pos2index), 10), 'shape': (len(vectorizer.shape2index), 2)}
+    try:
+        model = RecurrentNeuralNetwork.build_classification(vectorizer.word_embeddings, input_shape, 1)
+    except ImportError:
+        return None
+    inputs = list(vectorizer.encode_features(documents))
+    return measure(lambda: model.predict(inputs, batch_size=64), len(documents), repeat)
+
+
+def run(nb_reviews: int = 2000, mean_words: float = 80., repeat: int = 3, seed: int = 0) -> Dict[str, dict]:
+    """
+    Run every benchmark on freshly generated synthetic data
+    :param nb_reviews: The number of synthetic reviews
+    :param mean_words: The median number of words of a review
+    :param repeat: The number of runs of each benchmark, the best one is kept
+    :param seed: The random seed
+    :return: The timing of each benchmark by name
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        reviews_path = os.path.join(directory, 'reviews.json')
+        synthetic_reviews(reviews_path, nb_reviews, mean_words=mean_words, seed=seed)
+        with open(reviews_path, 'r', encoding='utf-8') as fp:
+            texts = [json.loads(line)['reviewText'] for line in fp]
+
+        results['parser.read_file'] = measure(lambda: AmazonReviewParser.read_file(reviews_path), nb_reviews, repeat)
+        results['document.create_from_text'] = measure(lambda: [Document.create_from_text(text) for text in texts],
+                                                       nb_reviews, repeat)
+        documents = AmazonReviewParser.read_file(reviews_path)
+        tokens = [text for doc in documents for text in doc.token_texts()]
+        results['interval.get_shape_category'] = measure(lambda: [get_shape_category(token) for token in tokens],
+                                                         len(tokens), repeat)
+        spans = [(token.start, token.end) for doc in documents for token in doc.tokens]
+        results['interval.operations'] = measure(lambda: _interval_operations(spans), len(spans), repeat)
+
+        vectorizer = Vectorizer(stand_in_embeddings(os.path.join(directory, 'embeddings.txt'), seed=seed))
+        results['vectorizer.encode_features'] = measure(lambda: vectorizer.encode_features(documents),
+                                                        nb_reviews, repeat)
+        results['vectorizer.encode_features_ragged'] = measure(
+            lambda: vectorizer.encode_features(documents, ragged=True), nb_reviews, repeat)
+        predict = _predict_benchmark(vectorizer, documents, repeat)
+        if predict is not None:
+            results['recurrent.predict'] = predict
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Find the benchmarks whose throughput is lower than their baseline one by more than the threshold,
+    the throughputs are compared so that runs on a different number of items stay comparable
+    :param results: The timing of each benchmark by name
+    :param baseline: The baseline timing of each benchmark by name, benchmarks missing from it are ignored
+    :param threshold: The tolerated relative slowdown (e.g. 0.2 for 20%)
+    :return: The description of each regression
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None or not reference['seconds'] or not result['items']:
+            continue
+        throughput = result['items'] / result['seconds'] if result['seconds'] else float('inf')
+        reference_throughput = reference['items'] / reference['seconds']
+        slowdown = reference_throughput / throughput - 1
+        if slowdown > threshold:
+            regressions.append(f"{name}: {throughput:,.0f} items/s vs baseline {reference_throughput:,.0f} items/s "
+                               f"({result['items']} vs {reference['items']} items, {slowdown:+.0%} slower)")
+    return regressions
+
+
+def _main() -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reviews', type=int, default=2000, help='The number of synthetic reviews')
+    parser.add_argument('--mean-words', type=float, default=80., help='The median number of words of a review')
+    parser.add_argument('--repeat', type=int, default=3, help='The number of runs of each benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='The random seed of the synthetic data')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='The JSON baseline file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='The tolerated relative slowdown')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baseline')
+    args = parser.parse_args()
+    results = run(args.reviews, args.mean_words, args.repeat, args.seed)
+    for name, result in sorted(results.items()):
+        print(f"{name:<36} {result['seconds']:>9.4f}s {result['throughput']:>14,.0f} items/s")
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+        print(f'Baseline saved to {args.baseline}')
+        return
+    if not os.path.isfile(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save to create it')
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as fp:
+        regressions = compare(results, json.load(fp), args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if regressions:
+        sys.exit(1)
+    print(f'No regression beyond {args.threshold:.0%}')
+
+
+if __name__ == '__main__':
+    _main()
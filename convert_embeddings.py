@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which convert a word embedding file into its memory-mapped binary store,
+can be launched from the command line
+"""
+
+
+import argparse
+import os
+
+from amazon_reviews.document.embeddings import PRECISIONS, WordEmbeddings
+from config import GLOVE_DIR
+
+
+def _main() -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('filenames', nargs='*', default=['glove.6B.50d.txt'],
+                        help='The word embedding files in GLOVE_DIR')
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32',
+                        help='The storage precision of the vectors, int8 stores one scale per row')
+    args = parser.parse_args()
+    for filename in args.filenames:
+        filepath = os.path.join(GLOVE_DIR, filename)
+        print(f'Converting {filepath}')
+        embeddings = WordEmbeddings.convert(filepath, args.precision)
+        print(f'Converted {len(embeddings)} words of dimension {embeddings.vector_size} in {embeddings.precision} '
+              f'({embeddings.vectors.nbytes / 2 ** 20:.1f} MB) to', ', '.join(WordEmbeddings.binary_paths(filepath)))
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which export a trained model into an inference bundle predicted with NumPy only,
+can be launched from the command line
+"""
+
+
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+
+from amazon_reviews.document import Vectorizer
+from amazon_reviews.document.embeddings import PRECISIONS
+from amazon_reviews.neural_network.inference import NumpyRecurrentNetwork
+from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork
+
+
+def _main() -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default='./models_save/ner_weights.h5', help='The trained model file')
+    parser.add_argument('--output', help='The inference bundle to write, defaults to the model file with .npz')
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32',
+                        help='The storage precision of the embeddings, the other weights use float16 if it is reduced')
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.model)[0] + '.npz'
+    model = RecurrentNeuralNetwork.load(args.model)
+    model.export_inference(output, args.precision)
+    # The bundle is encoded with the pruned vocabulary of the model, which must follow it
+    vocabulary_path = Vectorizer.vocabulary_path(args.model)
+    if os.path.isfile(vocabulary_path) and \
+            os.path.abspath(vocabulary_path) != os.path.abspath(Vectorizer.vocabulary_path(output)):
+        shutil.copyfile(vocabulary_path, Vectorizer.vocabulary_path(output))
+        print(f'Copied the vocabulary to {Vectorizer.vocabulary_path(output)}')
+    start = time.perf_counter()
+    engine = NumpyRecurrentNetwork.load(output)
+    print(f'Exported {output} ({os.path.getsize(output) / 2 ** 20:.1f} MB instead of '
+          f'{os.path.getsize(args.model) / 2 ** 20:.1f} MB), loaded in {time.perf_counter() - start:.3f}s')
+    # Check the exported forward pass against Keras on random padded documents
+    rng = np.random.RandomState(0)
+    sizes = [engine.weights[name].shape[0] for name in engine.EMBEDDINGS]
+    lengths = rng.randint(1, 60, size=64)
+    inputs = [np.where(np.arange(60) < lengths[:, None], rng.randint(1, size, size=(64, 60)), 0) for size in sizes]
+    error = np.abs(engine.predict(inputs) - model.predict(inputs, batch_size=64)).max()
+    print(f'Maximum difference with Keras on random documents: {error:.2e}')
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which serve the neural network model, keeping the vectorizer and the model in memory,
+can be launched from the command line
+"""
+
+
+import argparse
+import json
+import os
+import sys
+
+from amazon_reviews.document import Vectorizer
+from amazon_reviews.neural_network.inference import NumpyRecurrentNetwork
+from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork
+from amazon_reviews.serving import create_http_server, MicroBatcher, ReviewScorer, serve_stdio
+
+
+def _main() -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default='./models_save/ner_weights.h5',
+                        help='The trained model file, or its NumPy inference bundle (.npz) from export_model.py')
+    parser.add_argument('--embeddings', default='glove.6B.50d.txt', help='The word embedding file in GLOVE_DIR')
+    parser.add_argument('--port', type=int, default=8000, help='The localhost port of the HTTP endpoint')
+    parser.add_argument('--stdio', action='store_true', help='Read JSONL requests on stdin instead of serving HTTP')
+    parser.add_argument('--max-batch-size', type=int, default=64, help='The maximum number of reviews in a batch')
+    parser.add_argument('--max-wait', type=float, default=0.01, help='The maximum seconds a batch waits to fill up')
+    args = parser.parse_args()
+    if os.path.splitext(args.model)[1] == '.npz':
+        model = NumpyRecurrentNetwork.load(args.model)
+    else:
+        model = RecurrentNeuralNetwork.load(args.model)
+    vectorizer = Vectorizer(args.embeddings)
+    vectorizer.load_model_vocabulary(args.model, model.vocabulary_size)
+    scorer = ReviewScorer(vectorizer, model)
+    batcher = MicroBatcher(scorer, max_batch_size=args.max_batch_size, max_wait=args.max_wait)
+    try:
+        if args.stdio:
+            serve_stdio(batcher, sys.stdin, sys.stdout)
+        else:
+            server = create_http_server(batcher, ('127.0.0.1', args.port))
+            print(f'Serving on http://127.0.0.1:{server.server_port}, POST /score, GET /stats', file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                server.server_close()
+    finally:
+        batcher.close()
+        print(json.dumps(batcher.stats()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    _main()
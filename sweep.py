@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+"""
+Package which run a hyperparameter sweep of the neural network model: the reviews are encoded once,
+then every combination of the hyperparameters is trained in a pool of processes and ranked by validation loss,
+can be launched from the command line
+"""
+
+
+import argparse
+import os
+
+import numpy as np
+
+from amazon_reviews.document import TokenizationCache, Vectorizer
+from amazon_reviews.neural_network.sweep import expand_grid, format_results, run_sweep, write_results
+
+
+def _prepare_data(args: argparse.Namespace) -> dict:
+    """
+    Encode the training reviews into a feature store if needed, then prune the vocabulary and write
+    the re-encoded word features and the pruned embeddings, which the worker processes memory-map
+    :param args: The command line arguments
+    :return: The paths and settings passed to the worker processes
+    """
+    vectorizer = Vectorizer(args.embeddings)
+    cache = TokenizationCache() if args.cache else None
+    print(f'Reading feature store {args.features}')
+    store = vectorizer.open_or_write_features(args.train, args.features, cache=cache, workers=os.cpu_count())
+    print(f'Loaded {len(store)} data samples')
+    os.makedirs(args.output, exist_ok=True)
+    word_path = os.path.join(args.output, 'word.npy')
+    vocabulary_path = os.path.join(args.output, 'vocab.json')
+    embeddings_path = os.path.join(args.output, 'embeddings')
+    # Same split as `train_configuration`, the vocabulary is the one of the training documents only
+    np.save(word_path, vectorizer.prune(store.word, nb_training=int(len(store) * 0.8)).values)
+    vectorizer.save_vocabulary(vocabulary_path)
+    vectorizer.word_embeddings.save_binary(embeddings_path)
+    return {'features': store.directory, 'word': word_path, 'vocabulary': vocabulary_path,
+            'embeddings': embeddings_path, 'output': args.output, 'epochs': args.epochs,
+            'patience': args.patience, 'batch_size': args.batch_size, 'seed': args.seed}
+
+
+def _main() -> None:
+    """
+    Main function DO NOT IMPORT
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--units', type=int, nargs='+', default=[128], help='The units of the LSTM layers')
+    parser.add_argument('--dropout-rate', type=float, nargs='+', default=[0.4], help='The dropout rates')
+    parser.add_argument('--pos-size', type=int, nargs='+', default=[10], help='The sizes of the pos embeddings')
+    parser.add_argument('--shape-size', type=int, nargs='+', default=[2], help='The sizes of the shape embeddings')
+    parser.add_argument('--train', default='Automotive_5_train.json', help='The training review file in DATA_DIR')
+    parser.add_argument('--embeddings', default='glove.6B.50d.txt', help='The word embedding file in GLOVE_DIR')
+    parser.add_argument('--features', default='features_train',
+                        help='Feature store directory in DATA_DIR, written on first use then reused')
+    parser.add_argument('--cache', action='store_true', help='Cache the tokenization of the reviews in DATA_DIR')
+    parser.add_argument('--output', default='./models_save/sweep',
+                        help='The directory of the models, of the shared features and embeddings and of the results')
+    parser.add_argument('--epochs', type=int, default=10, help='The maximum number of epochs of a configuration')
+    parser.add_argument('--patience', type=int, default=5, help='The patience of the early stopping')
+    parser.add_argument('--batch-size', type=int, default=64, help='The batch size')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the batch order, shared by all configurations')
+    parser.add_argument('--jobs', type=int, default=2, help='The number of configurations trained concurrently')
+    parser.add_argument('--threads', type=int,
+                        help='The maximum number of threads of each configuration, by default the cores are shared')
+    args = parser.parse_args()
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.jobs)
+    configs = expand_grid({'units': args.units, 'dropout_rate': args.dropout_rate, 'pos_size': args.pos_size,
+                           'shape_size': args.shape_size})
+    data = _prepare_data(args)
+    print(f'Training {len(configs)} configurations, {args.jobs} at a time with {threads} threads each')
+    results = run_sweep(configs, data, args.jobs, threads)
+    results_path = os.path.join(args.output, 'results.csv')
+    write_results(results, results_path)
+    print(format_results(results))
+    print(f'Results written to {results_path}')
+
+
+if __name__ == '__main__':
+    _main()
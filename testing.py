@@ -8,43 +8,77 @@ can be launched from the command line
 """
 
 
+import argparse
+from itertools import islice
+import os
+from typing import Iterator
+
 import numpy as np
-from sklearn.metrics import classification_report
 
-from amazon_reviews.document import AmazonReviewParser, Vectorizer
+from amazon_reviews.document import AmazonReviewParser, TokenizationCache, Vectorizer
+from amazon_reviews.metrics import METRICS
+from amazon_reviews.neural_network.evaluation import StreamingEvaluation
 from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork
+from amazon_reviews.neural_network.sequence import BucketedSequence
 
 
-def _is_rating_concordant_comment(comment: int, rating: int) -> bool:
+def _iter_features(vectorizer: Vectorizer, filename: str, args: argparse.Namespace) -> Iterator[tuple]:
     """
-    Check if a rating and a comment are concordant
-    :param comment: The status of a comment (negative: 0, positive: 1)
-    :param rating: The rating of the document (1 to 5)
-    :return: If a rating and a comment are concordant
+    Read and encode a review file chunk by chunk, through a feature store if one is given
+    :param vectorizer: The vectorizer encoding the documents
+    :param filename: The review file, relative to DATA_DIR
+    :param args: The command line arguments
+    :return: A generator of the word, pos and shape features, the labels and the ratings of each chunk of documents
     """
-    if rating <= 3 and comment == 0:
-        return True
-    if rating >= 4 and comment == 1:
-        return True
-    return False
+    cache = TokenizationCache() if args.cache else None
+    if args.features:
+        print(f'Reading feature store {args.features}')
+        store = vectorizer.open_or_write_features(filename, args.features, cache=cache, workers=os.cpu_count())
+        for start in range(0, len(store), args.chunk_size):
+            chunk = slice(start, start + args.chunk_size)
+            yield store.word[chunk], store.pos[chunk], store.shape[chunk], store.labels[chunk], store.ratings[chunk]
+    else:
+        documents = AmazonReviewParser.iter_file(filename, workers=os.cpu_count(), cache=cache)
+        chunk = list(islice(documents, args.chunk_size))
+        while chunk:
+            ratings = np.asarray([doc.rating for doc in chunk])
+            yield vectorizer.encode_features(chunk, ragged=True) + (vectorizer.encode_annotations(chunk), ratings)
+            chunk = list(islice(documents, args.chunk_size))
+    if cache is not None:
+        print(f'Tokenization cache: {cache.hits} hits, {cache.misses} misses')
 
 
 def _main() -> None:
     """
     Main function DO NOT IMPORT
     """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cache', action='store_true', help='Cache the tokenization of the reviews in DATA_DIR')
+    parser.add_argument('--features', help='Feature store directory in DATA_DIR, written on first use then reused')
+    parser.add_argument('--metrics', help='Record the pipeline metrics and write them to this file, '
+                                          'in the Prometheus text format if it ends with .prom, else as JSON')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='The number of reviews evaluated at once')
+    args = parser.parse_args()
+    if args.metrics:
+        METRICS.enable()
     print('Reading Testing data')
-    documents = AmazonReviewParser().read_file('Automotive_5_test.json')
-    print('Create features')
     vectorizer = Vectorizer('glove.6B.50d.txt')
-    word, pos, shape = vectorizer.encode_features(documents)
-    labels = vectorizer.encode_annotations(documents)
-    nb_features = len(word)
-    print(f'Loaded {nb_features} data samples', '\n', 'Predicting...')
-    model = RecurrentNeuralNetwork.load('./models_save/ner_weights.h5')
-    predicted = model.predict([word, pos, shape], batch_size=64)
-    predicted_classes = np.asarray([RecurrentNeuralNetwork.probas_to_classes(p) for p in predicted], dtype=np.int8)
-    print(classification_report(labels, predicted_classes, ['negative', 'positive']))
+    model_filename = './models_save/ner_weights.h5'
+    model = RecurrentNeuralNetwork.load(model_filename)
+    # The features are encoded with the whole vocabulary, then re-encoded with the one the model was trained with
+    model_vectorizer = vectorizer.copy()
+    model_vectorizer.load_model_vocabulary(model_filename, model.vocabulary_size)
+    evaluation = StreamingEvaluation(nb_classes=2)
+    print('Predicting...')
+    for word, pos, shape, labels, ratings in _iter_features(vectorizer, 'Automotive_5_test.json', args):
+        sequence = BucketedSequence(model_vectorizer.remap(word), pos, shape, batch_size=64, shuffle=False)
+        predicted = sequence.restore_order(model.predict_generator(sequence))
+        evaluation.update(labels, RecurrentNeuralNetwork.probas_to_classes_batch(predicted), ratings)
+        print(f'Evaluated {len(evaluation)} data samples')
+    print(evaluation.report(['negative', 'positive']))
+    if args.metrics:
+        METRICS.export(args.metrics)
+        print(f'Metrics written to {args.metrics}')
 
 
 if __name__ == '__main__':
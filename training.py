@@ -8,36 +8,180 @@ can be launched from the command line
 """
 
 
-from keras.callbacks import EarlyStopping, ModelCheckpoint, TensorBoard
+import argparse
+import os
+from typing import Optional
 
-from amazon_reviews.document import AmazonReviewParser, Vectorizer
+from keras.callbacks import EarlyStopping, LambdaCallback, ModelCheckpoint, TensorBoard
+import numpy as np
+
+from amazon_reviews.document import AmazonReviewParser, TokenizationCache, Vectorizer
+from amazon_reviews.metrics import METRICS
+from amazon_reviews.neural_network.checkpoint import TrainingCheckpoint
+from amazon_reviews.neural_network.pipeline import PrefetchingPipeline
 from amazon_reviews.neural_network.recurrent import RecurrentNeuralNetwork
+from amazon_reviews.neural_network.sequence import BucketedSequence
+
+
+def _read_features(vectorizer: Vectorizer, filename: str, args: argparse.Namespace) -> tuple:
+    """
+    Read and encode a review file, through a feature store if one is given
+    :param vectorizer: The vectorizer encoding the documents
+    :param filename: The review file, relative to DATA_DIR
+    :param args: The command line arguments
+    :return: The word, pos and shape features (one array per document) and the labels
+    """
+    cache = TokenizationCache() if args.cache else None
+    if args.features:
+        print(f'Reading feature store {args.features}')
+        store = vectorizer.open_or_write_features(filename, args.features, cache=cache, workers=os.cpu_count())
+        features = store.word, store.pos, store.shape, store.labels
+    else:
+        documents = AmazonReviewParser.read_file(filename, workers=os.cpu_count(), cache=cache)
+        features = vectorizer.encode_features(documents, ragged=True) + (vectorizer.encode_annotations(documents),)
+    if cache is not None:
+        print(f'Tokenization cache: {cache.hits} hits, {cache.misses} misses')
+    return features
+
+
+def _vocabulary_callback(vectorizer: Optional[Vectorizer], trained_model_name: str) -> LambdaCallback:
+    """
+    Create a callback replacing the vocabulary file of the model once the new model file is saved,
+    so that the previous model keeps its own vocabulary until it is overwritten. It must follow `ModelCheckpoint`
+    :param vectorizer: The vectorizer of the pruned vocabulary, None to remove the file as the whole vocabulary is used
+    :param trained_model_name: The model file saved by `ModelCheckpoint`
+    :return: The Keras callback
+    """
+    vocabulary_path = Vectorizer.vocabulary_path(trained_model_name)
+    previous = os.stat(trained_model_name).st_mtime_ns if os.path.isfile(trained_model_name) else None
+    replaced = False
+
+    def on_epoch_end(epoch: int, logs: Optional[dict] = None) -> None:
+        nonlocal replaced
+        if replaced or not os.path.isfile(trained_model_name) or \
+                os.stat(trained_model_name).st_mtime_ns == previous:
+            return
+        if vectorizer is not None:
+            vectorizer.save_vocabulary(vocabulary_path)
+        elif os.path.isfile(vocabulary_path):
+            os.remove(vocabulary_path)
+        replaced = True
+
+    return LambdaCallback(on_epoch_end=on_epoch_end)
+
+
+def _train(vectorizer: Vectorizer, filename: str, input_shape: dict, callbacks: list, args: argparse.Namespace,
+           experiment_name: str, trained_model_name: str) -> None:
+    """
+    Read and encode the reviews, then train on them with checkpoints
+    :param vectorizer: The vectorizer encoding the documents
+    :param filename: The review file, relative to DATA_DIR
+    :param input_shape: The input shape of the model
+    :param callbacks: The Keras callbacks
+    :param args: The command line arguments
+    :param experiment_name: The name of the checkpoint directory
+    :param trained_model_name: The model file, the pruned vocabulary is saved next to it once it is written
+    """
+    word, pos, shape, labels = _read_features(vectorizer, filename, args)
+    print(f'Loaded {len(word)} data samples')
+    # Same split as `validation_split=0.2`: the last 20% of the samples are used for validation
+    split = int(len(word) * 0.8)
+    if not args.no_prune:
+        vocabulary_size = len(vectorizer.word_embeddings)
+        # The validation words outside of the training vocabulary are out of vocabulary, as on unseen reviews
+        word = vectorizer.prune(word, nb_training=split)
+        print(f'Pruned the vocabulary from {vocabulary_size} to {len(vectorizer.word_embeddings)} words')
+    print('Train...')
+    train_sequence = BucketedSequence(word, pos, shape, labels, batch_size=64, indices=np.arange(split))
+    validation_sequence = BucketedSequence(word, pos, shape, labels, batch_size=64, shuffle=False,
+                                           indices=np.arange(split, len(word)))
+    callbacks = callbacks + [_vocabulary_callback(None if args.no_prune else vectorizer, trained_model_name)]
+    checkpoint = TrainingCheckpoint(f'./models_save/checkpoints/{experiment_name}', train_sequence,
+                                    every_batches=args.checkpoint_every, callbacks=callbacks)
+    if not args.resume:
+        # The checkpoint of a previous run of the experiment is not resumed by a later --resume
+        checkpoint.clear()
+    model = RecurrentNeuralNetwork.resume(checkpoint) if args.resume else None
+    if model is None:
+        model = RecurrentNeuralNetwork.build_classification(vectorizer.word_embeddings, input_shape, 1)
+    else:
+        epoch, batch = checkpoint.position
+        print(f'Resuming from epoch {epoch + 1}, batch {batch} of {checkpoint.model_path}')
+    model.fit_checkpointed(train_sequence, checkpoint, epochs=10, callbacks=callbacks,
+                           validation_data=validation_sequence)
+
+
+def _train_streaming(vectorizer: Vectorizer, filename: str, input_shape: dict, callbacks: list,
+                     args: argparse.Namespace, trained_model_name: str) -> None:
+    """
+    Train while the reviews are parsed and encoded in the background, the first batches are trained on
+    as soon as they are ready. The whole vocabulary is used, as the corpus one is only known at the end
+    :param vectorizer: The vectorizer encoding the documents
+    :param filename: The review file, relative to DATA_DIR
+    :param input_shape: The input shape of the model
+    :param callbacks: The Keras callbacks
+    :param args: The command line arguments
+    :param trained_model_name: The model file, the vocabulary of a previous pruned model is removed once it is replaced
+    """
+    callbacks = callbacks + [_vocabulary_callback(None, trained_model_name)]
+    nb_documents = AmazonReviewParser.count_file(filename)
+    print(f'Streaming {nb_documents} data samples, one out of 5 kept for validation')
+    cache = TokenizationCache() if args.cache else None
+    documents = AmazonReviewParser.iter_file(filename, workers=os.cpu_count(), cache=cache)
+    # The reviews are parsed while the model is built
+    with PrefetchingPipeline(documents, vectorizer, nb_documents, batch_size=64) as pipeline:
+        model = RecurrentNeuralNetwork.build_classification(vectorizer.word_embeddings, input_shape, 1)
+        print('Train...')
+        model.fit_generator(pipeline.train_batches(), steps_per_epoch=pipeline.steps_per_epoch,
+                            validation_data=pipeline.validation_batches(), validation_steps=pipeline.validation_steps,
+                            epochs=10, callbacks=callbacks)
+    if cache is not None:
+        print(f'Tokenization cache: {cache.hits} hits, {cache.misses} misses')
 
 
 def _main() -> None:
     """
     Main function DO NOT IMPORT
     """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cache', action='store_true', help='Cache the tokenization of the reviews in DATA_DIR')
+    parser.add_argument('--features', help='Feature store directory in DATA_DIR, written on first use then reused')
+    parser.add_argument('--metrics', help='Record the pipeline metrics and write them to this file, '
+                                          'in the Prometheus text format if it ends with .prom, else as JSON')
+    parser.add_argument('--no-prune', action='store_true',
+                        help='Keep the whole vocabulary of the word embeddings instead of the training corpus one')
+    parser.add_argument('--resume', action='store_true', help='Resume the training from its last checkpoint')
+    parser.add_argument('--checkpoint-every', type=int,
+                        help='The number of batches between two checkpoints, by default at the end of each epoch only')
+    parser.add_argument('--stream', action='store_true',
+                        help='Train while the reviews are parsed and encoded in the background, '
+                             'with the whole vocabulary and without checkpoints')
+    args = parser.parse_args()
+    if args.stream and (args.features or args.resume or args.checkpoint_every):
+        parser.error('--stream cannot be combined with --features, --resume or --checkpoint-every')
+    if args.metrics:
+        METRICS.enable()
     experiment_name = 'base_professor_model'
+    trained_model_name = './models_save/professor_ner_weights.h5'
     print('Reading training data')
-    documents = AmazonReviewParser.read_file('Automotive_5_train.json')
-    print('Create features')
     vectorizer = Vectorizer('glove.6B.50d.txt')
-    word, pos, shape = vectorizer.encode_features(documents)
-    labels = vectorizer.encode_annotations(documents)
-    print(f'Loaded {len(word)} data samples', '\n', 'Train...')
     input_shape = {
         'pos': (len(vectorizer.pos2index), 10),
         'shape': (len(vectorizer.shape2index), 2)
     }
-    model = RecurrentNeuralNetwork.build_classification(vectorizer.word_embeddings, input_shape, 1)
-    trained_model_name = './models_save/professor_ner_weights.h5'
     early_stopping = EarlyStopping(monitor='val_loss', patience=5)
     save_best_model = ModelCheckpoint(trained_model_name, monitor='val_loss', verbose=1,
                                       save_best_only=True, mode='auto')
     tb_callbacks = TensorBoard(f'./tf_logs/{experiment_name}')
-    model.fit([word, pos, shape], labels, validation_split=0.2, batch_size=64,
-              epochs=10, callbacks=[save_best_model, early_stopping, tb_callbacks])
+    callbacks = [save_best_model, early_stopping, tb_callbacks]
+    if args.stream:
+        _train_streaming(vectorizer, 'Automotive_5_train.json', input_shape, callbacks, args, trained_model_name)
+    else:
+        _train(vectorizer, 'Automotive_5_train.json', input_shape, callbacks, args, experiment_name,
+               trained_model_name)
+    if args.metrics:
+        METRICS.export(args.metrics)
+        print(f'Metrics written to {args.metrics}')
 
 
 if __name__ == '__main__':